@@ -1,11 +1,6 @@
 import streamlit as st
-from utils.data_loader import cargar_datos
-import pandas as pd
 import hmac
-import json
 from datetime import datetime
-import pytz  # tener pytz instalado
-import time
 
 # Configuración básica de la página
 st.set_page_config(
@@ -53,6 +48,45 @@ def login():
             else:
                 st.error("Usuario o contraseña incorrectos")
 
+# Cada cuántos segundos el modo de actualización automática revisa si cambiaron los datos
+SEGUNDOS_ACTUALIZACION = 30
+
+def resumen_en_vivo():
+    # Solo se vuelve a pedir el resumen de leads por agente (resumen.json) si cambió el archivo
+    version = version_resumen_agentes()
+    if st.session_state.get("version_resumen") != version:
+        try:
+            st.session_state.resumen_df, st.session_state.resumen_error = cargar_resumen_agentes(), None
+        except ValueError as error:
+            st.session_state.resumen_df, st.session_state.resumen_error = None, str(error)
+        if "version_resumen" in st.session_state:
+            st.session_state.last_update = datetime.now()
+        st.session_state.version_resumen = version
+
+    # Obtener la hora local de Buenos Aires
+    baires_tz = pytz.timezone('America/Argentina/Buenos_Aires')
+    current_time = datetime.now(baires_tz).strftime('%H:%M')
+    current_date = datetime.now(baires_tz).strftime('%d/%m/%Y')
+    last_update_time = st.session_state.last_update.astimezone(baires_tz).strftime('%d/%m/%Y - %H:%M')  # Corregido
+
+    # Mostrar la hora actual y la última actualización
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.image("assets/SPS.png", use_container_width=True)
+    with col2:
+        st.markdown('<h4 style="text-align: center;">🔔 Leads hasta el momento 🔔</h4>', unsafe_allow_html=True)
+        st.markdown(f'<p style="text-align: center;"><i>Última actualización: {last_update_time}</i></p>', unsafe_allow_html=True)
+    with col3:
+        st.markdown(f'<h3 style="text-align: right;"> {current_time} </h3>', unsafe_allow_html=True)
+        st.markdown(f'<p style="text-align: right;padding-right:1.5rem"> {current_date} </p>', unsafe_allow_html=True)
+
+    # Mostrar el Resumen de Leads por Agente
+    if st.session_state.resumen_error:
+        st.error(st.session_state.resumen_error)
+    else:
+        with etapa("serializacion"):
+            st.dataframe(st.session_state.resumen_df, use_container_width=True, hide_index=True)
+
 def logout():
     st.session_state.authenticated = False
     st.session_state.username = ""
@@ -63,6 +97,19 @@ def logout():
 if not st.session_state.authenticated:
     login()
 else:
+    # Los datos y las dependencias de análisis se cargan recién con la sesión iniciada:
+    # el formulario de login se muestra sin importar pandas ni tocar los leads
+    import pandas as pd
+    import pytz  # tener pytz instalado
+    from utils.agentes import cargar_resumen_agentes, version_resumen_agentes
+    from utils.instrumentacion import cerrar_medicion, etapa, iniciar_medicion
+
+    # Copy-on-Write de pandas: las vistas de los datos compartidos entre sesiones no copian datos hasta que se modifican
+    pd.set_option("mode.copy_on_write", True)
+
+    # Medir las etapas de esta ejecución si el modo diagnóstico está activo
+    iniciar_medicion("Página principal")
+
     # Mostrar el mensaje de bienvenida en la barra lateral
     st.sidebar.write(f"Bienvenido, {st.session_state.username}. (rol: {st.session_state.role})")
     if st.sidebar.button("Cerrar Sesión"):
@@ -93,38 +140,6 @@ else:
         </style>
         """, unsafe_allow_html=True)
 
-    # Cargar datos una sola vez
-    df = cargar_datos()
-
-    # Cargar el JSON desde el archivo resumen.json
-    with open('resumen.json', 'r') as json_file:
-        resumen_data = json.load(json_file)
-
-    # Verificar si hay un error en la carga de datos del resumen
-    if resumen_data['error']:
-        st.error(resumen_data['mensaje'])
-    else:
-        # Convertir la lista de datos a un DataFrame
-        resumen_df = pd.DataFrame(resumen_data['data'])
-
-
-    # Obtener la hora local de Buenos Aires
-    baires_tz = pytz.timezone('America/Argentina/Buenos_Aires')
-    current_time = datetime.now(baires_tz).strftime('%H:%M')
-    current_date = datetime.now(baires_tz).strftime('%d/%m/%Y')
-    last_update_time = st.session_state.last_update.astimezone(baires_tz).strftime('%d/%m/%Y - %H:%M')  # Corregido
-
-        # Mostrar la hora actual y la última actualización
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col1:
-        st.image("assets/SPS.png", use_container_width=True)
-    with col2:
-        st.markdown('<h4 style="text-align: center;">🔔 Leads hasta el momento 🔔</h4>', unsafe_allow_html=True)
-        st.markdown(f'<p style="text-align: center;"><i>Última actualización: {last_update_time}</i></p>', unsafe_allow_html=True)
-    with col3:
-        st.markdown(f'<h3 style="text-align: right;"> {current_time} </h3>', unsafe_allow_html=True)
-        st.markdown(f'<p style="text-align: right;padding-right:1.5rem"> {current_date} </p>', unsafe_allow_html=True)
-
     # Estilo en CSS hardcodeado para la tabla
     st.markdown(
     """
@@ -136,8 +151,14 @@ else:
     """,
     unsafe_allow_html=True,
     )
-    # Mostrar el Resumen de Leads por Agente
-    st.dataframe(resumen_df, use_container_width=True, hide_index=True)
+
+    # Modo pantalla: refresca solo el encabezado y el resumen, sin volver a ejecutar toda la página
+    actualizacion_automatica = st.sidebar.toggle(
+        "Actualización automática",
+        value=False,
+        help=f"Revisa cada {SEGUNDOS_ACTUALIZACION} segundos si hay leads nuevos"
+    )
+    st.fragment(resumen_en_vivo, run_every=SEGUNDOS_ACTUALIZACION if actualizacion_automatica else None)()
 
     # Información principal
     st.markdown("""
@@ -170,6 +191,9 @@ else:
     </div>
     """, unsafe_allow_html=True)
 
+    # Panel de diagnóstico (solo administradores)
+    cerrar_medicion()
+
 # Pie de página
 st.markdown("---")
 st.markdown("© 2025 - Portal de Leads SPS | Versión 1.0")
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Mide el arranque en frío: cuánto tarda la primera ejecución de cada pantalla en un
+proceso nuevo y qué módulos pesados importa.
+
+Cada escenario corre en su propio proceso de Python que ya importó streamlit (como
+el servidor) y ejecuta el script una vez con el AppTest de Streamlit. El login y las
+páginas sin sesión no deberían importar pandas, plotly.express ni los datos. Los
+resultados se agregan a benchmarks/resultados.jsonl (filas = null) y se comparan
+con la corrida anterior.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_arranque
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from benchmarks.bench_ruta_datos import RUTA_RESULTADOS, _commit_actual, _resultados_previos
+
+# Raíz del proyecto: los scripts se ejecutan desde ahí, como con streamlit run
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos cuya importación se informa en cada escenario
+MODULOS_PESADOS = ['numpy', 'pandas', 'pyarrow', 'pytz', 'plotly.express', 'utils.data_loader']
+
+# Escenarios: nombre -> (script, con sesión iniciada)
+ESCENARIOS = {
+    'login': ('app.py', False),
+    'pagina_sin_sesion': ('pages/1_Leads_Horario.py', False),
+    'principal_con_sesion': ('app.py', True),
+    'horario_con_sesion': ('pages/1_Leads_Horario.py', True)
+}
+
+# Código que corre en cada proceso nuevo: ejecuta el script e informa tiempo y módulos importados
+CODIGO_MEDICION = """
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+script, con_sesion, modulos = sys.argv[1], sys.argv[2] == "1", sys.argv[3].split(",")
+previos = set(sys.modules)
+prueba = AppTest.from_file(script, default_timeout=300)
+if con_sesion:
+    prueba.session_state["authenticated"] = True
+    prueba.session_state["username"] = "admin"
+    prueba.session_state["role"] = "admin"
+inicio = time.perf_counter()
+prueba.run()
+segundos = time.perf_counter() - inicio
+print(json.dumps({
+    "segundos": segundos,
+    "modulos": [modulo for modulo in modulos if modulo in sys.modules and modulo not in previos],
+    "errores": [str(error.value) for error in prueba.exception]
+}))
+"""
+
+# Función para medir un escenario en un proceso nuevo
+def medir_escenario(script, con_sesion):
+    """
+    Ejecuta el script una vez en un proceso de Python nuevo.
+
+    Args:
+        script (str): Script de Streamlit, relativo a la raíz del proyecto
+        con_sesion (bool): Simular un usuario administrador con la sesión iniciada
+
+    Returns:
+        dict: segundos, módulos pesados importados y errores del script
+    """
+    salida = subprocess.run(
+        [sys.executable, "-c", CODIGO_MEDICION, script, "1" if con_sesion else "0", ",".join(MODULOS_PESADOS)],
+        capture_output=True, text=True, check=True, cwd=RAIZ
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+# Función principal: mide los escenarios y guarda los resultados
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--resultados", default=RUTA_RESULTADOS)
+    args = parser.parse_args()
+
+    resultados = os.path.abspath(args.resultados)
+    previos = _resultados_previos(resultados)
+    comun = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version()
+    }
+
+    print(f"{'escenario':<24} {'segundos':>10} {'anterior':>10} {'cambio':>8}  módulos pesados")
+    with open(resultados, "a", encoding="utf-8") as archivo:
+        for nombre, (script, con_sesion) in ESCENARIOS.items():
+            mediciones = [medir_escenario(script, con_sesion) for _ in range(args.repeticiones)]
+            mejor = min(mediciones, key=lambda medicion: medicion["segundos"])
+            if mejor["errores"]:
+                print(f"{nombre}: errores {mejor['errores']}")
+
+            etapa = f"arranque_{nombre}"
+            anterior = previos.get((None, etapa))
+            previo = f"{anterior:.4f}" if anterior else "-"
+            cambio = f"{(mejor['segundos'] / anterior - 1):+.0%}" if anterior else ""
+            print(f"{nombre:<24} {mejor['segundos']:>10.4f} {previo:>10} {cambio:>8}  {', '.join(mejor['modulos']) or '-'}")
+            archivo.write(json.dumps({
+                **comun, "filas": None, "etapa": etapa, "segundos": round(mejor["segundos"], 6), "modulos": mejor["modulos"]
+            }, ensure_ascii=False) + "\n")
+
+if __name__ == "__main__":
+    main()
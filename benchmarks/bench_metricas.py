@@ -0,0 +1,54 @@
+"""
+Compara la tabla de métricas con NamedAgg y lambdas contra calcular_metricas.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_metricas --filas 1000000
+"""
+import argparse
+import time
+import pandas as pd
+from benchmarks.generador import generar_leads
+from utils.data_loader import enriquecer_datos
+from utils.metricas import calcular_metricas
+
+# Versión anterior de la tabla resumen (una función de Python por grupo y columna)
+def metricas_lambda(df):
+    return df.groupby(["Servicio"], observed=True).agg(
+        Total=("FechaIngreso", "count"),
+        Chatbot=pd.NamedAgg(column="CanalOrigen", aggfunc=lambda x: sum(x == "Chatbot")),
+        WhatsApp=pd.NamedAgg(column="CanalOrigen", aggfunc=lambda x: sum(x == "WhatsApp")),
+        Asesorados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Asesorado")),
+        Pendientes=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Pendiente")),
+        Descartados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Descartado")),
+        TasaEfectividad=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Asesorado") / len(x) if len(x) > 0 else 0)
+    ).reset_index()
+
+# Función para medir el mejor tiempo de varias repeticiones
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+# Función principal: mide ambas versiones para cada cantidad de filas
+def main():
+    # Copy-on-Write de pandas, como en el portal (ver app.py)
+    pd.set_option("mode.copy_on_write", True)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filas':>10} {'lambdas (s)':>12} {'vectorizado (s)':>16} {'mejora':>8}")
+    for filas in args.filas:
+        df = enriquecer_datos(generar_leads(filas))
+        tiempo_lambda, esperado = medir(lambda: metricas_lambda(df), args.repeticiones)
+        tiempo_vectorizado, obtenido = medir(lambda: calcular_metricas(df, ["Servicio"]), args.repeticiones)
+        columnas = list(esperado.columns)
+        assert obtenido[columnas].astype({"Servicio": str}).equals(esperado.astype({"Servicio": str}))
+        print(f"{filas:>10} {tiempo_lambda:>12.4f} {tiempo_vectorizado:>16.4f} {tiempo_lambda / tiempo_vectorizado:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
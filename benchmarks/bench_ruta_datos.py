@@ -0,0 +1,186 @@
+"""
+Mide cada etapa del camino de los datos con leads sintéticos de distintos tamaños.
+
+Etapas: lectura del CSV, enriquecimiento, snapshot (en frío y vigente), índices,
+filtros, las agregaciones de cada página y la exportación. Cada medición se agrega
+a benchmarks/resultados.jsonl y se compara con la anterior del mismo tamaño y
+etapa, así una regresión se ve como un aumento porcentual.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_ruta_datos --filas 10000 1000000
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import pandas as pd
+from datetime import datetime
+from benchmarks.generador import escribir_csv
+from utils import data_loader
+from utils.alertas import DetectorCaudal
+from utils.cubo import construir_cubo, consultar_cubo
+from utils.exportacion import descartar_exportacion, exportar_leads
+from utils.indices import IndiceBitmap, IndiceTexto
+from utils.metricas import calcular_metricas
+from utils.muestreo import grafico_lineas
+from utils.series import construir_series, consultar_series, elegir_resolucion
+
+# Archivo donde se acumulan los resultados de todas las corridas
+RUTA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados.jsonl")
+
+# Función para medir el mejor tiempo de varias repeticiones
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), resultado
+
+# Función para identificar la versión del código medida
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Función para leer la última medición guardada de cada (filas, etapa)
+def _resultados_previos(ruta):
+    previos = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            for linea in archivo:
+                resultado = json.loads(linea)
+                previos[(resultado["filas"], resultado["etapa"])] = resultado["segundos"]
+    return previos
+
+# Función para correr todas las etapas sobre un CSV de leads
+def medir_etapas(ruta, repeticiones):
+    """
+    Mide las etapas del camino de los datos sobre un CSV.
+
+    Args:
+        ruta (str): CSV de leads (el snapshot se crea en .cache/ del directorio actual)
+        repeticiones (int): Repeticiones por etapa (se guarda la mejor)
+
+    Returns:
+        dict: Etapa -> segundos
+    """
+    tiempos = {}
+
+    tiempos["lectura_csv"], crudo = medir(lambda: data_loader.leer_fuente(ruta), repeticiones)
+    tiempos["enriquecimiento"], df = medir(lambda: data_loader.enriquecer_datos(crudo.copy()), repeticiones)
+
+    # Snapshot en frío (CSV -> Parquet y agregados) y vigente (solo lectura del Parquet)
+    def snapshot_frio():
+        shutil.rmtree(data_loader.DIRECTORIO_CACHE, ignore_errors=True)
+        return data_loader._sincronizar_snapshot(ruta, True)
+    tiempos["snapshot_frio"], _ = medir(snapshot_frio, 1)
+    tiempos["snapshot_vigente"], df = medir(lambda: data_loader._sincronizar_snapshot(ruta, True), repeticiones)
+    # Todas las columnas derivadas de FechaIngreso, como si una página las pidiera (sobre una vista nueva, sin caché)
+    tiempos["columnas_derivadas"], _ = medir(lambda: df.copy(deep=False).derivadas.agregar(), repeticiones)
+
+    tiempos["indice_bitmap"], indice = medir(lambda: IndiceBitmap(df), repeticiones)
+    tiempos["indice_texto"], indice_texto = medir(lambda: IndiceTexto(df), 1)
+    tiempos["cubo"], cubo = medir(lambda: construir_cubo(df), repeticiones)
+    tiempos["series"], series = medir(lambda: construir_series(df), repeticiones)
+
+    # Detector de alertas: toda la historia de una vez y, después, lead por lead (10.000 leads)
+    def alertas_historia():
+        detector = DetectorCaudal()
+        detector.consumir(consultar_series(series, "30min", ["Servicio"]))
+        return detector
+    def alertas_por_lead():
+        detector = DetectorCaudal()
+        for fecha, servicio in zip(df["FechaIngreso"].iloc[-10_000:], df["Servicio"].iloc[-10_000:]):
+            detector.registrar(fecha, servicio)
+    tiempos["alertas_historia"], _ = medir(alertas_historia, repeticiones)
+    tiempos["alertas_10000_leads"], _ = medir(alertas_por_lead, repeticiones)
+
+    # Filtros típicos: un mes, la mitad de los servicios y sin domingos
+    fin = df["FechaIngreso"].max()
+    servicios = df["Servicio"].cat.categories[::2].tolist()
+    filtros = dict(fecha_inicio=fin - pd.Timedelta(days=30), fecha_fin=fin, servicios=servicios, excluir_domingos=True)
+    resolucion = elegir_resolucion(filtros["fecha_inicio"], filtros["fecha_fin"])
+    tiempos["filtro_con_indice"], _ = medir(lambda: data_loader.seleccionar_leads(df, indice=indice, **filtros).datos, repeticiones)
+    tiempos["filtro_sin_indice"], filtrado = medir(lambda: data_loader.aplicar_filtros(df, **filtros), repeticiones)
+    tiempos["busqueda_texto"], _ = medir(lambda: indice_texto.buscar("interesado en"), repeticiones)
+
+    # Agregaciones de cada página
+    def pagina_horario():
+        for dimensiones in (["HoraIngreso"], ["Bloque30min"], ["DiaCodigo"], ["DiaCodigo", "HoraIngreso"]):
+            consultar_cubo(cubo, dimensiones, **filtros)
+    def pagina_servicio():
+        for dimensiones in (["Servicio", "CanalOrigen"], ["Servicio", "Estado"]):
+            consultar_cubo(cubo, dimensiones, **filtros)
+        consultar_series(series, resolucion, ["Servicio"], **filtros)
+        calcular_metricas(consultar_cubo(cubo, ["Servicio", "CanalOrigen", "Estado"], **filtros), ["Servicio"], pesos="CantidadLeads")
+    def pagina_detalle():
+        consultar_series(series, resolucion, [], **filtros)
+        filtrado.groupby(["TipoDeCliente", "Estado"], observed=True).size()
+        calcular_metricas(filtrado, ["Servicio", "CanalOrigen"], canales=[])
+        data_loader.ordenar_posiciones(filtrado, "Servicio", False)[:50]
+    tiempos["pagina_horario"], _ = medir(pagina_horario, repeticiones)
+    tiempos["pagina_servicio"], _ = medir(pagina_servicio, repeticiones)
+    tiempos["pagina_detalle"], _ = medir(pagina_detalle, repeticiones)
+    # Peor caso de un gráfico de líneas: todo el rango cada 30 minutos, una traza por servicio
+    tendencia_completa = consultar_series(series, "30min", ["Servicio"])
+    tiempos["figura_tendencia"], _ = medir(
+        lambda: grafico_lineas(tendencia_completa, x="Periodo", y="CantidadLeads", color="Servicio"), repeticiones
+    )
+
+    for etapa, formato in [("exportacion_csv_gzip", "CSV comprimido (gzip)"), ("exportacion_parquet", "Parquet")]:
+        tiempos[etapa], ruta_exportacion = medir(lambda: exportar_leads(filtrado, formato), 1)
+        descartar_exportacion(ruta_exportacion)
+    return tiempos
+
+# Función principal: genera los datos, mide y guarda los resultados
+def main():
+    # Copy-on-Write de pandas, como en el portal (ver app.py)
+    pd.set_option("mode.copy_on_write", True)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--directorio", default=os.path.join(tempfile.gettempdir(), "bench_leads"),
+                        help="Carpeta de trabajo (los CSV generados se reutilizan entre corridas)")
+    parser.add_argument("--resultados", default=RUTA_RESULTADOS)
+    args = parser.parse_args()
+
+    resultados = os.path.abspath(args.resultados)
+    previos = _resultados_previos(resultados)
+    comun = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__
+    }
+
+    os.makedirs(args.directorio, exist_ok=True)
+    os.chdir(args.directorio)
+    for filas in args.filas:
+        ruta = f"leads_{filas}.csv"
+        if not os.path.exists(ruta):
+            print(f"Generando {ruta}...")
+            escribir_csv(ruta, filas)
+
+        tiempos = medir_etapas(ruta, args.repeticiones)
+
+        print(f"\n{filas} filas")
+        print(f"{'etapa':<24} {'segundos':>10} {'anterior':>10} {'cambio':>8}")
+        with open(resultados, "a", encoding="utf-8") as archivo:
+            for etapa, segundos in tiempos.items():
+                anterior = previos.get((filas, etapa))
+                previo = f"{anterior:.4f}" if anterior else "-"
+                cambio = f"{(segundos / anterior - 1):+.0%}" if anterior else ""
+                print(f"{etapa:<24} {segundos:>10.4f} {previo:>10} {cambio:>8}")
+                archivo.write(json.dumps({**comun, "filas": filas, "etapa": etapa, "segundos": round(segundos, 6)}) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Genera leads sintéticos con las mismas columnas que leads.csv.
+
+Los ingresos se concentran entre las 17 y las 21 hs y las mezclas de Servicio,
+CanalOrigen, Estado, TipoDeCliente y Agente siguen las proporciones de los datos
+de prueba. El archivo se escribe por bloques y ordenado por FechaIngreso, así se
+pueden generar decenas de millones de filas sin tenerlas en memoria.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.generador --filas 1000000 --salida /tmp/leads_1M.csv
+"""
+import argparse
+import numpy as np
+import pandas as pd
+
+# Valores posibles de cada columna y su probabilidad
+SERVICIOS = {
+    'AlarmaHogar': 0.22, 'Alarma+Cam': 0.19, 'Alarma+Cerco': 0.15, 'SPSCare': 0.15,
+    'Alarma+Cam+Cerco': 0.12, 'Vehicular': 0.09, 'BLACKKEY': 0.04, 'VigiladorVirtual': 0.04
+}
+CANALES = {'Chatbot': 0.53, 'WhatsApp': 0.47}
+ESTADOS = {'Asesorado': 0.50, 'Pendiente': 0.42, 'Descartado': 0.08}
+TIPOS_CLIENTE = {'Prospecto': 0.56, 'Cliente': 0.44}
+CLASIFICACIONES = {'Interesado': 0.50, 'No Clasificado': 0.50}
+AGENTES = {'Sofía': 0.34, 'Stefania': 0.34, 'Florencia': 0.32}
+
+# Peso relativo de cada hora del día: pico entre las 17 y las 21 hs
+PESOS_HORA = np.array([1, 1, 1, 1, 1, 1, 2, 4, 8, 10, 10, 10, 9, 9, 10, 10, 12, 30, 34, 34, 32, 26, 8, 3], dtype=float)
+
+NOMBRES = ['Juan', 'Ana', 'Carlos', 'Lucía', 'Martín', 'Laura', 'Santiago', 'Valentina', 'Germán', 'Patricia',
+           'Gustavo', 'Raúl', 'Sofía', 'Diego', 'Camila', 'Nicolás', 'Florencia', 'Matías', 'Julieta', 'Tomás']
+APELLIDOS = ['Pérez', 'Gómez', 'Méndez', 'Fernández', 'Díaz', 'Bazán', 'Nuñez', 'Duarte', 'Ayala', 'Peralta',
+             'Ibáñez', 'López', 'Martínez', 'Rodríguez', 'Sosa', 'Romero', 'Álvarez', 'Torres', 'Ruiz', 'Acosta']
+NOTAS = [
+    'Cliente interesado en Alarma para hogar. Agendar llamada.',
+    'En espera de respuesta: contactar nuevamente.',
+    'Lead descartado: no está interesado.',
+    'Cliente consultando sobre combo completo de alarma y cerco.',
+    'Consulta sobre servicio de asistencia médica SPSCare.',
+    'Esperando confirmación: enviar detalle por email.',
+    'No interesado en servicios vehiculares.',
+    'Interesada en sistema de alarma con cámaras.',
+    'Consulta para instalación domiciliaria.',
+    'Cliente interesado en protección médica.'
+]
+
+# Función para elegir valores al azar según sus probabilidades
+def _elegir(aleatorio, opciones, filas):
+    valores = list(opciones)
+    probabilidades = np.array(list(opciones.values()))
+    return aleatorio.choice(valores, size=filas, p=probabilidades / probabilidades.sum())
+
+# Función para generar un bloque de leads sintéticos
+def generar_leads(filas, semilla=0, inicio="2025-01-01", dias=180):
+    """
+    Genera leads sintéticos ordenados por FechaIngreso, con las columnas de leads.csv.
+
+    Args:
+        filas (int): Cantidad de leads
+        semilla (int): Semilla del generador aleatorio
+        inicio (str): Primer día del período
+        dias (int): Cantidad de días del período
+
+    Returns:
+        DataFrame: Leads crudos (como los devuelve leer_fuente)
+    """
+    aleatorio = np.random.default_rng(semilla)
+    dia = aleatorio.integers(0, dias, filas)
+    hora = aleatorio.choice(24, size=filas, p=PESOS_HORA / PESOS_HORA.sum())
+    segundos = dia * 86400 + hora * 3600 + aleatorio.integers(0, 3600, filas)
+    fechas = pd.Timestamp(inicio) + pd.to_timedelta(np.sort(segundos), unit="s")
+    fechas = fechas.floor("min")
+
+    nombres = pd.Series(_elegir(aleatorio, dict.fromkeys(NOMBRES, 1), filas))
+    apellidos = pd.Series(_elegir(aleatorio, dict.fromkeys(APELLIDOS, 1), filas))
+    numero = pd.Series(aleatorio.integers(0, 1_000_000, filas)).astype(str)
+
+    return pd.DataFrame({
+        "FechaIngreso": fechas,
+        "Servicio": _elegir(aleatorio, SERVICIOS, filas),
+        "CanalOrigen": _elegir(aleatorio, CANALES, filas),
+        "Nombre": nombres + " " + apellidos,
+        "Telefono": aleatorio.integers(110_000_000, 160_000_000, filas),
+        "Email": nombres.str.lower() + "." + numero + "@example.com",
+        "Estado": _elegir(aleatorio, ESTADOS, filas),
+        "TipoDeCliente": _elegir(aleatorio, TIPOS_CLIENTE, filas),
+        "Clasificacion": _elegir(aleatorio, CLASIFICACIONES, filas),
+        "Notas": _elegir(aleatorio, dict.fromkeys(NOTAS, 1), filas),
+        "Agente": _elegir(aleatorio, AGENTES, filas)
+    })
+
+# Función para escribir un CSV de leads sintéticos por bloques
+def escribir_csv(ruta, filas, semilla=0, filas_por_bloque=1_000_000, dias=180):
+    """
+    Escribe un CSV con filas leads sintéticos, ordenado por FechaIngreso.
+
+    Cada bloque cubre un tramo consecutivo del período, así el archivo completo
+    queda ordenado sin generar todas las filas a la vez.
+
+    Args:
+        ruta (str): Archivo de salida
+        filas (int): Cantidad total de leads
+        semilla (int): Semilla del generador aleatorio
+        filas_por_bloque (int): Leads que se generan por vez
+        dias (int): Cantidad de días del período completo
+    """
+    bloques = max(1, -(-filas // filas_por_bloque))
+    inicio = pd.Timestamp("2025-01-01")
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        for i in range(bloques):
+            filas_bloque = min(filas_por_bloque, filas - i * filas_por_bloque)
+            desde = inicio + pd.Timedelta(days=dias * i // bloques)
+            hasta = inicio + pd.Timedelta(days=dias * (i + 1) // bloques)
+            bloque = generar_leads(filas_bloque, semilla + i, desde, max(1, (hasta - desde).days))
+            bloque.to_csv(archivo, header=(i == 0), index=False, date_format="%Y-%m-%d %H:%M:%S")
+
+# Función principal: genera el archivo pedido por línea de comandos
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filas", type=int, default=10_000)
+    parser.add_argument("--salida", default="leads_sinteticos.csv")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+    escribir_csv(args.salida, args.filas, args.semilla)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,4 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
-from utils.data_loader import cargar_datos, aplicar_filtros
 
 # Configuración de la página
 st.set_page_config(
@@ -22,19 +17,32 @@ if st.session_state.role != "admin":
     st.error("No tiene permisos para acceder a esta página")
     st.stop()
 
+# Las dependencias de análisis se importan recién con la sesión verificada
+import pandas as pd
+from datetime import datetime
+from utils.alertas import cargar_alertas
+from utils.almacen_sql import cargar_conteos
+from utils.figuras import VISTAS_TEMPORALES, figura_dias, figura_heatmap, figuras_por_hora
+from utils.instrumentacion import cerrar_medicion, etapa, iniciar_medicion
+
+# Copy-on-Write de pandas: las vistas del dataset compartido (ver cargar_datos) no copian datos hasta que se modifican
+pd.set_option("mode.copy_on_write", True)
+
+# Medir las etapas de esta ejecución si el modo diagnóstico está activo
+iniciar_medicion("Leads por Horario")
+
 # Título principal
 st.title("📈 Caudal de Leads por Horario")
 st.markdown("Análisis del volumen de leads recibidos por franja horaria, con enfoque en la franja de 17:00 a 21:00 horas")
 
-# Cargar datos
-df = cargar_datos()
+# Cargar los conteos (cubo en memoria o base SQL, según PORTAL_BACKEND): la página no necesita los leads individuales
+conteos = cargar_conteos()
 
 # Panel de filtros en la barra lateral
 st.sidebar.header("Filtros")
 
 # Filtro de fechas
-fecha_min = df["FechaIngreso"].min().date()
-fecha_max = df["FechaIngreso"].max().date()
+fecha_min, fecha_max = (fecha.date() for fecha in conteos.rango_fechas())
 
 fecha_inicio = st.sidebar.date_input(
     "Fecha inicial",
@@ -55,14 +63,14 @@ fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
 fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
 
 # Filtros adicionales
-servicios_disponibles = df["Servicio"].unique().tolist()
+servicios_disponibles = conteos.valores("Servicio")
 servicios_seleccionados = st.sidebar.multiselect(
     "Servicios",
     options=servicios_disponibles,
     default=servicios_disponibles
 )
 
-canales_disponibles = df["CanalOrigen"].unique().tolist()
+canales_disponibles = conteos.valores("CanalOrigen")
 canales_seleccionados = st.sidebar.multiselect(
     "Canales de Origen",
     options=canales_disponibles,
@@ -75,141 +83,73 @@ excluir_domingos = st.sidebar.checkbox("Excluir domingos", value=True)
 # Tipo de visualización temporal
 vista_temporal = st.sidebar.radio(
     "Vista temporal",
-    options=["Horas", "Bloques de 30 minutos"],
+    options=VISTAS_TEMPORALES,
     index=0
 )
 
-# Aplicar filtros
-df_filtrado = aplicar_filtros(
-    df,
+# Filtros seleccionados, comunes a todas las consultas de conteos
+filtros = dict(
     fecha_inicio=fecha_inicio_dt,
     fecha_fin=fecha_fin_dt,
     servicios=servicios_seleccionados,
-    canales=canales_seleccionados
+    canales=canales_seleccionados,
+    excluir_domingos=excluir_domingos
 )
 
-# Excluir domingos si está marcada la opción
-if excluir_domingos:
-    df_filtrado = df_filtrado[df_filtrado["DiaSemana"] != 6]
-
-# Preparar datos según la vista temporal seleccionada
-if vista_temporal == "Horas":
-    # Agrupación por hora
-    leads_por_hora = df_filtrado.groupby("HoraIngreso").size().reset_index(name="CantidadLeads")
-    eje_x = "HoraIngreso"
-    etiqueta_x = "Hora del día"
-    titulo_grafico = "Cantidad de Leads por Hora (Todo el día)"
-else:
-    # Agrupación por bloques de 30 minutos
-    leads_por_hora = df_filtrado.groupby("Bloque30min").size().reset_index(name="CantidadLeads")
-    eje_x = "Bloque30min"
-    etiqueta_x = "Bloque de 30 minutos"
-    titulo_grafico = "Cantidad de Leads por Bloques de 30 minutos"
-
-# Gráfico general de leads por hora/bloque
-fig_general = px.bar(
-    leads_por_hora,
-    x=eje_x,
-    y="CantidadLeads",
-    labels={eje_x: etiqueta_x, "CantidadLeads": "Cantidad de Leads"},
-    title=titulo_grafico,
-    color_discrete_sequence=["#636EFA"]
-)
-
-# Filtrar para franja horaria especial (17:00 - 21:00)
-if vista_temporal == "Horas":
-    df_franja = df_filtrado[(df_filtrado["HoraIngreso"] >= 17) & (df_filtrado["HoraIngreso"] <= 21)]
-    leads_franja = df_franja.groupby("HoraIngreso").size().reset_index(name="CantidadLeads")
-    titulo_franja = "Cantidad de Leads entre 17:00 y 21:00"
-else:
-    # Para bloques de 30 min, filtramos los que están entre 17:00 y 21:30
-    df_franja = df_filtrado[
-        (df_filtrado["HoraIngreso"] >= 17) & 
-        ((df_filtrado["HoraIngreso"] < 21) | 
-        ((df_filtrado["HoraIngreso"] == 21) & (df_filtrado["MinutoIngreso"] < 30)))
-    ]
-    leads_franja = df_franja.groupby("Bloque30min").size().reset_index(name="CantidadLeads")
-    titulo_franja = "Cantidad de Leads entre 17:00 y 21:30 (bloques de 30 min)"
-
-# Gráfico para la franja especial
-fig_franja = px.bar(
-    leads_franja,
-    x=eje_x,
-    y="CantidadLeads",
-    labels={eje_x: f"{etiqueta_x} (17:00 - 21:00)", "CantidadLeads": "Cantidad de Leads"},
-    title=titulo_franja,
-    color_discrete_sequence=["#EF553B"]
-)
+# Gráficos por hora o bloque y de la franja especial (ver utils/figuras.py)
+fig_general, fig_franja = figuras_por_hora(conteos, filtros, vista_temporal)
 
 # Mostrar gráficos en dos columnas
 col1, col2 = st.columns(2)
-col1.plotly_chart(fig_general, use_container_width=True)
-col2.plotly_chart(fig_franja, use_container_width=True)
+with etapa("serializacion"):
+    col1.plotly_chart(fig_general, use_container_width=True)
+    col2.plotly_chart(fig_franja, use_container_width=True)
 
 # Análisis por día de la semana
 st.header("📅 Análisis por Día de la Semana")
 
-# Agrupar por día de la semana
-leads_por_dia = df_filtrado.groupby("DiaCodigo").size().reset_index(name="CantidadLeads")
-
-# Ordenar los días de la semana correctamente (L, M, X, J, V, S, D)
-orden_dias = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
-leads_por_dia["DiaCodigo"] = pd.Categorical(leads_por_dia["DiaCodigo"], categories=orden_dias, ordered=True)
-leads_por_dia = leads_por_dia.sort_values("DiaCodigo")
-
-# Gráfico de leads por día de la semana
-fig_dias = px.bar(
-    leads_por_dia,
-    x="DiaCodigo",
-    y="CantidadLeads",
-    labels={"DiaCodigo": "Día de la semana", "CantidadLeads": "Cantidad de Leads"},
-    title="Cantidad de Leads por Día de la Semana",
-    color_discrete_sequence=["#00CC96"]
-)
-
-# Heatmap de leads por día y hora
-# Crear tabla pivote para el heatmap
-if vista_temporal == "Horas":
-    heatmap_data = pd.pivot_table(
-        df_filtrado,
-        values="FechaIngreso",
-        index="DiaCodigo",
-        columns="HoraIngreso",
-        aggfunc="count",
-        fill_value=0
-    )
-    
-    # Ordenar los días de la semana correctamente
-    heatmap_data = heatmap_data.reindex(orden_dias)
-    
-    # Crear heatmap
-    fig_heatmap = px.imshow(
-        heatmap_data,
-        labels=dict(x="Hora del día", y="Día de la semana", color="Cantidad de Leads"),
-        x=heatmap_data.columns,
-        y=heatmap_data.index,
-        title="Distribución de Leads por Día y Hora",
-        color_continuous_scale="YlOrRd"
-    )
-    
-    # Añadir números a las celdas
-    for i in range(len(heatmap_data.index)):
-        for j in range(len(heatmap_data.columns)):
-            if heatmap_data.iloc[i, j] > 0:
-                fig_heatmap.add_annotation(
-                    x=j,
-                    y=i,
-                    text=str(int(heatmap_data.iloc[i, j])),
-                    showarrow=False,
-                    font=dict(color="black")
-                )
+fig_dias = figura_dias(conteos, filtros)
 
 # Mostrar gráficos en dos columnas
 col1, col2 = st.columns(2)
-col1.plotly_chart(fig_dias, use_container_width=True)
+with etapa("serializacion"):
+    col1.plotly_chart(fig_dias, use_container_width=True)
 
 if vista_temporal == "Horas":
-    col2.plotly_chart(fig_heatmap, use_container_width=True)
+    fig_heatmap = figura_heatmap(conteos, filtros)
+    with etapa("serializacion"):
+        col2.plotly_chart(fig_heatmap, use_container_width=True)
+
+# Alertas de caudal en la franja de 17:00 a 21:30
+st.header("🚨 Alertas de Caudal (17:00 - 21:30)")
+
+# El detector se pone al día solo con los bloques nuevos; se filtran las alertas de lo seleccionado
+with etapa("agregacion"):
+    alertas = cargar_alertas(conteos)
+    alertas = alertas[alertas["Inicio"].between(fecha_inicio_dt, fecha_fin_dt)]
+    # Como en los gráficos, sin servicios seleccionados se muestran todos
+    if servicios_seleccionados:
+        alertas = alertas[alertas["Servicio"].isin(servicios_seleccionados)]
+if excluir_domingos:
+    alertas = alertas[alertas["Inicio"].dt.dayofweek != 6]
+
+col1, col2 = st.columns(2)
+col1.metric("Bloques por encima de lo esperado", int((alertas["Tipo"] == "Por encima").sum()))
+col2.metric("Bloques por debajo de lo esperado", int((alertas["Tipo"] == "Por debajo").sum()))
+
+if alertas.empty:
+    st.info("No hay bloques con caudal fuera de rango para los filtros seleccionados")
+else:
+    st.dataframe(
+        alertas.assign(Esperado=alertas["Esperado"].round(1), Desvios=alertas["Desvios"].round(1)),
+        column_config={
+            "Inicio": st.column_config.DatetimeColumn("Inicio del bloque", format="DD/MM/YYYY HH:mm"),
+            "CantidadLeads": "Cantidad de Leads",
+            "Desvios": "Desvíos"
+        },
+        hide_index=True,
+        use_container_width=True
+    )
 
 # Sección de información adicional
 with st.expander("ℹ️ Información sobre este reporte"):
@@ -227,8 +167,14 @@ with st.expander("ℹ️ Información sobre este reporte"):
     #### Notas:
     - Los domingos pueden ser excluidos del análisis según se requiera.
     - La franja horaria de 17:00 a 21:00 es analizada en mayor detalle según lo pedido.
+    - **Alertas de caudal:** cada bloque de 30 minutos de la franja se compara, por servicio y sin distinguir canal, con lo habitual
+      para ese día de la semana y bloque (media de las semanas anteriores, con más peso en las recientes).
+      Se marca cuando se aparta 3 desvíos o más; hacen falta 4 semanas de historia.
     """)
 
+# Panel de diagnóstico (solo administradores)
+cerrar_medicion()
+
 # Pie de página
 st.markdown("---")
 st.markdown("© 2025 - Portal de Leads SPS | Versión 1.0")
\ No newline at end of file
@@ -1,8 +1,4 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime
-from utils.data_loader import cargar_datos, aplicar_filtros
 
 # Configuración de la página
 st.set_page_config(
@@ -21,19 +17,32 @@ if st.session_state.role != "admin":
     st.error("No tiene permisos para acceder a esta página")
     st.stop()
 
+# Las dependencias de análisis se importan recién con la sesión verificada
+import pandas as pd
+from datetime import datetime
+from utils.almacen_sql import cargar_conteos
+from utils.figuras import TIPOS_GRAFICO_SERVICIO, figura_servicio_estado, figura_servicio_principal
+from utils.instrumentacion import cerrar_medicion, etapa, iniciar_medicion
+from utils.metricas import calcular_metricas
+
+# Copy-on-Write de pandas: las vistas del dataset compartido (ver cargar_datos) no copian datos hasta que se modifican
+pd.set_option("mode.copy_on_write", True)
+
+# Medir las etapas de esta ejecución si el modo diagnóstico está activo
+iniciar_medicion("Leads por Servicio")
+
 # Título principal
 st.title("📋 Leads por Categoría y Servicio")
 st.markdown("Análisis de la distribución de leads por tipo de servicio, categoría y canal de origen")
 
-# Cargar datos
-df = cargar_datos()
+# Cargar los conteos (cubo en memoria o base SQL, según PORTAL_BACKEND): gráficos y tabla resumen salen de ellos, sin los leads individuales
+conteos = cargar_conteos()
 
 # Panel de filtros en la barra lateral
 st.sidebar.header("Filtros")
 
 # Filtro de fechas
-fecha_min = df["FechaIngreso"].min().date()
-fecha_max = df["FechaIngreso"].max().date()
+fecha_min, fecha_max = (fecha.date() for fecha in conteos.rango_fechas())
 
 fecha_inicio = st.sidebar.date_input(
     "Fecha inicial",
@@ -54,14 +63,14 @@ fecha_inicio_dt = datetime.combine(fecha_inicio, datetime.min.time())
 fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
 
 # Filtros adicionales
-canales_disponibles = df["CanalOrigen"].unique().tolist()
+canales_disponibles = conteos.valores("CanalOrigen")
 canales_seleccionados = st.sidebar.multiselect(
     "Canales de Origen",
     options=canales_disponibles,
     default=canales_disponibles
 )
 
-estados_disponibles = df["Estado"].unique().tolist()
+estados_disponibles = conteos.valores("Estado")
 estados_seleccionados = st.sidebar.multiselect(
     "Estados",
     options=estados_disponibles,
@@ -74,140 +83,62 @@ excluir_domingos = st.sidebar.checkbox("Excluir domingos", value=True)
 # Tipo de visualización
 tipo_grafico = st.sidebar.radio(
     "Tipo de visualización",
-    options=["Gráfico de Sunburst", "Gráfico de Barras", "Gráfico de Líneas Temporales"],
+    options=TIPOS_GRAFICO_SERVICIO,
     index=0
 )
 
-# Aplicar filtros
-df_filtrado = aplicar_filtros(
-    df,
+# Filtros seleccionados, comunes a las consultas de conteos y a la tabla resumen
+filtros = dict(
     fecha_inicio=fecha_inicio_dt,
     fecha_fin=fecha_fin_dt,
     canales=canales_seleccionados,
-    estados=estados_seleccionados
+    estados=estados_seleccionados,
+    excluir_domingos=excluir_domingos
 )
 
-# Excluir domingos si está marcada la opción
-if excluir_domingos:
-    df_filtrado = df_filtrado[df_filtrado["DiaSemana"] != 6]
-
-# Preparar datos según tipo de visualización
-if tipo_grafico == "Gráfico de Sunburst":
-    # Agrupar datos para el gráfico de sunburst
-    leads_categoria = df_filtrado.groupby(["Servicio", "CanalOrigen"]).size().reset_index(name="CantidadLeads")
-    
-    # Crear gráfico sunburst
-    fig = px.sunburst(
-        leads_categoria,
-        path=["Servicio", "CanalOrigen"],
-        values="CantidadLeads",
-        title="Distribución de Leads por Servicio y Canal de Origen",
-        color_discrete_sequence=px.colors.qualitative.Pastel
-    )
-    
-    # Mostrar el gráfico
-    st.plotly_chart(fig, use_container_width=True)
-
-elif tipo_grafico == "Gráfico de Barras":
-    # Agrupar datos para el gráfico de barras
-    leads_categoria = df_filtrado.groupby(["Servicio", "CanalOrigen"]).size().reset_index(name="CantidadLeads")
-    
-    # Crear gráfico de barras
-    fig = px.bar(
-        leads_categoria,
-        x="Servicio",
-        y="CantidadLeads",
-        color="CanalOrigen",
-        title="Cantidad de Leads por Servicio y Canal de Origen",
-        barmode="group"
-    )
-    
-    # Mostrar el gráfico
-    st.plotly_chart(fig, use_container_width=True)
-
-else:  # Gráfico de Líneas Temporales
-    # Crear columna de fecha sin hora para agrupar por día
-    df_filtrado["FechaSinHora"] = df_filtrado["FechaIngreso"].dt.date
-    
-    # Agrupar por fecha y servicio
-    leads_por_dia = df_filtrado.groupby(["FechaSinHora", "Servicio"]).size().reset_index(name="CantidadLeads")
-    
-    # Crear gráfico de líneas
-    fig = px.line(
-        leads_por_dia,
-        x="FechaSinHora",
-        y="CantidadLeads",
-        color="Servicio",
-        title="Evolución Temporal de Leads por Servicio",
-        markers=True
-    )
-    
-    # Personalizar el gráfico
-    fig.update_layout(
-        xaxis_title="Fecha",
-        yaxis_title="Cantidad de Leads",
-        legend_title="Servicio"
-    )
-    
-    # Mostrar el gráfico
-    st.plotly_chart(fig, use_container_width=True)
+# Mostrar el gráfico principal (ver utils/figuras.py)
+fig_principal = figura_servicio_principal(conteos, filtros, tipo_grafico)
+with etapa("serializacion"):
+    st.plotly_chart(fig_principal, use_container_width=True)
 
 # Análisis adicional: Distribución por estado
 st.header("Estado de los Leads por Servicio")
 
-# Agrupar por servicio y estado
-estado_por_servicio = df_filtrado.groupby(["Servicio", "Estado"]).size().reset_index(name="CantidadLeads")
-
-# Crear gráfico de barras apiladas
-fig_estado = px.bar(
-    estado_por_servicio,
-    x="Servicio",
-    y="CantidadLeads",
-    color="Estado",
-    title="Distribución de Estados por Servicio",
-    color_discrete_map={
-        "Asesorado": "#00CC96",
-        "Pendiente": "#FFA15A",
-        "Descartado": "#EF553B"
-    }
-)
+fig_estado = figura_servicio_estado(conteos, filtros)
 
 # Mostrar el gráfico
-st.plotly_chart(fig_estado, use_container_width=True)
+with etapa("serializacion"):
+    st.plotly_chart(fig_estado, use_container_width=True)
 
 # Tabla resumen
 st.header("Tabla Resumen por Servicio")
 
-# Crear tabla resumen
-resumen_servicio = df_filtrado.groupby(["Servicio"]).agg(
-    Total_Leads=("FechaIngreso", "count"),
-    Chatbot=pd.NamedAgg(column="CanalOrigen", aggfunc=lambda x: sum(x == "Chatbot")),
-    WhatsApp=pd.NamedAgg(column="CanalOrigen", aggfunc=lambda x: sum(x == "WhatsApp")),
-    Asesorados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Asesorado")),
-    Pendientes=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Pendiente")),
-    Descartados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Descartado")),
-    Tasa_Efectividad=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Asesorado") / len(x) if len(x) > 0 else 0)
-).reset_index()
+# Crear tabla resumen a partir de los conteos, con las métricas calculadas en una sola pasada
+celdas = conteos.consultar(["Servicio", "CanalOrigen", "Estado"], **filtros)
+resumen_servicio = calcular_metricas(celdas, ["Servicio"], pesos="CantidadLeads").rename(
+    columns={"Total": "Total_Leads", "TasaEfectividad": "Tasa_Efectividad"}
+)
 
 # Formatear columna de tasa de efectividad
 resumen_servicio["Tasa_Efectividad"] = resumen_servicio["Tasa_Efectividad"].apply(lambda x: f"{x:.1%}")
 
 # Mostrar tabla
-st.dataframe(
-    resumen_servicio,
-    column_config={
-        "Servicio": "Tipo de Servicio",
-        "Total_Leads": st.column_config.NumberColumn("Total Leads", format="%d"),
-        "Chatbot": st.column_config.NumberColumn("Chatbot", format="%d"),
-        "WhatsApp": st.column_config.NumberColumn("WhatsApp", format="%d"),
-        "Asesorados": st.column_config.NumberColumn("Asesorados", format="%d"),
-        "Pendientes": st.column_config.NumberColumn("Pendientes", format="%d"),
-        "Descartados": st.column_config.NumberColumn("Descartados", format="%d"),
-        "Tasa_Efectividad": "Tasa de Efectividad"
-    },
-    use_container_width=True,
-    hide_index=True
-)
+with etapa("serializacion"):
+    st.dataframe(
+        resumen_servicio,
+        column_config={
+            "Servicio": "Tipo de Servicio",
+            "Total_Leads": st.column_config.NumberColumn("Total Leads", format="%d"),
+            "Chatbot": st.column_config.NumberColumn("Chatbot", format="%d"),
+            "WhatsApp": st.column_config.NumberColumn("WhatsApp", format="%d"),
+            "Asesorados": st.column_config.NumberColumn("Asesorados", format="%d"),
+            "Pendientes": st.column_config.NumberColumn("Pendientes", format="%d"),
+            "Descartados": st.column_config.NumberColumn("Descartados", format="%d"),
+            "Tasa_Efectividad": "Tasa de Efectividad"
+        },
+        use_container_width=True,
+        hide_index=True
+    )
 
 # Sección de información adicional
 with st.expander("ℹ️ Información sobre este reporte"):
@@ -228,5 +159,8 @@ with st.expander("ℹ️ Información sobre este reporte"):
     - Se puede visualizar la evolución temporal de los leads para identificar tendencias.
     """)
 
+# Panel de diagnóstico (solo administradores)
+cerrar_medicion()
+
 # Pie de página
 st.markdown("---")
\ No newline at end of file
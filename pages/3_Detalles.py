@@ -1,8 +1,4 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from datetime import datetime
-from utils.data_loader import cargar_datos, aplicar_filtros
 
 # Configuración de la página
 st.set_page_config(
@@ -21,19 +17,52 @@ if st.session_state.role != "admin":
     st.error("No tiene permisos para acceder a esta página")
     st.stop()
 
+# Las dependencias de análisis se importan recién con la sesión verificada
+import pandas as pd
+from datetime import datetime
+from utils.almacen_sql import backend_sql, cargar_base_sql
+from utils.data_loader import cargar_datos, cargar_indice, cargar_indice_texto, ordenar_posiciones, seleccionar_leads
+from utils.exportacion import FORMATOS_EXPORTACION, descartar_exportacion, exportar_bloques, exportar_leads
+from utils.figuras import figura_efectividad, figura_estado_tipo_cliente, figura_tendencia, figura_tipo_cliente
+from utils.instrumentacion import cerrar_medicion, etapa, iniciar_medicion
+from utils.metricas import calcular_metricas
+from utils.series import agrupar_por_periodo, cargar_series, consultar_series
+
+# Copy-on-Write de pandas: las vistas del dataset compartido (ver cargar_datos) no copian datos hasta que se modifican
+pd.set_option("mode.copy_on_write", True)
+
+# Medir las etapas de esta ejecución si el modo diagnóstico está activo
+iniciar_medicion("Detalles")
+
 # Título principal
 st.title("🔍 Información detallada de Leads")
 st.markdown("Visualización con opciones avanzadas de filtrado y análisis")
 
-# Cargar datos
-df = cargar_datos()
+# Con el backend SQL (PORTAL_BACKEND=sqlite) filtros, conteos y páginas de la tabla se consultan a la base;
+# si no, se cargan los datos, el índice de filtros y el de búsqueda por texto
+usar_sql = backend_sql()
+if usar_sql:
+    base = cargar_base_sql()
+    version = base.version
+    fecha_min, fecha_max = (fecha.date() for fecha in base.rango_fechas())
+else:
+    df = cargar_datos()
+    indice = cargar_indice(df)
+    indice_texto = cargar_indice_texto(df)
+    version = df.attrs["version"]
+    fecha_min = df["FechaIngreso"].min().date()
+    fecha_max = df["FechaIngreso"].max().date()
+
+# Función para obtener los valores disponibles de un filtro
+def valores_disponibles(columna):
+    if usar_sql:
+        return base.valores(columna)
+    return df[columna].unique().tolist()
 
 # Panel de filtros en la barra lateral
 st.sidebar.header("Filtros Avanzados")
 
 # Filtro de fechas
-fecha_min = df["FechaIngreso"].min().date()
-fecha_max = df["FechaIngreso"].max().date()
 
 fecha_inicio = st.sidebar.date_input(
     "Fecha inicial",
@@ -57,14 +86,14 @@ fecha_fin_dt = datetime.combine(fecha_fin, datetime.max.time())
 col1_sidebar, col2_sidebar = st.sidebar.columns(2)
 
 with col1_sidebar:
-    servicios_disponibles = df["Servicio"].unique().tolist()
+    servicios_disponibles = valores_disponibles("Servicio")
     servicios_seleccionados = st.multiselect(
         "Servicios",
         options=servicios_disponibles,
         default=servicios_disponibles
     )
 
-    estados_disponibles = df["Estado"].unique().tolist()
+    estados_disponibles = valores_disponibles("Estado")
     estados_seleccionados = st.multiselect(
         "Estados",
         options=estados_disponibles,
@@ -72,14 +101,14 @@ with col1_sidebar:
     )
 
 with col2_sidebar:
-    canales_disponibles = df["CanalOrigen"].unique().tolist()
+    canales_disponibles = valores_disponibles("CanalOrigen")
     canales_seleccionados = st.multiselect(
         "Canales",
         options=canales_disponibles,
         default=canales_disponibles
     )
     
-    tipos_cliente_disponibles = df["TipoDeCliente"].unique().tolist()
+    tipos_cliente_disponibles = valores_disponibles("TipoDeCliente")
     tipos_cliente_seleccionados = st.multiselect(
         "Tipo de Cliente",
         options=tipos_cliente_disponibles,
@@ -90,27 +119,41 @@ with col2_sidebar:
 texto_busqueda = st.sidebar.text_input("Búsqueda por texto (nombre, email, notas)", "")
 
 # Aplicar filtros
-df_filtrado = aplicar_filtros(
-    df,
+filtros = dict(
     fecha_inicio=fecha_inicio_dt,
     fecha_fin=fecha_fin_dt,
     servicios=servicios_seleccionados,
     canales=canales_seleccionados,
-    estados=estados_seleccionados
+    estados=estados_seleccionados,
+    tipos_cliente=tipos_cliente_seleccionados
 )
 
-# Filtrar por tipo de cliente
-if tipos_cliente_seleccionados and len(tipos_cliente_seleccionados) > 0:
-    df_filtrado = df_filtrado[df_filtrado["TipoDeCliente"].isin(tipos_cliente_seleccionados)]
-
-# Filtrar por texto de búsqueda
-if texto_busqueda:
-    texto_busqueda = texto_busqueda.lower()
-    df_filtrado = df_filtrado[
-        df_filtrado["Nombre"].str.lower().str.contains(texto_busqueda) |
-        df_filtrado["Email"].str.lower().str.contains(texto_busqueda) |
-        df_filtrado["Notas"].str.lower().str.contains(texto_busqueda)
-    ]
+# Dimensiones de los conteos de los que salen las métricas y los gráficos por categoría
+dimensiones_conteo = ["Servicio", "CanalOrigen", "Estado", "TipoDeCliente"]
+
+if usar_sql:
+    # La búsqueda por texto también se resuelve en la base (literal, sin distinguir mayúsculas ni acentos)
+    filtros_sql = dict(filtros, texto=texto_busqueda)
+    conteos = base.consultar(dimensiones_conteo, **filtros_sql)
+else:
+    seleccion = seleccionar_leads(df, indice=indice, **filtros)
+    
+    # Filtrar por texto de búsqueda (literal, sin distinguir mayúsculas ni acentos)
+    with etapa("filtros"):
+        if texto_busqueda:
+            df_filtrado = df.iloc[indice_texto.buscar(texto_busqueda, seleccion.posiciones)]
+        else:
+            df_filtrado = seleccion.datos
+    
+    with etapa("agregacion"):
+        conteos = df_filtrado.groupby(dimensiones_conteo, observed=True).size().reset_index(name="CantidadLeads")
+
+# Total de leads filtrados y leads de cada valor de una columna
+total_leads = int(conteos["CantidadLeads"].sum())
+
+# Función para sumar los leads filtrados con un valor en una columna
+def leads_con(columna, valor):
+    return int(conteos.loc[conteos[columna].astype(str) == valor, "CantidadLeads"].sum())
 
 # Opciones de visualización
 st.sidebar.header("Opciones de Visualización")
@@ -122,9 +165,6 @@ ordenar_por = st.sidebar.selectbox(
 )
 orden_ascendente = st.sidebar.checkbox("Orden ascendente", value=False)
 
-# Ordenar datos
-df_filtrado = df_filtrado.sort_values(by=ordenar_por, ascending=orden_ascendente)
-
 # Opciones de análisis
 st.header("Opciones de Análisis")
 tipo_analisis = st.radio(
@@ -139,111 +179,65 @@ if tipo_analisis == "Métricas Generales":
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Leads", len(df_filtrado))
+        st.metric("Total Leads", total_leads)
     
     with col2:
-        leads_chatbot = len(df_filtrado[df_filtrado["CanalOrigen"] == "Chatbot"])
-        porcentaje_chatbot = leads_chatbot / len(df_filtrado) if len(df_filtrado) > 0 else 0
+        leads_chatbot = leads_con("CanalOrigen", "Chatbot")
+        porcentaje_chatbot = leads_chatbot / total_leads if total_leads > 0 else 0
         st.metric("Leads por Chatbot", leads_chatbot, f"{porcentaje_chatbot:.1%}")
         
     with col3:
-        leads_whatsapp = len(df_filtrado[df_filtrado["CanalOrigen"] == "WhatsApp"])
-        porcentaje_whatsapp = leads_whatsapp / len(df_filtrado) if len(df_filtrado) > 0 else 0
+        leads_whatsapp = leads_con("CanalOrigen", "WhatsApp")
+        porcentaje_whatsapp = leads_whatsapp / total_leads if total_leads > 0 else 0
         st.metric("Leads por WhatsApp", leads_whatsapp, f"{porcentaje_whatsapp:.1%}")
     
     with col4:
-        leads_asesorados = len(df_filtrado[df_filtrado["Estado"] == "Asesorado"])
-        tasa_efectividad = leads_asesorados / len(df_filtrado) if len(df_filtrado) > 0 else 0
+        leads_asesorados = leads_con("Estado", "Asesorado")
+        tasa_efectividad = leads_asesorados / total_leads if total_leads > 0 else 0
         st.metric("Tasa de Efectividad", f"{tasa_efectividad:.1%}")
     
-    # Gráfico de tendencia diaria
-    st.subheader("Tendencia Diaria de Leads")
-    
-    # Crear columna de fecha sin hora
-    df_filtrado["FechaSinHora"] = df_filtrado["FechaIngreso"].dt.date
+    # Gráfico de tendencia, con la resolución que corresponde al rango elegido (ver utils/figuras.py)
+    st.subheader("Tendencia de Leads")
     
-    # Agrupar por fecha
-    leads_por_dia = df_filtrado.groupby("FechaSinHora").size().reset_index(name="CantidadLeads")
-    
-    # Crear gráfico de líneas
-    fig = px.line(
-        leads_por_dia,
-        x="FechaSinHora",
-        y="CantidadLeads",
-        title="Evolución de Leads por Día",
-        markers=True
-    )
+    # Función para contar los leads filtrados por período
+    def contar_por_periodo(resolucion):
+        # Sin búsqueda por texto alcanzan las series precalculadas; con ella se agrupan los leads encontrados
+        if usar_sql:
+            return base.tendencia(resolucion, [], **filtros_sql)
+        if texto_busqueda:
+            return agrupar_por_periodo(df_filtrado, resolucion, [])
+        return consultar_series(cargar_series(), resolucion, [], **filtros)
     
     # Mostrar gráfico
-    st.plotly_chart(fig, use_container_width=True)
+    fig_tendencia = figura_tendencia(version, filtros, texto_busqueda, contar_por_periodo)
+    with etapa("serializacion"):
+        st.plotly_chart(fig_tendencia, use_container_width=True)
 
 elif tipo_analisis == "Análisis por Tipo de Cliente":
-    # Análisis por tipo de cliente
-    tipo_cliente_counts = df_filtrado["TipoDeCliente"].value_counts().reset_index()
-    tipo_cliente_counts.columns = ["TipoDeCliente", "Cantidad"]
-    
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("Distribución por Tipo de Cliente")
-        fig_pie = px.pie(
-            tipo_cliente_counts,
-            values="Cantidad",
-            names="TipoDeCliente",
-            title="Distribución por Tipo de Cliente",
-            hole=0.4
-        )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        fig_tipo_cliente = figura_tipo_cliente(version, filtros, texto_busqueda, conteos)
+        with etapa("serializacion"):
+            st.plotly_chart(fig_tipo_cliente, use_container_width=True)
     
     with col2:
         st.subheader("Estado por Tipo de Cliente")
-        estado_tipo_cliente = df_filtrado.groupby(["TipoDeCliente", "Estado"]).size().reset_index(name="Cantidad")
-        
-        fig_bar = px.bar(
-            estado_tipo_cliente,
-            x="TipoDeCliente",
-            y="Cantidad",
-            color="Estado",
-            title="Estado de Leads por Tipo de Cliente",
-            barmode="group",
-            color_discrete_map={
-                "Asesorado": "#00CC96",
-                "Pendiente": "#FFA15A",
-                "Descartado": "#EF553B"
-            }
-        )
-        st.plotly_chart(fig_bar, use_container_width=True)
+        fig_estado_tipo_cliente = figura_estado_tipo_cliente(version, filtros, texto_busqueda, conteos)
+        with etapa("serializacion"):
+            st.plotly_chart(fig_estado_tipo_cliente, use_container_width=True)
 
 else:  # Análisis de Efectividad
     st.subheader("Análisis de Efectividad por Servicio y Canal")
     
-    # Calcular métricas de efectividad
-    efectividad = df_filtrado.groupby(["Servicio", "CanalOrigen"]).agg(
-        Total=("FechaIngreso", "count"),
-        Asesorados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Asesorado")),
-        Pendientes=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Pendiente")),
-        Descartados=pd.NamedAgg(column="Estado", aggfunc=lambda x: sum(x == "Descartado"))
-    ).reset_index()
-    
-    # Calcular tasa de efectividad
-    efectividad["TasaEfectividad"] = efectividad["Asesorados"] / efectividad["Total"]
-    
-    # Crear gráfico de barras para tasa de efectividad
-    fig_efectividad = px.bar(
-        efectividad,
-        x="Servicio",
-        y="TasaEfectividad",
-        color="CanalOrigen",
-        title="Tasa de Efectividad por Servicio y Canal",
-        barmode="group",
-        text_auto=".1%"
-    )
-    
-    # Configurar formato de porcentaje
-    fig_efectividad.update_layout(yaxis_tickformat=".1%")
-    
     # Mostrar gráfico
-    st.plotly_chart(fig_efectividad, use_container_width=True)
+    fig_efectividad = figura_efectividad(version, filtros, texto_busqueda, conteos)
+    with etapa("serializacion"):
+        st.plotly_chart(fig_efectividad, use_container_width=True)
+    
+    # Calcular métricas de efectividad para la tabla
+    efectividad = calcular_metricas(conteos, ["Servicio", "CanalOrigen"], pesos="CantidadLeads", canales=[])
     
     # Mostrar tabla de efectividad
     st.subheader("Tabla de Efectividad")
@@ -252,20 +246,21 @@ else:  # Análisis de Efectividad
     efectividad["TasaEfectividad"] = efectividad["TasaEfectividad"].apply(lambda x: f"{x:.1%}")
     
     # Mostrar tabla
-    st.dataframe(
-        efectividad,
-        column_config={
-            "Servicio": "Tipo de Servicio",
-            "CanalOrigen": "Canal de Origen",
-            "Total": st.column_config.NumberColumn("Total Leads", format="%d"),
-            "Asesorados": st.column_config.NumberColumn("Asesorados", format="%d"),
-            "Pendientes": st.column_config.NumberColumn("Pendientes", format="%d"),
-            "Descartados": st.column_config.NumberColumn("Descartados", format="%d"),
-            "TasaEfectividad": "Tasa de Efectividad"
-        },
-        use_container_width=True,
-        hide_index=True
-    )
+    with etapa("serializacion"):
+        st.dataframe(
+            efectividad,
+            column_config={
+                "Servicio": "Tipo de Servicio",
+                "CanalOrigen": "Canal de Origen",
+                "Total": st.column_config.NumberColumn("Total Leads", format="%d"),
+                "Asesorados": st.column_config.NumberColumn("Asesorados", format="%d"),
+                "Pendientes": st.column_config.NumberColumn("Pendientes", format="%d"),
+                "Descartados": st.column_config.NumberColumn("Descartados", format="%d"),
+                "TasaEfectividad": "Tasa de Efectividad"
+            },
+            use_container_width=True,
+            hide_index=True
+        )
 
 # Mostrar datos crudos si está habilitado
 if mostrar_raw_data:
@@ -277,33 +272,76 @@ if mostrar_raw_data:
         "Servicio", "CanalOrigen", "Estado", "TipoDeCliente", "Clasificacion", "Notas"
     ]
     
-    # Mostrar datos en formato de tabla con configuración personalizada
-    st.dataframe(
-        df_filtrado[columnas_a_mostrar],
-        column_config={
-            "FechaIngreso": st.column_config.DatetimeColumn("Fecha y Hora", format="DD/MM/YYYY HH:mm"),
-            "Nombre": "Nombre",
-            "Telefono": "Teléfono",
-            "Email": "Correo Electrónico",
-            "Servicio": "Tipo de Servicio",
-            "CanalOrigen": "Canal de Origen",
-            "Estado": "Estado",
-            "TipoDeCliente": "Tipo de Cliente",
-            "Clasificacion": "Clasificación",
-            "Notas": st.column_config.TextColumn("Notas", width="large")
-        },
-        hide_index=True,
-        use_container_width=True
-    )
+    # Ordenar datos: solo se calcula el orden, las filas se toman página por página
+    if not usar_sql:
+        orden = ordenar_posiciones(df_filtrado, ordenar_por, orden_ascendente)
+    
+    # Controles de paginación
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        filas_por_pagina = st.selectbox("Filas por página", options=[25, 50, 100, 250], index=1)
+    total_paginas = max(1, -(-total_leads // filas_por_pagina))
+    with col2:
+        pagina = st.number_input("Página", min_value=1, max_value=total_paginas, value=1, step=1)
+    inicio_pagina = (pagina - 1) * filas_por_pagina
+    fin_pagina = min(inicio_pagina + filas_por_pagina, total_leads)
+    with col3:
+        st.caption(f"Mostrando leads {inicio_pagina + 1 if total_leads else 0}–{fin_pagina} de {total_leads} (página {pagina} de {total_paginas})")
+    
+    # Tomar solo las filas de la página actual
+    if usar_sql:
+        filas_pagina = base.leer(columnas_a_mostrar, ordenar_por, orden_ascendente, filas_por_pagina, inicio_pagina, **filtros_sql)
+    else:
+        filas_pagina = df_filtrado.iloc[orden[inicio_pagina:fin_pagina]][columnas_a_mostrar]
+    
+    # Mostrar solo la página actual en formato de tabla con configuración personalizada
+    with etapa("serializacion"):
+        st.dataframe(
+            filas_pagina,
+            column_config={
+                "FechaIngreso": st.column_config.DatetimeColumn("Fecha y Hora", format="DD/MM/YYYY HH:mm"),
+                "Nombre": "Nombre",
+                "Telefono": "Teléfono",
+                "Email": "Correo Electrónico",
+                "Servicio": "Tipo de Servicio",
+                "CanalOrigen": "Canal de Origen",
+                "Estado": "Estado",
+                "TipoDeCliente": "Tipo de Cliente",
+                "Clasificacion": "Clasificación",
+                "Notas": st.column_config.TextColumn("Notas", width="large")
+            },
+            hide_index=True,
+            use_container_width=True
+        )
 
-    # Exportar datos
-    csv = df_filtrado.to_csv(index=False).encode('utf-8')
-    st.download_button(
-        label="Descargar datos como CSV",
-        data=csv,
-        file_name=f"leads_sps_{fecha_inicio}_al_{fecha_fin}.csv",
-        mime="text/csv",
-    )
+    # Exportar datos: el archivo se genera recién cuando se pide, por bloques
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        formato_exportacion = st.selectbox("Formato de exportación", options=list(FORMATOS_EXPORTACION))
+    extension, tipo_mime = FORMATOS_EXPORTACION[formato_exportacion]
+    
+    # El botón de descarga se muestra solo en la ejecución que generó el archivo: download_button
+    # lo copia a memoria al mostrarse, y con él ya copiado el archivo en disco se borra. Cualquier
+    # cambio posterior (filtros, orden, formato) vuelve a ejecutar la página y lo descarta.
+    # Descargar no vuelve a ejecutar la página, así el botón sigue disponible.
+    with col2:
+        if st.button("Preparar exportación"):
+            with st.spinner("Generando archivo..."):
+                if usar_sql:
+                    ruta_exportacion = exportar_bloques(base.bloques(None, ordenar_por, orden_ascendente, **filtros_sql), formato_exportacion)
+                else:
+                    ruta_exportacion = exportar_leads(df_filtrado, formato_exportacion, orden)
+            try:
+                with open(ruta_exportacion, "rb") as archivo_exportado:
+                    st.download_button(
+                        label=f"Descargar datos como {formato_exportacion}",
+                        data=archivo_exportado,
+                        file_name=f"leads_sps_{fecha_inicio}_al_{fecha_fin}.{extension}",
+                        mime=tipo_mime,
+                        on_click="ignore",
+                    )
+            finally:
+                descartar_exportacion(ruta_exportacion)
 
 # Sección de información adicional
 with st.expander("ℹ️ Información sobre esta página"):
@@ -317,12 +355,16 @@ with st.expander("ℹ️ Información sobre esta página"):
     - **Filtros avanzados:** Permite filtrar por fechas, servicios, canales, estados y tipos de cliente.
     - **Búsqueda por texto:** Facilita la localización de leads específicos por nombre, email o contenido de notas.
     - **Tipos de análisis:** Ofrece diferentes vistas analíticas (métricas generales, análisis por tipo de cliente, análisis de efectividad).
-    - **Exportación de datos:** Permite descargar los datos filtrados en formato CSV para análisis externos.
+    - **Datos detallados paginados:** La tabla muestra una página de leads por vez, ordenada según "Ordenar por".
+    - **Exportación de datos:** Permite descargar los datos filtrados en CSV, CSV comprimido o Parquet para análisis externos; el archivo se genera al pedirlo.
     
     #### Notas:
     - Esta página está diseñada para usuarios avanzados que necesitan un análisis más detallado de los datos.
     - En futuras versiones, se implementará la conexión directa a la API de Tactica para obtener datos en tiempo real.
     """)
 
+# Panel de diagnóstico (solo administradores)
+cerrar_medicion()
+
 # Pie de página
 st.markdown("---")
\ No newline at end of file
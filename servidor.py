@@ -0,0 +1,32 @@
+"""
+Arranca el portal con las cachés precalentadas.
+
+Si secrets.toml tiene la sección [tactica], primero agrega a leads.csv los leads
+nuevos de la API (ver utils/tactica.py). Antes de aceptar la primera sesión carga
+los leads y arma las figuras de la vista por defecto de cada página (ver
+utils/precalentamiento.py), así el primer usuario después de un despliegue no paga
+la carga de datos, las agregaciones ni el armado de los gráficos. Acepta las mismas opciones que streamlit run.
+
+Uso (desde la raíz del proyecto):
+    python servidor.py --server.port 8501
+"""
+import sys
+import pandas as pd
+from streamlit.web import cli
+from utils.precalentamiento import precalentar
+from utils.tactica import crear_cliente, sincronizar_leads, tactica_configurada
+
+if __name__ == "__main__":
+    # Copy-on-Write de pandas, como en las páginas: el precalentamiento carga los mismos datos compartidos
+    pd.set_option("mode.copy_on_write", True)
+
+    if tactica_configurada():
+        print(f"Sincronizados {sincronizar_leads(crear_cliente())} leads nuevos de Tactica", flush=True)
+
+    for pagina, resultado in precalentar().items():
+        estado = f"errores: {resultado['errores']}" if resultado["errores"] else "ok"
+        print(f"Precalentado {pagina} en {resultado['segundos']:.2f} s ({estado})", flush=True)
+
+    # El servidor corre en este mismo proceso, con las cachés ya cargadas
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,46 @@
+"""
+Datos compartidos por las pruebas: leads sintéticos generados con benchmarks/generador.py.
+"""
+import pandas as pd
+import pytest
+from benchmarks.generador import generar_leads
+from utils.data_loader import enriquecer_datos
+
+# Leads crudos de prueba: 90 días, con varios leads por minuto en la franja pico
+@pytest.fixture(scope="session")
+def leads_crudos():
+    return generar_leads(20_000, semilla=7, inicio="2025-03-01", dias=90)
+
+# Los mismos leads enriquecidos en modo compacto (categóricas), como los devuelve cargar_datos
+@pytest.fixture(scope="session")
+def leads(leads_crudos):
+    return enriquecer_datos(leads_crudos)
+
+# Filtro de referencia hecho con pandas fila por fila, sin índices ni tramos
+def filtrar_con_pandas(df, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None, estados=None,
+                       tipos_cliente=None, excluir_domingos=False):
+    mascara = pd.Series(True, index=df.index)
+    if fecha_inicio is not None:
+        mascara &= df["FechaIngreso"] >= pd.Timestamp(fecha_inicio)
+    if fecha_fin is not None:
+        mascara &= df["FechaIngreso"] <= pd.Timestamp(fecha_fin)
+    for columna, valores in (("Servicio", servicios), ("CanalOrigen", canales), ("Estado", estados),
+                             ("TipoDeCliente", tipos_cliente)):
+        if valores:
+            mascara &= df[columna].isin(valores)
+    if excluir_domingos:
+        mascara &= df["FechaIngreso"].dt.dayofweek != 6
+    return df[mascara]
+
+# Inicio del período de cada fecha calculado con los períodos de pandas (semanas de lunes a domingo)
+def periodo_con_pandas(fechas, resolucion):
+    frecuencias = {"5min": "5min", "30min": "30min", "hora": "h", "dia": "D"}
+    if resolucion in frecuencias:
+        return fechas.dt.floor(frecuencias[resolucion])
+    return fechas.dt.to_period("W-SUN" if resolucion == "semana" else "M").dt.start_time
+
+# Conteo de referencia por período y dimensiones sobre los leads que pasan el filtro de pandas
+def contar_por_periodo_con_pandas(df, resolucion, dimensiones, **filtros):
+    seleccion = filtrar_con_pandas(df, **filtros)
+    claves = [periodo_con_pandas(seleccion["FechaIngreso"], resolucion).rename("Periodo"), *(seleccion[columna] for columna in dimensiones)]
+    return seleccion.groupby(claves, observed=True).size().reset_index(name="CantidadLeads")
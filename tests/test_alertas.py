@@ -0,0 +1,132 @@
+"""
+Pruebas del detector de caudales fuera de rango: umbrales, línea base contra pandas y actualización incremental.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_alertas.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import filtrar_con_pandas
+from utils.alertas import MINIMO_OBSERVACIONES, PESO_MINIMO, UMBRAL_DESVIOS, DetectorCaudal
+from utils.series import agrupar_por_periodo
+
+# Bloque vigilado de las pruebas: los lunes de 18:00 a 18:30 (código 36), desde el lunes 6 de enero
+LUNES = pd.Timestamp("2025-01-06 18:10")
+LINEA = (0, 36, "SPSCare")
+
+# Función para registrar una cantidad de leads por semana en el bloque de prueba y cerrar el último
+def registrar_semanas(cantidades, servicio="SPSCare"):
+    detector = DetectorCaudal()
+    for semana, cantidad in enumerate(cantidades):
+        detector.registrar(LUNES + pd.Timedelta(weeks=semana), servicio, cantidad)
+    # Un lead fuera de la franja al día siguiente cierra el último bloque
+    detector.registrar(LUNES + pd.Timedelta(weeks=len(cantidades) - 1, days=1, hours=-8), servicio)
+    return detector
+
+def test_sin_alertas_antes_del_minimo_de_observaciones():
+    detector = registrar_semanas([5] * (MINIMO_OBSERVACIONES - 1) + [100])
+
+    assert detector.alertas().empty
+    assert detector.lineas[LINEA][0] == MINIMO_OBSERVACIONES
+
+@pytest.mark.parametrize("media, cantidad, tipo", [
+    # Sin varianza, el desvío se mide con la raíz de la media (Poisson): 16 ± 3 * 4
+    (16, 16 + 4 * UMBRAL_DESVIOS, "Por encima"),
+    (16, 16 + 4 * UMBRAL_DESVIOS - 1, None),
+    (16, 16 - 4 * UMBRAL_DESVIOS, "Por debajo"),
+    (16, 16 - 4 * UMBRAL_DESVIOS + 1, None),
+    # Con media menor que 1 el desvío se mide con 1
+    (0, UMBRAL_DESVIOS, "Por encima"),
+    (0, UMBRAL_DESVIOS - 1, None)
+])
+def test_umbral_de_desvios(media, cantidad, tipo):
+    detector = registrar_semanas([media] * MINIMO_OBSERVACIONES + [cantidad])
+    alertas = detector.alertas()
+
+    if tipo is None:
+        assert alertas.empty
+    else:
+        assert alertas[["Inicio", "Servicio", "CantidadLeads", "Esperado", "Tipo"]].to_dict("records") == [{
+            "Inicio": pd.Timestamp("2025-01-06 18:00") + pd.Timedelta(weeks=MINIMO_OBSERVACIONES),
+            "Servicio": "SPSCare", "CantidadLeads": cantidad, "Esperado": media, "Tipo": tipo
+        }]
+        assert abs(alertas.loc[0, "Desvios"]) == pytest.approx(UMBRAL_DESVIOS)
+
+def test_bloque_sin_leads_cuenta_como_caida():
+    detector = registrar_semanas([20] * MINIMO_OBSERVACIONES)
+    # El lunes siguiente el servicio no tiene leads en el bloque; otro lead posterior lo cierra
+    detector.registrar(LUNES + pd.Timedelta(weeks=MINIMO_OBSERVACIONES, hours=4), "Vehicular")
+    alertas = detector.alertas()
+
+    assert alertas[["Servicio", "CantidadLeads", "Tipo"]].to_dict("records") == [
+        {"Servicio": "SPSCare", "CantidadLeads": 0, "Tipo": "Por debajo"}
+    ]
+    # La varianza (0) queda por debajo de la media: se mide con raíz de 20
+    assert alertas.loc[0, "Desvios"] == pytest.approx(-20 / np.sqrt(20))
+
+def test_linea_base_igual_a_media_y_varianza_mientras_pesan_igual():
+    # Hasta 1 / PESO_MINIMO observaciones la línea base es la media y la varianza poblacional (Welford)
+    cantidades = np.random.default_rng(3).poisson(8, size=round(1 / PESO_MINIMO)).tolist()
+    detector = registrar_semanas(cantidades)
+    observaciones, media, varianza = detector.lineas[LINEA]
+
+    assert observaciones == len(cantidades)
+    assert media == pytest.approx(pd.Series(cantidades).mean())
+    assert varianza == pytest.approx(pd.Series(cantidades).var(ddof=0))
+
+def test_linea_base_igual_a_ewm_despues():
+    # Con las primeras observaciones iguales la línea base arranca sin varianza, como ewm de pandas
+    inicio = round(1 / PESO_MINIMO)
+    resto = np.random.default_rng(5).poisson(8, size=30).tolist()
+    detector = registrar_semanas([8] * inicio + resto)
+    observaciones, media, varianza = detector.lineas[LINEA]
+
+    ewm = pd.Series([8, *resto], dtype=float).ewm(alpha=PESO_MINIMO, adjust=False)
+    assert observaciones == inicio + len(resto)
+    assert media == pytest.approx(ewm.mean().iloc[-1])
+    assert varianza == pytest.approx(ewm.var(bias=True).iloc[-1])
+
+# Conteos de prueba con la interfaz que usa DetectorCaudal.actualizar, resueltos con pandas sobre los leads
+class ConteosLeads:
+    def __init__(self, df):
+        self.df = df
+        self.version = len(df)
+
+    def rango_fechas(self):
+        return self.df["FechaIngreso"].min().normalize(), self.df["FechaIngreso"].max().normalize()
+
+    def tendencia(self, resolucion, dimensiones, **filtros):
+        return agrupar_por_periodo(filtrar_con_pandas(self.df, **filtros), resolucion, dimensiones)
+
+# Función para comparar las líneas base de dos detectores (mismas claves, mismas estadísticas)
+def comparar_lineas(lineas, esperadas):
+    assert lineas.keys() == esperadas.keys()
+    for clave, (observaciones, media, varianza) in esperadas.items():
+        assert lineas[clave] == [observaciones, pytest.approx(media), pytest.approx(varianza)]
+
+def test_actualizar_por_partes_igual_a_actualizar_todo(leads):
+    completo = DetectorCaudal()
+    completo.actualizar(ConteosLeads(leads))
+
+    # Cortes a mitad de un bloque vigilado (el día se vuelve a leer), fuera de la franja y en un domingo
+    incremental = DetectorCaudal()
+    for corte in ["2025-03-20 18:10", "2025-03-20 19:45", "2025-04-06 11:00", "2025-05-02 20:59"]:
+        incremental.actualizar(ConteosLeads(leads[leads["FechaIngreso"] < pd.Timestamp(corte)]))
+    incremental.actualizar(ConteosLeads(leads))
+
+    comparar_lineas(incremental.lineas, completo.lineas)
+    pd.testing.assert_frame_equal(incremental.alertas(), completo.alertas())
+    assert not completo.alertas().empty
+
+def test_registrar_lead_por_lead_igual_a_consumir_conteos(leads):
+    por_conteos = DetectorCaudal()
+    por_conteos.consumir(agrupar_por_periodo(leads, "30min", ["Servicio"]))
+
+    por_lead = DetectorCaudal()
+    for fecha, servicio in zip(leads["FechaIngreso"], leads["Servicio"].astype(str)):
+        por_lead.registrar(fecha, servicio)
+
+    # El último bloque queda abierto en los dos: se comparan los cerrados
+    comparar_lineas(por_lead.lineas, por_conteos.lineas)
+    pd.testing.assert_frame_equal(por_lead.alertas(), por_conteos.alertas())
@@ -0,0 +1,87 @@
+"""
+Pruebas de la base SQLite de los leads contra filtros y agrupaciones de pandas.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_almacen_sql.py
+"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import contar_por_periodo_con_pandas, filtrar_con_pandas
+from utils.almacen_sql import BaseLeadsSQL, _construir_base, _ruta_base
+from utils.data_loader import ordenar_posiciones, version_datos
+from utils.indices import COLUMNAS_TEXTO, normalizar_texto
+
+# Formato con el que se escribe el CSV de origen (igual que sincronizar_leads)
+FORMATO_CSV = dict(index=False, date_format="%Y-%m-%d %H:%M:%S", lineterminator="\n")
+
+@pytest.fixture(scope="module")
+def base(leads_crudos, tmp_path_factory):
+    # La base se arma desde el snapshot en .cache/, relativo al directorio de trabajo
+    directorio = tmp_path_factory.mktemp("sql")
+    with pytest.MonkeyPatch.context() as parche:
+        parche.chdir(directorio)
+        leads_crudos.to_csv("leads.csv", **FORMATO_CSV)
+        version = version_datos("leads.csv")
+        _construir_base("leads.csv", _ruta_base("leads.csv"), version)
+        return BaseLeadsSQL(os.path.abspath(_ruta_base("leads.csv")), version)
+
+# Función para pasar un resultado a una forma comparable (categorías como texto)
+def _comparable(df):
+    return df.astype({columna: str for columna in df.select_dtypes("category").columns})
+
+# Filtros con los dos extremos (a mitad de un minuto), con uno solo y sin fechas
+FILTROS = [
+    dict(),
+    dict(fecha_inicio="2025-03-10 18:31:30", fecha_fin="2025-04-02 20:15:00", excluir_domingos=True),
+    dict(fecha_inicio="2025-05-01", servicios=["SPSCare", "Vehicular"], canales=["WhatsApp"]),
+    dict(fecha_fin="2025-03-31 23:59:59", estados=["Pendiente", "Descartado"], tipos_cliente=["Cliente"])
+]
+
+@pytest.mark.parametrize("dimensiones", [
+    ["FechaIngreso"],
+    ["DiaCodigo", "HoraIngreso"],
+    ["Servicio", "Estado"],
+    ["Bloque30min", "CanalOrigen"]
+])
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_consultar_igual_a_groupby(leads, base, dimensiones, filtros):
+    seleccion = filtrar_con_pandas(leads, **filtros).derivadas.agregar("HoraIngreso", "Bloque30min", "DiaCodigo")
+    seleccion = seleccion.assign(FechaIngreso=seleccion["FechaIngreso"].dt.normalize())
+    esperado = seleccion.groupby(dimensiones, observed=True).size().reset_index(name="CantidadLeads")
+
+    pd.testing.assert_frame_equal(_comparable(base.consultar(dimensiones, **filtros)), _comparable(esperado), check_dtype=False)
+
+@pytest.mark.parametrize("resolucion, dimensiones", [("hora", []), ("dia", ["Servicio"]), ("semana", ["Estado"]), ("mes", [])])
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_tendencia_igual_a_groupby(leads, base, resolucion, dimensiones, filtros):
+    esperado = contar_por_periodo_con_pandas(leads, resolucion, dimensiones, **filtros)
+
+    pd.testing.assert_frame_equal(
+        _comparable(base.tendencia(resolucion, dimensiones, **filtros)), _comparable(esperado), check_dtype=False
+    )
+
+@pytest.mark.parametrize("texto", ["", "gómez", "MEDICA", "lucia.1", "no existe"])
+def test_contar_con_texto_igual_a_contains(leads, base, texto):
+    filtros = dict(fecha_inicio="2025-04-01", servicios=["AlarmaHogar", "SPSCare"])
+    seleccion = filtrar_con_pandas(leads, **filtros)
+    consulta = normalizar_texto(pd.Series([texto])).iloc[0]
+    coincide = np.zeros(len(seleccion), dtype=bool)
+    for columna in COLUMNAS_TEXTO:
+        coincide |= normalizar_texto(seleccion[columna]).str.contains(consulta, regex=False).to_numpy()
+
+    assert base.contar(texto=texto, **filtros) == coincide.sum()
+
+@pytest.mark.parametrize("ordenar_por, ascendente", [("FechaIngreso", True), ("FechaIngreso", False), ("Estado", False), ("Servicio", True)])
+def test_leer_igual_a_ordenar_posiciones(leads, base, ordenar_por, ascendente):
+    filtros = dict(fecha_inicio="2025-03-15", fecha_fin="2025-04-15 12:00:00", canales=["Chatbot"])
+    columnas = ["FechaIngreso", "Servicio", "Nombre", "Estado"]
+    seleccion = filtrar_con_pandas(leads, **filtros).reset_index(drop=True)
+    orden = ordenar_posiciones(seleccion, ordenar_por, ascendente)
+    esperado = seleccion.iloc[orden[100:150]][columnas].reset_index(drop=True)
+
+    pagina = base.leer(columnas, ordenar_por, ascendente, limite=50, desplazamiento=100, **filtros)
+
+    assert base.contar(**filtros) == len(seleccion)
+    pd.testing.assert_frame_equal(_comparable(pagina), _comparable(esperado), check_dtype=False)
@@ -0,0 +1,53 @@
+"""
+Pruebas del cubo de conteos contra agrupaciones de pandas sobre los leads.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_cubo.py
+"""
+import pandas as pd
+import pytest
+from conftest import filtrar_con_pandas
+from utils.cubo import DIMENSIONES_CUBO, combinar_cubos, construir_cubo, consultar_cubo
+
+@pytest.fixture(scope="module")
+def cubo(leads):
+    return construir_cubo(leads)
+
+# Conteo de referencia: filtro fila por fila y groupby sobre los leads con sus columnas derivadas
+def contar_con_pandas(df, dimensiones, **filtros):
+    seleccion = filtrar_con_pandas(df, **filtros).derivadas.agregar("HoraIngreso", "DiaSemana", "DiaCodigo", "Bloque30min")
+    return seleccion.groupby(dimensiones, observed=True).size().reset_index(name="CantidadLeads")
+
+# Los filtros de fecha del cubo son por día: se prueban rangos de días completos, abiertos o sin fechas
+FILTROS = [
+    dict(),
+    dict(fecha_inicio="2025-03-10", fecha_fin="2025-04-20 23:59:59.999999", excluir_domingos=True),
+    dict(fecha_inicio="2025-05-01", servicios=["SPSCare", "Vehicular"], canales=["WhatsApp", "Chatbot"]),
+    dict(fecha_fin="2025-03-31 23:59:59.999999", estados=["Pendiente"], tipos_cliente=["Cliente"])
+]
+
+@pytest.mark.parametrize("dimensiones", [
+    ["HoraIngreso"],
+    ["DiaCodigo"],
+    ["DiaCodigo", "HoraIngreso"],
+    ["Servicio", "CanalOrigen", "Estado"],
+    ["Bloque30min", "TipoDeCliente"]
+])
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_consultar_cubo_igual_a_groupby(leads, cubo, dimensiones, filtros):
+    resultado = consultar_cubo(cubo, dimensiones, **filtros)
+    esperado = contar_con_pandas(leads, dimensiones, **filtros)
+
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False, check_categorical=False)
+
+def test_combinar_cubos_igual_a_construir_todo(leads, cubo):
+    # Dos tandas partidas a mitad de un día, como un CSV al que se le agregan filas
+    corte = leads["FechaIngreso"].searchsorted(pd.Timestamp("2025-04-15 12:00"))
+    combinado = combinar_cubos(construir_cubo(leads.iloc[:corte]), construir_cubo(leads.iloc[corte:]))
+
+    pd.testing.assert_frame_equal(
+        combinado.sort_values(DIMENSIONES_CUBO, ignore_index=True),
+        cubo.sort_values(DIMENSIONES_CUBO, ignore_index=True),
+        check_dtype=False, check_categorical=False
+    )
+    assert combinado["Cantidad"].sum() == len(leads)
@@ -0,0 +1,160 @@
+"""
+Pruebas de la carga de leads: filtros por tramo de fechas contra un filtro de pandas y
+snapshot incremental contra una lectura completa del CSV.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_data_loader.py
+"""
+import os
+import pandas as pd
+import pytest
+from conftest import filtrar_con_pandas
+from utils import data_loader
+from utils.data_loader import AGREGADOS, enriquecer_datos, leer_fuente, rango_posiciones, seleccionar_leads
+# Registra los agregados del cubo y de las series, que el snapshot mantiene al día
+import utils.cubo
+
+# Rangos con los dos extremos, con uno solo y sin ninguno (los bordes caen en minutos con varios leads)
+RANGOS = [
+    ("2025-03-10 18:31:00", "2025-04-02 20:15:00"),
+    ("2025-04-20", None),
+    (None, "2025-03-15 23:59:59"),
+    (None, None),
+    ("2025-05-01", "2025-04-01")
+]
+
+@pytest.mark.parametrize("fecha_inicio, fecha_fin", RANGOS)
+def test_rango_posiciones_igual_a_filtrar(leads, fecha_inicio, fecha_fin):
+    inicio, fin = rango_posiciones(leads, fecha_inicio, fecha_fin)
+    esperado = filtrar_con_pandas(leads, fecha_inicio, fecha_fin)
+
+    assert fin - inicio == len(esperado)
+    assert leads.index[inicio:fin].equals(esperado.index)
+
+@pytest.mark.parametrize("fecha_inicio, fecha_fin", RANGOS)
+def test_seleccionar_leads_igual_a_filtrar(leads, fecha_inicio, fecha_fin):
+    filtros = dict(servicios=["AlarmaHogar", "SPSCare"], estados=["Pendiente"], excluir_domingos=True)
+    seleccion = seleccionar_leads(leads, fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, **filtros)
+    esperado = filtrar_con_pandas(leads, fecha_inicio, fecha_fin, **filtros)
+
+    pd.testing.assert_frame_equal(seleccion.datos, esperado)
+
+# Formato con el que se escribe el CSV de origen (igual que sincronizar_leads)
+FORMATO_CSV = dict(index=False, date_format="%Y-%m-%d %H:%M:%S", lineterminator="\n")
+
+# Función para pasar un agregado a una forma comparable (sin categorías y en un orden fijo)
+def _comparable(agregado):
+    agregado = agregado.astype({columna: str for columna in agregado.select_dtypes("category").columns})
+    return agregado.sort_values(list(agregado.columns), ignore_index=True)
+
+# Función para comprobar que el snapshot y sus agregados son los de una lectura completa del CSV
+def _comprobar_igual_a_leer_todo(ruta, df):
+    esperado = enriquecer_datos(leer_fuente(ruta))
+    # El texto vacío vuelve del Parquet como None y del CSV como NaN
+    textos = esperado.select_dtypes(object).columns
+    esperado[textos] = esperado[textos].astype(object).where(esperado[textos].notna(), None)
+    pd.testing.assert_frame_equal(df, esperado, check_categorical=False)
+    for nombre, (construir, _) in AGREGADOS.items():
+        guardado = data_loader._leer_agregado(ruta, True, nombre)
+        pd.testing.assert_frame_equal(_comparable(guardado), _comparable(construir(esperado)), check_dtype=False)
+
+# Función para sincronizar el snapshot e informar cómo se comparó con lo ya ingerido
+def _sincronizar(ruta):
+    _, ruta_meta = data_loader._rutas_snapshot(ruta, True)
+    situacion, _ = data_loader._comparar_con_snapshot(
+        ruta, ruta_meta, data_loader._leer_meta(ruta_meta), os.stat(ruta)
+    )
+    return situacion, data_loader._sincronizar_snapshot(ruta, True), data_loader._leer_meta(ruta_meta)
+
+def test_filas_agregadas_se_ingieren_como_otra_parte(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # El corte cae a mitad de un minuto con varios leads
+    corte = 12_345
+    leads_crudos.iloc[:corte].to_csv("leads.csv", **FORMATO_CSV)
+    situacion, _, meta = _sincronizar("leads.csv")
+    assert situacion == "cambiado" and len(meta["partes"]) == 1
+
+    leads_crudos.iloc[corte:].to_csv("leads.csv", mode="a", header=False, **FORMATO_CSV)
+    situacion, df, meta = _sincronizar("leads.csv")
+
+    assert situacion == "agregadas"
+    assert len(meta["partes"]) == 2
+    _comprobar_igual_a_leer_todo("leads.csv", df)
+    pd.testing.assert_frame_equal(data_loader._sincronizar_snapshot("leads.csv", True), df, check_categorical=False)
+
+def test_filas_agregadas_fuera_de_orden_reescriben_el_snapshot(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    leads_crudos.iloc[5_000:].to_csv("leads.csv", **FORMATO_CSV)
+    _sincronizar("leads.csv")
+
+    # Leads con fecha anterior a la última ingerida: se reordena todo en una sola parte
+    leads_crudos.iloc[:5_000].to_csv("leads.csv", mode="a", header=False, **FORMATO_CSV)
+    situacion, df, meta = _sincronizar("leads.csv")
+
+    assert situacion == "agregadas"
+    assert len(meta["partes"]) == 1
+    assert df["FechaIngreso"].is_monotonic_increasing
+    _comprobar_igual_a_leer_todo("leads.csv", df)
+
+def test_filas_modificadas_reconstruyen_el_snapshot(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    leads_crudos.to_csv("leads.csv", **FORMATO_CSV)
+    _sincronizar("leads.csv")
+
+    # Mismo tamaño de archivo con un lead ya ingerido cambiado de estado (Pendiente -> Asesorado)
+    modificados = leads_crudos.copy()
+    modificados.loc[modificados.index[modificados["Estado"] == "Pendiente"][10], "Estado"] = "Asesorado"
+    modificados.to_csv("leads.csv", **FORMATO_CSV)
+    situacion, df, meta = _sincronizar("leads.csv")
+
+    assert situacion == "cambiado"
+    assert len(meta["partes"]) == 1
+    assert (df["Estado"] == "Asesorado").sum() == (leads_crudos["Estado"] == "Asesorado").sum() + 1
+    _comprobar_igual_a_leer_todo("leads.csv", df)
+
+# Función para leer el snapshot escrito por bloques como lo hace la carga de los leads
+def _leer_snapshot(ruta, meta):
+    directorio, _ = data_loader._rutas_snapshot(ruta, True)
+    return data_loader._leer_partes(directorio, meta)
+
+def test_sincronizar_en_bloques_igual_a_leer_todo(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # El primer bloque no tiene notas: la columna no puede quedar con tipo nulo para los siguientes
+    crudos = leads_crudos.copy()
+    crudos.loc[:2_999, "Notas"] = None
+    crudos.to_csv("leads.csv", **FORMATO_CSV)
+
+    meta = data_loader.sincronizar_en_bloques("leads.csv", filas_por_bloque=3_000)
+
+    assert len(meta["partes"]) == 1
+    assert meta["ordenado"]
+    _comprobar_igual_a_leer_todo("leads.csv", _leer_snapshot("leads.csv", meta))
+
+def test_sincronizar_en_bloques_fuera_de_orden(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # La segunda mitad del período está antes en el archivo que la primera
+    mitad = len(leads_crudos) // 2
+    pd.concat([leads_crudos.iloc[mitad:], leads_crudos.iloc[:mitad]]).to_csv("leads.csv", **FORMATO_CSV)
+
+    meta = data_loader.sincronizar_en_bloques("leads.csv", filas_por_bloque=4_000)
+
+    assert not meta["ordenado"]
+    _comprobar_igual_a_leer_todo("leads.csv", _leer_snapshot("leads.csv", meta))
+
+def test_sincronizar_en_bloques_compacta_las_partes(leads_crudos, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(data_loader, "MAXIMO_PARTES", 3)
+    tandas = [leads_crudos.iloc[i:i + 4_000] for i in range(0, len(leads_crudos), 4_000)]
+    tandas[0].to_csv("leads.csv", **FORMATO_CSV)
+    meta = data_loader.sincronizar_en_bloques("leads.csv", filas_por_bloque=1_500)
+
+    # Cada tanda agregada al CSV suma una parte, hasta pasar el máximo y unirse en una sola
+    cantidades = [len(meta["partes"])]
+    for tanda in tandas[1:]:
+        tanda.to_csv("leads.csv", mode="a", header=False, **FORMATO_CSV)
+        meta = data_loader.sincronizar_en_bloques("leads.csv", filas_por_bloque=1_500)
+        cantidades.append(len(meta["partes"]))
+
+    assert cantidades == [1, 2, 3, 1, 2]
+    assert sorted(os.listdir(data_loader._rutas_snapshot("leads.csv", True)[0])) == sorted(meta["partes"])
+    _comprobar_igual_a_leer_todo("leads.csv", _leer_snapshot("leads.csv", meta))
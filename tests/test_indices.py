@@ -0,0 +1,88 @@
+"""
+Pruebas de los índices de los filtros contra comparaciones fila por fila de pandas.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_indices.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import filtrar_con_pandas
+from utils.data_loader import seleccionar_leads
+from utils.indices import COLUMNAS_TEXTO, SIMBOLO_MAXIMO, IndiceBitmap, IndiceTexto, normalizar_texto
+
+@pytest.fixture(scope="module")
+def indice(leads):
+    return IndiceBitmap(leads)
+
+# Selecciones con pocos valores, con la mayoría (se niega el OR de los excluidos), con todos y con uno inexistente
+@pytest.mark.parametrize("columna, valores", [
+    ("Servicio", ["Vehicular"]),
+    ("Servicio", ["AlarmaHogar", "Alarma+Cam", "Alarma+Cerco", "SPSCare", "Alarma+Cam+Cerco", "Vehicular"]),
+    ("Estado", ["Asesorado", "Pendiente", "Descartado"]),
+    ("CanalOrigen", ["Chatbot", "NoExiste"]),
+    ("DiaSemana", [5, 6])
+])
+def test_mascara_igual_a_isin(leads, indice, columna, valores):
+    inicio, fin = 1234, 15678
+    mascara = indice.mascara(columna, valores, inicio, fin)
+    esperado = leads.derivadas[columna].iloc[inicio:fin].isin(valores).to_numpy()
+
+    if mascara is None:
+        # None significa que el filtro no descarta ninguna fila
+        assert esperado.all()
+    else:
+        np.testing.assert_array_equal(mascara, esperado)
+
+def test_seleccion_con_indice_igual_a_filtrar(leads, indice):
+    filtros = dict(
+        fecha_inicio="2025-03-20", fecha_fin="2025-05-10 21:00:00", servicios=["SPSCare", "BLACKKEY"],
+        canales=["WhatsApp"], tipos_cliente=["Cliente", "Prospecto"], excluir_domingos=True
+    )
+    seleccion = seleccionar_leads(leads, indice=indice, **filtros)
+    esperado = filtrar_con_pandas(leads, **filtros)
+
+    assert seleccion.cantidad == len(esperado)
+    np.testing.assert_array_equal(seleccion.posiciones, esperado.index.to_numpy())
+    pd.testing.assert_frame_equal(seleccion.datos, esperado)
+
+@pytest.fixture(scope="module")
+def indice_texto(leads):
+    return IndiceTexto(leads)
+
+# Búsqueda de referencia: contains literal sobre cada columna de texto normalizada
+def buscar_con_pandas(df, texto, columnas=COLUMNAS_TEXTO):
+    consulta = normalizar_texto(pd.Series([texto])).iloc[0]
+    coincide = np.zeros(len(df), dtype=bool)
+    for columna in columnas:
+        coincide |= normalizar_texto(df[columna]).str.contains(consulta, regex=False).to_numpy()
+    return np.flatnonzero(coincide)
+
+# Textos de uno, dos y tres caracteres, con mayúsculas y acentos, que no aparecen y vacíos
+@pytest.mark.parametrize("texto", [
+    "", "a", "ñ", "án", "GAR", "garcía", "Pérez", "lucia.", "@example.com", "Interesado en",
+    "médica spscare", "zzq", "ana.12", "Díaz Méndez"
+])
+def test_buscar_igual_a_contains(leads, indice_texto, texto):
+    np.testing.assert_array_equal(indice_texto.buscar(texto), buscar_con_pandas(leads, texto))
+
+def test_buscar_dentro_de_posiciones(leads, indice_texto):
+    posiciones = seleccionar_leads(leads, fecha_inicio="2025-04-01", servicios=["SPSCare"]).posiciones
+    esperado = np.intersect1d(posiciones, buscar_con_pandas(leads, "Gómez"))
+
+    np.testing.assert_array_equal(indice_texto.buscar("Gómez", posiciones), esperado)
+
+def test_buscar_con_mas_caracteres_que_simbolos():
+    # Más caracteres distintos que símbolos: los últimos comparten el símbolo máximo, y el
+    # trigrama de tres símbolos máximos tiene la clave más alta que entra en int64
+    caracteres = [chr(0x4E00 + i) for i in range(SIMBOLO_MAXIMO + 50)]
+    df = pd.DataFrame({
+        "Nombre": ["".join(caracteres[i:i + 5]) for i in range(0, len(caracteres), 5)] + ["".join(caracteres[-5:])],
+        "Email": "a@example.com",
+        "Notas": None
+    })
+    indice_texto = IndiceTexto(df)
+
+    assert not indice_texto.exacto
+    for texto in ["".join(caracteres[-3:]), "".join(caracteres[-7:-4]), caracteres[-1], "".join(caracteres[10:14])]:
+        np.testing.assert_array_equal(indice_texto.buscar(texto), buscar_con_pandas(df, texto))
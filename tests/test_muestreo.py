@@ -0,0 +1,112 @@
+"""
+Pruebas de la reducción de series con LTTB y del presupuesto de puntos de los gráficos de líneas.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_muestreo.py
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from utils.muestreo import PRESUPUESTO_PUNTOS, UMBRAL_WEBGL, grafico_lineas, lttb, reducir_puntos
+
+# LTTB de referencia escrito punto por punto, como en la descripción original del algoritmo (Steinarsson, 2013)
+def lttb_de_referencia(x, y, puntos):
+    n = len(x)
+    tamano = (n - 2) / (puntos - 2)
+    elegidos = [0]
+    anterior = 0
+    for i in range(puntos - 2):
+        inicio, fin = int(i * tamano) + 1, int((i + 1) * tamano) + 1
+        siguiente_fin = min(int((i + 2) * tamano) + 1, n)
+        x_medio = sum(x[fin:siguiente_fin]) / (siguiente_fin - fin)
+        y_medio = sum(y[fin:siguiente_fin]) / (siguiente_fin - fin)
+        mayor_area, mayor = -1, inicio
+        for j in range(inicio, fin):
+            area = abs((x[anterior] - x_medio) * (y[j] - y[anterior]) - (x[anterior] - x[j]) * (y_medio - y[anterior])) / 2
+            if area > mayor_area:
+                mayor_area, mayor = area, j
+        elegidos.append(mayor)
+        anterior = mayor
+    return elegidos + [n - 1]
+
+# Serie de prueba: conteos con ruido, un pico y un valle aislados
+def serie(n, semilla=0):
+    y = np.random.default_rng(semilla).poisson(20, size=n).astype(float)
+    y[n // 3] = 200
+    y[2 * n // 3] = -50
+    return np.arange(n, dtype=float), y
+
+@pytest.mark.parametrize("n, puntos", [(10, 3), (10, 9), (101, 10), (1000, 37), (5000, 500), (5000, 4999)])
+def test_lttb_igual_a_referencia(n, puntos):
+    x, y = serie(n)
+    elegidos = lttb(x, y, puntos)
+
+    assert elegidos.tolist() == lttb_de_referencia(x.tolist(), y.tolist(), puntos)
+    assert len(elegidos) == puntos
+    assert elegidos[0] == 0 and elegidos[-1] == n - 1
+    assert (np.diff(elegidos) > 0).all()
+
+@pytest.mark.parametrize("puntos", [3, 20, 100])
+def test_lttb_conserva_el_pico_y_el_valle(puntos):
+    n = 10_000
+    x, y = serie(n, semilla=1)
+    elegidos = lttb(x, y, puntos).tolist()
+
+    # Con un solo tramo intermedio queda el punto más alejado de la recta entre los extremos: el pico
+    assert n // 3 in elegidos
+    if puntos > 3:
+        assert 2 * n // 3 in elegidos
+
+def test_lttb_con_fechas_igual_que_con_numeros():
+    x, y = serie(2000, semilla=2)
+    fechas = pd.date_range("2025-03-01", periods=2000, freq="5min").to_numpy()
+
+    assert lttb(fechas, y, 100).tolist() == lttb(x, y, 100).tolist()
+
+@pytest.mark.parametrize("puntos", [0, 2, 50, 60])
+def test_lttb_sin_reduccion_devuelve_todos(puntos):
+    x, y = serie(50)
+    assert lttb(x, y, puntos).tolist() == list(range(50))
+
+# Trazas de largos distintos, desordenadas por x, como las devuelven los groupby
+def trazas(largos):
+    partes = []
+    for numero, largo in enumerate(largos):
+        x, y = serie(largo, semilla=numero)
+        partes.append(pd.DataFrame({"Periodo": pd.date_range("2025-01-01", periods=largo, freq="h"), "Cantidad": y,
+                                    "Servicio": f"Servicio {numero}"}))
+    return pd.concat(partes, ignore_index=True).sample(frac=1, random_state=0)
+
+@pytest.mark.parametrize("largos, presupuesto", [
+    ([5000], 2000),
+    ([3000, 3000, 3000], 2000),
+    ([10, 4000, 700], 1000),
+    ([400] * 7, 21)
+])
+def test_reducir_puntos_respeta_el_presupuesto(largos, presupuesto):
+    df = trazas(largos)
+    color = "Servicio" if len(largos) > 1 else None
+    reducido = reducir_puntos(df, "Periodo", "Cantidad", color, presupuesto)
+
+    assert len(reducido) <= presupuesto
+    assert reducido.index.isin(df.index).all()
+    for servicio, traza in reducido.groupby("Servicio"):
+        original = df[df["Servicio"] == servicio]
+        # Cada traza ordenada por x, con sus extremos y su pico; las cortas se conservan enteras
+        assert traza["Periodo"].is_monotonic_increasing
+        assert traza["Periodo"].iloc[[0, -1]].tolist() == [original["Periodo"].min(), original["Periodo"].max()]
+        assert traza["Cantidad"].max() == original["Cantidad"].max()
+        if len(original) <= presupuesto // len(largos):
+            assert len(traza) == len(original)
+
+def test_reducir_puntos_dentro_del_presupuesto_no_cambia_nada():
+    df = trazas([300, 200])
+    assert reducir_puntos(df, "Periodo", "Cantidad", "Servicio", 1000) is df
+
+# Con pocos puntos el gráfico queda en SVG; reducido al presupuesto sigue por encima de UMBRAL_WEBGL
+@pytest.mark.parametrize("largos, webgl", [([100, 200], False), ([5000, 5000], PRESUPUESTO_PUNTOS > UMBRAL_WEBGL)])
+def test_grafico_lineas_dentro_del_presupuesto(largos, webgl):
+    fig = grafico_lineas(trazas(largos), x="Periodo", y="Cantidad", color="Servicio")
+
+    assert sum(len(traza.x) for traza in fig.data) <= PRESUPUESTO_PUNTOS
+    assert all((traza.type == "scattergl") == webgl for traza in fig.data)
@@ -0,0 +1,82 @@
+"""
+Pruebas de las series por período contra agrupaciones de pandas sobre los leads.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_series.py
+"""
+import pandas as pd
+import pytest
+from conftest import contar_por_periodo_con_pandas, periodo_con_pandas
+from utils.series import RESOLUCIONES, combinar_series, construir_series, consultar_series, periodos
+
+@pytest.fixture(scope="module")
+def series(leads):
+    return construir_series(leads)
+
+# Los filtros de fecha de las series son por día: se prueban rangos de días completos
+def rango(fecha_inicio=None, fecha_fin=None):
+    filtros = {}
+    if fecha_inicio is not None:
+        filtros["fecha_inicio"] = fecha_inicio
+    if fecha_fin is not None:
+        filtros["fecha_fin"] = f"{fecha_fin} 23:59:59.999999"
+    return filtros
+
+# Rangos con los bordes en distintas posiciones de la semana (de lunes a domingo) y del mes
+RANGOS = [
+    rango(),
+    rango("2025-03-05", "2025-04-17"),  # miércoles a jueves, los dos a mitad de mes
+    rango("2025-03-03", "2025-04-06"),  # lunes a domingo: semanas completas
+    rango("2025-04-01", "2025-04-30"),  # un mes completo
+    rango("2025-03-31", "2025-05-01"),  # último día de un mes al primero de otro
+    rango("2025-03-11", "2025-03-13"),  # dentro de una misma semana
+    rango("2025-04-08", "2025-04-24"),  # dentro de un mismo mes, cruzando semanas
+    rango("2025-03-16", "2025-03-17"),  # domingo y lunes: dos semanas, un día de cada una
+    rango("2025-03-20"),                # solo inicio, a mitad de semana y de mes
+    rango(fecha_fin="2025-04-09")       # solo fin, a mitad de semana y de mes
+]
+
+def test_periodos_igual_a_periodos_de_pandas(leads):
+    for resolucion in RESOLUCIONES:
+        pd.testing.assert_series_equal(
+            periodos(leads["FechaIngreso"], resolucion),
+            periodo_con_pandas(leads["FechaIngreso"], resolucion),
+            check_names=False
+        )
+
+@pytest.mark.parametrize("resolucion", ["semana", "mes"])
+@pytest.mark.parametrize("filtros", RANGOS)
+def test_bordes_de_semanas_y_meses_igual_a_groupby(leads, series, resolucion, filtros):
+    resultado = consultar_series(series, resolucion, [], **filtros)
+    esperado = contar_por_periodo_con_pandas(leads, resolucion, [], **filtros)
+
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False)
+
+@pytest.mark.parametrize("resolucion", ["semana", "mes"])
+@pytest.mark.parametrize("filtros", [
+    dict(rango("2025-03-05", "2025-04-17"), excluir_domingos=True),
+    dict(rango("2025-03-16", "2025-05-02"), servicios=["SPSCare", "Vehicular"], canales=["WhatsApp", "Chatbot"]),
+    dict(rango("2025-04-08", "2025-04-24"), estados=["Pendiente"], tipos_cliente=["Cliente"])
+])
+def test_bordes_con_filtros_y_dimensiones_igual_a_groupby(leads, series, resolucion, filtros):
+    dimensiones = ["Servicio", "Estado"]
+    resultado = consultar_series(series, resolucion, dimensiones, **filtros)
+    esperado = contar_por_periodo_con_pandas(leads, resolucion, dimensiones, **filtros)
+
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False, check_categorical=False)
+
+@pytest.mark.parametrize("resolucion", ["30min", "hora", "dia"])
+def test_resoluciones_finas_igual_a_groupby(leads, series, resolucion):
+    filtros = dict(rango("2025-03-05", "2025-04-17"), excluir_domingos=True)
+    resultado = consultar_series(series, resolucion, ["CanalOrigen"], **filtros)
+    esperado = contar_por_periodo_con_pandas(leads, resolucion, ["CanalOrigen"], **filtros)
+
+    pd.testing.assert_frame_equal(resultado, esperado, check_dtype=False, check_categorical=False)
+
+def test_combinar_series_igual_a_construir_todo(leads, series):
+    # Dos tandas partidas a mitad de una semana y de un mes, como un CSV al que se le agregan filas
+    corte = leads["FechaIngreso"].searchsorted(pd.Timestamp("2025-04-16 12:00"))
+    combinadas = combinar_series(construir_series(leads.iloc[:corte]), construir_series(leads.iloc[corte:]))
+
+    pd.testing.assert_frame_equal(combinadas, series, check_dtype=False, check_categorical=False)
+    assert (combinadas.groupby("Resolucion", observed=True)["Cantidad"].sum() == len(leads)).all()
@@ -0,0 +1,174 @@
+"""
+Pruebas del cliente de Tactica contra un servidor HTTP local que imita la API.
+
+Uso (desde la raíz del proyecto):
+    python -m pytest tests/test_tactica.py
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+import pytest
+import requests
+from tenacity import wait_none
+from utils import data_loader
+from utils.tactica import ClienteTactica, sincronizar_leads
+
+# Columnas de los leads, en el orden de leads.csv
+COLUMNAS = ["FechaIngreso", "Servicio", "CanalOrigen", "Nombre", "Telefono", "Email", "Estado",
+            "TipoDeCliente", "Clasificacion", "Notas", "Agente"]
+
+# Función para armar leads de prueba, uno cada 10 minutos desde el inicio
+def armar_leads(cantidad, inicio="2025-05-01 08:00:00"):
+    fechas = pd.date_range(inicio, periods=cantidad, freq="10min")
+    return [
+        {
+            "FechaIngreso": fecha.isoformat(), "Servicio": ["AlarmaHogar", "Alarma+Cam"][i % 2],
+            "CanalOrigen": ["Chatbot", "WhatsApp"][i % 2], "Nombre": f"Lead {i}", "Telefono": 110000000 + i,
+            "Email": f"lead{i}@example.com", "Estado": "Pendiente", "TipoDeCliente": "Prospecto",
+            "Clasificacion": "No Clasificado", "Notas": "Sin notas", "Agente": "Sofía"
+        }
+        for i, fecha in enumerate(fechas)
+    ]
+
+# Servidor de prueba: pagina los leads, puede omitir "total" y fallar una cantidad de veces por página
+class ServidorTactica:
+    def __init__(self, leads, con_total=True, fallas=None, codigo_falla=503):
+        self.leads = leads
+        self.con_total = con_total
+        self.fallas = dict(fallas or {})
+        self.codigo_falla = codigo_falla
+        self.pedidos = []
+        self._candado = threading.Lock()
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parametros = {clave: valores[0] for clave, valores in parse_qs(urlparse(self.path).query).items()}
+                pagina, por_pagina = int(parametros["pagina"]), int(parametros["por_pagina"])
+                with servidor._candado:
+                    servidor.pedidos.append(pagina)
+                    fallar = servidor.fallas.get(pagina, 0) > 0
+                    if fallar:
+                        servidor.fallas[pagina] -= 1
+                if fallar:
+                    self.send_response(servidor.codigo_falla)
+                    self.end_headers()
+                    return
+
+                desde, hasta = pd.Timestamp(parametros["desde"]), pd.Timestamp(parametros["hasta"])
+                rango = [lead for lead in servidor.leads if desde <= pd.Timestamp(lead["FechaIngreso"]) <= hasta]
+                contenido = {"data": rango[(pagina - 1) * por_pagina:pagina * por_pagina], "error": False, "mensaje": ""}
+                if servidor.con_total:
+                    contenido["total"] = len(rango)
+                cuerpo = json.dumps(contenido).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.http.server_address[1]}"
+        self._hilo = threading.Thread(target=self.http.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+@pytest.fixture
+def servidor(request):
+    # Los parámetros del servidor se pasan con @pytest.mark.parametrize(..., indirect=True)
+    opciones = getattr(request, "param", {})
+    servidor = ServidorTactica(armar_leads(opciones.pop("cantidad", 1234)), **opciones)
+    yield servidor
+    servidor.cerrar()
+
+@pytest.fixture(autouse=True)
+def sin_espera(monkeypatch):
+    # Los reintentos no esperan entre intentos durante las pruebas
+    monkeypatch.setattr(ClienteTactica.obtener_pagina.retry, "wait", wait_none())
+
+RANGO = (pd.Timestamp("2025-05-01"), pd.Timestamp("2025-06-01"))
+
+@pytest.mark.parametrize("servidor", [{"con_total": True}, {"con_total": False}], indirect=True)
+def test_descarga_todas_las_paginas(servidor):
+    cliente = ClienteTactica(servidor.url, tamano_pagina=100, maximo_hilos=4)
+    leads = cliente.descargar_leads(*RANGO)
+    cliente.cerrar()
+
+    assert len(leads) == 1234
+    assert leads["FechaIngreso"].is_monotonic_increasing
+    assert leads["Nombre"].nunique() == 1234
+    assert set(range(1, 14)) <= set(servidor.pedidos)
+
+@pytest.mark.parametrize("servidor", [{"con_total": False, "cantidad": 1200}], indirect=True)
+def test_sin_total_se_detiene_en_la_pagina_vacia(servidor):
+    cliente = ClienteTactica(servidor.url, tamano_pagina=100, maximo_hilos=4)
+    leads = cliente.descargar_leads(*RANGO)
+    cliente.cerrar()
+
+    assert len(leads) == 1200
+    # La página 13 vuelve vacía: la tanda que la contiene es la última que se pide
+    assert max(servidor.pedidos) <= 16
+
+@pytest.mark.parametrize("servidor", [{"fallas": {1: 1, 3: 2}}], indirect=True)
+def test_reintenta_errores_transitorios(servidor):
+    cliente = ClienteTactica(servidor.url, tamano_pagina=100, maximo_hilos=4)
+    leads = cliente.descargar_leads(*RANGO)
+    cliente.cerrar()
+
+    assert len(leads) == 1234
+    assert servidor.pedidos.count(1) == 2
+    assert servidor.pedidos.count(3) == 3
+
+@pytest.mark.parametrize("servidor", [{"fallas": {2: 1}, "codigo_falla": 404}], indirect=True)
+def test_no_reintenta_errores_del_cliente(servidor):
+    cliente = ClienteTactica(servidor.url, tamano_pagina=100, maximo_hilos=4)
+    with pytest.raises(requests.HTTPError):
+        cliente.descargar_leads(*RANGO)
+    cliente.cerrar()
+
+    assert servidor.pedidos.count(2) == 1
+
+@pytest.mark.parametrize("servidor", [{"cantidad": 300}], indirect=True)
+def test_sincronizar_agrega_solo_los_leads_nuevos(servidor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    previos = pd.DataFrame(servidor.leads[:120], columns=COLUMNAS)
+    previos["FechaIngreso"] = pd.to_datetime(previos["FechaIngreso"])
+    previos.to_csv("leads.csv", index=False)
+    cliente = ClienteTactica(servidor.url, tamano_pagina=50, maximo_hilos=4)
+
+    assert sincronizar_leads(cliente, hasta=RANGO[1], ruta="leads.csv") == 180
+    # Una segunda sincronización no duplica leads
+    assert sincronizar_leads(cliente, hasta=RANGO[1], ruta="leads.csv") == 0
+    cliente.cerrar()
+
+    # El snapshot incorpora los leads nuevos como una parte más, sin reconstruirse
+    leads = data_loader._sincronizar_snapshot("leads.csv", True)
+    meta = data_loader._leer_meta(data_loader._rutas_snapshot("leads.csv", True)[1])
+    assert len(leads) == 300
+    assert leads["Nombre"].tolist() == [f"Lead {i}" for i in range(300)]
+    assert len(meta["partes"]) == 2
+
+@pytest.mark.parametrize("servidor", [{"cantidad": 300}], indirect=True)
+def test_sincronizar_no_pierde_leads_del_mismo_minuto_que_el_ultimo(servidor, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Los leads 119 y 120 comparten el minuto, pero el archivo solo tiene hasta el 119
+    servidor.leads[120]["FechaIngreso"] = servidor.leads[119]["FechaIngreso"]
+    previos = pd.DataFrame(servidor.leads[:120], columns=COLUMNAS)
+    previos["FechaIngreso"] = pd.to_datetime(previos["FechaIngreso"])
+    previos.to_csv("leads.csv", index=False)
+    cliente = ClienteTactica(servidor.url, tamano_pagina=50, maximo_hilos=4)
+
+    assert sincronizar_leads(cliente, hasta=RANGO[1], ruta="leads.csv") == 180
+    assert sincronizar_leads(cliente, hasta=RANGO[1], ruta="leads.csv") == 0
+    cliente.cerrar()
+
+    leads = data_loader._sincronizar_snapshot("leads.csv", True)
+    assert leads["Nombre"].tolist() == [f"Lead {i}" for i in range(300)]
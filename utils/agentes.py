@@ -0,0 +1,63 @@
+import json
+import os
+import pandas as pd
+import streamlit as st
+
+# Resumen por agente exportado del CRM. Los leads no traen la atribución por agente con la
+# que el CRM arma sus contadores, así que el resumen no se puede calcular a partir de ellos
+RUTA_RESUMEN = "resumen.json"
+
+# Función para identificar la versión del resumen por agente
+def version_resumen_agentes(ruta_resumen=RUTA_RESUMEN):
+    """
+    Devuelve una clave que cambia cuando cambia el resumen por agente.
+
+    Args:
+        ruta_resumen (str): Ruta del resumen exportado del CRM
+
+    Returns:
+        int: Fecha de modificación de resumen.json (None si no existe)
+    """
+    return os.stat(ruta_resumen).st_mtime_ns if os.path.exists(ruta_resumen) else None
+
+# Función para leer el resumen por agente exportado del CRM
+def leer_resumen_json(ruta_resumen=RUTA_RESUMEN):
+    """
+    Lee resumen.json, que ya trae la fila de totales.
+
+    Args:
+        ruta_resumen (str): Ruta del resumen exportado del CRM
+
+    Returns:
+        DataFrame: Columna Agente y los contadores
+
+    Raises:
+        ValueError: Si el resumen viene marcado con error (con su mensaje)
+    """
+    with open(ruta_resumen, 'r') as json_file:
+        resumen_data = json.load(json_file)
+    if resumen_data['error']:
+        raise ValueError(resumen_data['mensaje'])
+    return pd.DataFrame(resumen_data['data'])
+
+# Función para obtener el resumen por agente de la versión actual de resumen.json
+def cargar_resumen_agentes(ruta_resumen=RUTA_RESUMEN):
+    """
+    Devuelve el resumen de leads por agente tal como lo exporta el CRM, con la fila de totales.
+
+    El archivo se lee una vez por versión y el resultado se comparte entre sesiones.
+
+    Args:
+        ruta_resumen (str): Ruta del resumen exportado del CRM
+
+    Returns:
+        DataFrame: Columna Agente y los contadores del CRM
+
+    Raises:
+        ValueError: Si resumen.json viene marcado con error
+    """
+    return _resumen_version(ruta_resumen, version_resumen_agentes(ruta_resumen))
+
+@st.cache_resource(max_entries=2)
+def _resumen_version(ruta_resumen, version):
+    return leer_resumen_json(ruta_resumen)
@@ -0,0 +1,188 @@
+import math
+import threading
+from collections import deque
+import pandas as pd
+import streamlit as st
+from utils.data_loader import RUTA_LEADS
+
+# Bloques de 30 minutos vigilados: de 17:00 a 21:30 (códigos 34 a 42, como en la página por horario)
+BLOQUES_VIGILADOS = range(34, 43)
+
+# Bloques de 30 minutos por día
+BLOQUES_POR_DIA = 48
+
+# Duración de un bloque en nanosegundos (los bloques se numeran desde 1970-01-01, que fue jueves)
+BLOQUE_NS = 30 * 60 * 10**9
+
+# Peso mínimo de cada observación en la línea base: con 1/12 pesan sobre todo las últimas ~12 semanas
+PESO_MINIMO = 1 / 12
+
+# Observaciones (semanas) que necesita una línea base antes de poder marcar alertas
+MINIMO_OBSERVACIONES = 4
+
+# Desvíos respecto de lo esperado a partir de los cuales un bloque se marca como alerta
+UMBRAL_DESVIOS = 3.0
+
+# Alertas que se conservan (las más recientes)
+MAXIMO_ALERTAS = 1000
+
+# Función para obtener el primer bloque vigilado que empieza en el bloque dado o después
+def _proximo_vigilado(bloque):
+    dia, codigo = divmod(bloque, BLOQUES_POR_DIA)
+    if codigo > BLOQUES_VIGILADOS[-1]:
+        dia, codigo = dia + 1, BLOQUES_VIGILADOS[0]
+    return dia * BLOQUES_POR_DIA + max(codigo, BLOQUES_VIGILADOS[0])
+
+class DetectorCaudal:
+    """
+    Detecta bloques de 30 minutos de la franja vigilada con un caudal de leads fuera de rango.
+
+    Mantiene una línea base (media y varianza) por día de la semana, bloque y servicio,
+    que se actualiza en O(1) cada vez que se cierra un bloque: las primeras observaciones
+    pesan igual (Welford) y, pasadas 1 / PESO_MINIMO, la media y la varianza pasan a ser
+    móviles exponenciales. Un bloque se cierra cuando llega un lead de un bloque
+    posterior; los servicios sin leads en el bloque cuentan como cero, así también se
+    detectan las caídas. Los leads de un bloque ya cerrado no cambian su línea base.
+    """
+
+    def __init__(self):
+        # Reentrante: actualizar consume los conteos con el candado ya tomado
+        self._candado = threading.RLock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        # Estado vacío: sin bloque abierto, líneas base ni alertas
+        self.abierto = None
+        self.cantidades = {}
+        self.servicios = set()
+        self.lineas = {}
+        self.alertas_recientes = deque(maxlen=MAXIMO_ALERTAS)
+        self.version = None
+        self.primera_fecha = None
+
+    def _avanzar(self, bloque):
+        # Cierra, en orden, todos los bloques vigilados anteriores al dado
+        if self.abierto is None:
+            self.abierto = _proximo_vigilado(bloque)
+            return
+        while self.abierto < bloque:
+            self._cerrar()
+            self.abierto = _proximo_vigilado(self.abierto + 1)
+
+    def _cerrar(self):
+        # Compara el bloque abierto con la línea base de cada servicio y la actualiza
+        dia, codigo = divmod(self.abierto, BLOQUES_POR_DIA)
+        dia_semana = (dia + 3) % 7
+        for servicio in self.servicios:
+            cantidad = self.cantidades.get(servicio, 0)
+            linea = self.lineas.setdefault((dia_semana, codigo, servicio), [0, 0.0, 0.0])
+            observaciones, media, varianza = linea
+
+            if observaciones >= MINIMO_OBSERVACIONES:
+                # La varianza de un conteo es al menos su media (Poisson) y nunca menor que 1
+                desvios = (cantidad - media) / math.sqrt(max(varianza, media, 1.0))
+                if abs(desvios) >= UMBRAL_DESVIOS:
+                    self.alertas_recientes.append((self.abierto, servicio, cantidad, media, desvios))
+
+            observaciones += 1
+            peso = max(1 / observaciones, PESO_MINIMO)
+            diferencia = cantidad - media
+            media += peso * diferencia
+            varianza = (1 - peso) * (varianza + peso * diferencia * diferencia)
+            linea[:] = [observaciones, media, varianza]
+        self.cantidades = {}
+
+    def registrar(self, fecha, servicio, cantidad=1):
+        """
+        Suma leads ingresados en una fecha; cierra los bloques vigilados anteriores.
+
+        Args:
+            fecha (datetime): FechaIngreso de los leads
+            servicio (str): Servicio de los leads
+            cantidad (int): Cantidad de leads
+        """
+        with self._candado:
+            bloque = pd.Timestamp(fecha).value // BLOQUE_NS
+            self._sumar(bloque, servicio, cantidad)
+
+    def _sumar(self, bloque, servicio, cantidad, reemplazar=False):
+        self._avanzar(bloque)
+        if bloque != self.abierto:
+            # Un lead fuera de la franja solo sirve para cerrar los bloques anteriores
+            return
+        self.servicios.add(servicio)
+        self.cantidades[servicio] = cantidad if reemplazar else self.cantidades.get(servicio, 0) + cantidad
+
+    def consumir(self, conteos_30min):
+        """
+        Incorpora conteos por bloque de 30 minutos y servicio, en orden de período.
+
+        Los conteos son totales del bloque: el del bloque abierto reemplaza al que tenía,
+        y los de bloques ya cerrados se ignoran. Así se puede volver a leer el día en
+        curso sin contar dos veces.
+
+        Args:
+            conteos_30min (DataFrame): Periodo, Servicio y CantidadLeads (ver ConteosCubo.tendencia)
+        """
+        with self._candado:
+            bloques = conteos_30min["Periodo"].to_numpy().astype("datetime64[ns]").astype("int64") // BLOQUE_NS
+            for bloque, servicio, cantidad in zip(bloques.tolist(), conteos_30min["Servicio"].tolist(),
+                                                  conteos_30min["CantidadLeads"].tolist()):
+                if self.abierto is None or bloque >= self.abierto:
+                    self._sumar(bloque, servicio, cantidad, reemplazar=True)
+
+    def actualizar(self, conteos):
+        """
+        Pone al día el detector con los conteos de una nueva versión de los datos.
+
+        Solo se consultan los bloques desde el día del bloque abierto. Si cambió la
+        primera fecha de los datos (el archivo se reescribió), se vuelve a empezar.
+
+        Args:
+            conteos (ConteosCubo | BaseLeadsSQL): Conteos de los leads (ver cargar_conteos)
+        """
+        with self._candado:
+            if conteos.version == self.version:
+                return
+            primera_fecha = conteos.rango_fechas()[0]
+            if primera_fecha != self.primera_fecha:
+                self._reiniciar()
+                self.primera_fecha = primera_fecha
+            desde = None if self.abierto is None else pd.Timestamp(self.abierto * BLOQUE_NS).normalize()
+            self.consumir(conteos.tendencia("30min", ["Servicio"], fecha_inicio=desde))
+            self.version = conteos.version
+
+    def alertas(self):
+        """
+        Devuelve las alertas detectadas, de la más reciente a la más antigua.
+
+        Returns:
+            DataFrame: Inicio del bloque, Servicio, CantidadLeads, Esperado, Desvios y Tipo
+        """
+        with self._candado:
+            registros = list(self.alertas_recientes)
+        alertas = pd.DataFrame(registros, columns=["Inicio", "Servicio", "CantidadLeads", "Esperado", "Desvios"])
+        alertas["Inicio"] = pd.to_datetime(alertas["Inicio"].astype("int64") * BLOQUE_NS)
+        alertas["Tipo"] = alertas["Desvios"].gt(0).map({True: "Por encima", False: "Por debajo"})
+        return alertas.sort_values(["Inicio", "Servicio"], ascending=[False, True], kind="stable", ignore_index=True)
+
+@st.cache_resource
+def _detector(ruta, backend):
+    # Un detector por origen y backend, compartido por todas las sesiones
+    return DetectorCaudal()
+
+# Función para obtener las alertas de caudal al día con los datos
+def cargar_alertas(conteos, ruta=RUTA_LEADS):
+    """
+    Actualiza el detector del proceso con los leads nuevos y devuelve sus alertas.
+
+    Args:
+        conteos (ConteosCubo | BaseLeadsSQL): Conteos de los leads (ver cargar_conteos)
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        DataFrame: Alertas (ver DetectorCaudal.alertas)
+    """
+    detector = _detector(ruta, type(conteos).__name__)
+    detector.actualizar(conteos)
+    return detector.alertas()
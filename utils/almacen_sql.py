@@ -0,0 +1,388 @@
+import os
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+from utils.cubo import ConteosCubo, cargar_cubo
+from utils.data_loader import COLUMNAS_CATEGORICAS, DIRECTORIO_CACHE, FILAS_POR_BLOQUE, RUTA_LEADS, partes_snapshot, version_datos
+from utils.derivadas import COLUMNAS_DERIVADAS, DIAS_CODIGO
+from utils.indices import COLUMNAS_TEXTO, normalizar_texto
+from utils.instrumentacion import medir_etapa
+
+# Variable de entorno que elige dónde se resuelven filtros y agregaciones: "memoria" (pandas) o "sqlite"
+VARIABLE_BACKEND = "PORTAL_BACKEND"
+
+# Columnas derivadas de FechaIngreso que se guardan en la base para filtrar y agrupar
+COLUMNAS_DERIVADAS_SQL = ['HoraIngreso', 'Bloque30min', 'DiaSemana']
+
+# Columnas con índice en la base
+COLUMNAS_INDICE_SQL = ['FechaIngreso', 'Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente']
+
+# Separador de los campos de la columna de búsqueda por texto
+SEPARADOR_SQL = "\x1f"
+
+# Dimensiones que se pueden pedir a consultar: nombre -> expresión SQL
+# (FechaIngreso se guarda en segundos y se agrupa por día, como en el cubo)
+DIMENSIONES_SQL = {
+    'FechaIngreso': 'FechaIngreso / 86400 * 86400',
+    'HoraIngreso': 'HoraIngreso',
+    'Bloque30min': 'Bloque30min',
+    'DiaSemana': 'DiaSemana',
+    'DiaCodigo': 'DiaSemana',
+    'Servicio': 'Servicio',
+    'CanalOrigen': 'CanalOrigen',
+    'Estado': 'Estado',
+    'TipoDeCliente': 'TipoDeCliente',
+    'Agente': 'Agente'
+}
+
+# Inicio del período de cada resolución de las tendencias (ver utils/series.py), en segundos.
+# El 1/1/1970 fue jueves: se corren 3 días para que las semanas empiecen el lunes
+PERIODOS_SQL = {
+    '5min': 'FechaIngreso / 300 * 300',
+    '30min': 'FechaIngreso / 1800 * 1800',
+    'hora': 'FechaIngreso / 3600 * 3600',
+    'dia': 'FechaIngreso / 86400 * 86400',
+    'semana': '(FechaIngreso / 86400 - (FechaIngreso / 86400 + 3) % 7) * 86400',
+    'mes': "CAST(strftime('%s', FechaIngreso, 'unixepoch', 'start of month') AS INTEGER)"
+}
+
+# Función para saber si las páginas deben consultar la base SQL
+def backend_sql():
+    """
+    Indica si está activo el backend SQLite (variable de entorno PORTAL_BACKEND=sqlite).
+
+    La base se guarda en DIRECTORIO_CACHE: si no se puede escribir ahí (ej. un
+    despliegue de solo lectura), las páginas siguen con los leads en memoria.
+
+    Returns:
+        bool: True si filtros y agregaciones se resuelven en SQL
+    """
+    if os.environ.get(VARIABLE_BACKEND, "memoria") != "sqlite":
+        return False
+    try:
+        os.makedirs(DIRECTORIO_CACHE, exist_ok=True)
+    except OSError:
+        return False
+    return os.access(DIRECTORIO_CACHE, os.W_OK)
+
+# Función para obtener la ruta de la base de un archivo de origen
+def _ruta_base(ruta):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    return os.path.join(DIRECTORIO_CACHE, nombre + ".sqlite")
+
+# Función para convertir una fecha a segundos, como se guarda FechaIngreso en la base
+def _segundos(fecha, redondear_arriba=False):
+    nanosegundos = pd.Timestamp(fecha).value
+    return -(-nanosegundos // 10**9) if redondear_arriba else nanosegundos // 10**9
+
+# Función para armar el texto normalizado de búsqueda de cada lead
+def _texto_busqueda(bloque):
+    texto = pd.Series("", index=bloque.index, dtype=object)
+    for i, columna in enumerate(columna for columna in COLUMNAS_TEXTO if columna in bloque.columns):
+        # Se normalizan solo los valores distintos (las notas y nombres se repiten mucho)
+        codigos, valores = pd.factorize(bloque[columna])
+        normalizados = normalizar_texto(pd.Series(valores, dtype=object)).str.replace(SEPARADOR_SQL, "", regex=False)
+        campo = np.append(normalizados.to_numpy(dtype=object), "")[codigos]
+        texto = texto + (SEPARADOR_SQL if i else "") + campo
+    return texto
+
+# Función para convertir un bloque del snapshot en las filas de la tabla leads
+def _filas_sql(bloque):
+    filas = bloque.derivadas.agregar(*COLUMNAS_DERIVADAS_SQL)
+    filas["FechaIngreso"] = bloque["FechaIngreso"].to_numpy().astype("datetime64[s]").astype("int64")
+    filas["Texto"] = _texto_busqueda(bloque)
+    return filas
+
+# Función para crear la tabla leads con las columnas del primer bloque
+def _crear_tabla(conexion, columnas):
+    tipos = {"FechaIngreso": "INTEGER", "HoraIngreso": "INTEGER", "Bloque30min": "INTEGER", "DiaSemana": "INTEGER"}
+    definicion = ", ".join(f'"{columna}" {tipos.get(columna, "TEXT" if columna in COLUMNAS_CATEGORICAS else "")}'.rstrip()
+                           for columna in columnas)
+    conexion.execute(f"CREATE TABLE leads ({definicion})")
+
+# Función para construir la base SQLite a partir del snapshot Parquet
+def _construir_base(ruta, ruta_base, version):
+    partes = partes_snapshot(ruta)
+    temporal = ruta_base + ".tmp"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+
+    with closing(sqlite3.connect(temporal)) as conexion:
+        # La base se arma en un archivo temporal: no hace falta journal ni sincronizar a disco
+        conexion.execute("PRAGMA journal_mode = OFF")
+        conexion.execute("PRAGMA synchronous = OFF")
+        columnas = None
+        for parte in partes:
+            for lote in pq.ParquetFile(parte).iter_batches(batch_size=FILAS_POR_BLOQUE):
+                filas = _filas_sql(lote.to_pandas())
+                if columnas is None:
+                    columnas = list(filas.columns)
+                    _crear_tabla(conexion, columnas)
+                marcadores = ", ".join("?" * len(columnas))
+                conexion.executemany(f"INSERT INTO leads VALUES ({marcadores})", filas[columnas].itertuples(index=False, name=None))
+        if columnas is None:
+            _crear_tabla(conexion, ["FechaIngreso", *COLUMNAS_CATEGORICAS, *COLUMNAS_DERIVADAS_SQL, "Texto"])
+
+        for columna in COLUMNAS_INDICE_SQL:
+            conexion.execute(f'CREATE INDEX "indice_{columna}" ON leads ("{columna}")')
+        conexion.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        conexion.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+        # Estadísticas para que el planificador elija entre los índices
+        conexion.execute("ANALYZE")
+        conexion.commit()
+    os.replace(temporal, ruta_base)
+
+# Función para leer la versión de datos con la que se construyó una base
+def _version_base(ruta_base):
+    try:
+        with closing(sqlite3.connect(f"file:{ruta_base}?mode=ro", uri=True)) as conexion:
+            return conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+    except (sqlite3.Error, TypeError):
+        return None
+
+# Base SQLite con los leads, consultada sin cargarlos en memoria
+class BaseLeadsSQL:
+    """
+    Resuelve filtros, agregaciones y páginas de leads como consultas SQL.
+
+    Los filtros son los mismos que los de seleccionar_leads (una lista vacía no
+    filtra), más texto: búsqueda literal en Nombre, Email y Notas, sin distinguir
+    mayúsculas ni acentos. Solo cruzan a Python los resultados de cada consulta.
+
+    Args:
+        ruta_base (str): Archivo SQLite (ver cargar_base_sql)
+        version (str): Versión de los datos con la que se construyó
+    """
+
+    def __init__(self, ruta_base, version):
+        self.ruta_base = ruta_base
+        self.version = version
+        self._valores = {}
+
+    def _consultar(self, sql, parametros=()):
+        # Una conexión de solo lectura por consulta: cada ejecución de página corre en su propio hilo
+        with closing(sqlite3.connect(f"file:{self.ruta_base}?mode=ro", uri=True)) as conexion:
+            return pd.read_sql_query(sql, conexion, params=parametros)
+
+    @staticmethod
+    def _condiciones(fecha_inicio=None, fecha_fin=None, servicios=None, canales=None, estados=None,
+                     tipos_cliente=None, excluir_domingos=False, texto=None):
+        condiciones, parametros = [], []
+        # Cada extremo del rango se aplica por separado (ej. las alertas solo piden desde una fecha)
+        if fecha_inicio:
+            condiciones.append("FechaIngreso >= ?")
+            parametros.append(_segundos(fecha_inicio, redondear_arriba=True))
+        if fecha_fin:
+            condiciones.append("FechaIngreso <= ?")
+            parametros.append(_segundos(fecha_fin))
+        for columna, valores in (("Servicio", servicios), ("CanalOrigen", canales), ("Estado", estados),
+                                 ("TipoDeCliente", tipos_cliente)):
+            if valores:
+                condiciones.append(f'"{columna}" IN ({", ".join("?" * len(valores))})')
+                parametros += [str(valor) for valor in valores]
+        if excluir_domingos:
+            condiciones.append("DiaSemana < 6")
+        if texto:
+            consulta = normalizar_texto(pd.Series([texto])).iloc[0].replace(SEPARADOR_SQL, "")
+            if consulta:
+                condiciones.append("instr(Texto, ?) > 0")
+                parametros.append(consulta)
+        return (" WHERE " + " AND ".join(condiciones)) if condiciones else "", parametros
+
+    def rango_fechas(self):
+        """
+        Devuelve la primera y la última FechaIngreso (NaT si no hay leads).
+
+        Returns:
+            tuple: (Timestamp, Timestamp)
+        """
+        rango = self._consultar("SELECT MIN(FechaIngreso) AS minimo, MAX(FechaIngreso) AS maximo FROM leads")
+        return tuple(pd.to_datetime(rango.iloc[0].astype("float64"), unit="s"))
+
+    def valores(self, columna):
+        """
+        Devuelve los valores distintos de una columna en orden de aparición.
+
+        Args:
+            columna (str): Columna de la tabla
+
+        Returns:
+            list: Valores distintos
+        """
+        if columna not in self._valores:
+            distintos = self._consultar(f'SELECT "{columna}" FROM leads GROUP BY "{columna}" ORDER BY MIN(rowid)')
+            self._valores[columna] = distintos[columna].tolist()
+        return self._valores[columna]
+
+    @medir_etapa("filtros")
+    def contar(self, **filtros):
+        """
+        Cuenta los leads que cumplen los filtros.
+
+        Returns:
+            int: Cantidad de leads
+        """
+        donde, parametros = self._condiciones(**filtros)
+        return int(self._consultar(f"SELECT COUNT(*) AS cantidad FROM leads{donde}", parametros)["cantidad"].iloc[0])
+
+    @medir_etapa("agregacion")
+    def consultar(self, dimensiones, **filtros):
+        """
+        Cuenta los leads que cumplen los filtros agrupando por las dimensiones pedidas.
+
+        Devuelve lo mismo que consultar_cubo: FechaIngreso agrupada por día y
+        DiaCodigo como categoría ordenada.
+
+        Args:
+            dimensiones (list): Columnas de DIMENSIONES_SQL por las que agrupar
+
+        Returns:
+            DataFrame: Dimensiones pedidas y la columna CantidadLeads
+        """
+        donde, parametros = self._condiciones(**filtros)
+        seleccion = ", ".join(f'{DIMENSIONES_SQL[dimension]} AS "{dimension}"' for dimension in dimensiones)
+        # Se agrupa por las expresiones: en GROUP BY, SQLite resuelve los nombres como columnas antes que como alias
+        grupos = ", ".join(DIMENSIONES_SQL[dimension] for dimension in dimensiones)
+        resultado = self._consultar(
+            f"SELECT {seleccion}, COUNT(*) AS CantidadLeads FROM leads{donde} GROUP BY {grupos} ORDER BY {grupos}",
+            parametros
+        )
+        if "FechaIngreso" in dimensiones:
+            resultado["FechaIngreso"] = pd.to_datetime(resultado["FechaIngreso"], unit="s")
+        if "DiaCodigo" in dimensiones:
+            resultado["DiaCodigo"] = pd.Categorical.from_codes(resultado["DiaCodigo"], categories=DIAS_CODIGO, ordered=True)
+        return resultado
+
+    @medir_etapa("agregacion")
+    def tendencia(self, resolucion, dimensiones, **filtros):
+        """
+        Cuenta los leads de cada período de la resolución, como consultar_series.
+
+        Args:
+            resolucion (str): Una de las resoluciones de utils/series.py
+            dimensiones (list): Columnas por las que separar la serie
+
+        Returns:
+            DataFrame: Periodo, las dimensiones pedidas y CantidadLeads, ordenado por período
+        """
+        donde, parametros = self._condiciones(**filtros)
+        seleccion = ", ".join([f'{PERIODOS_SQL[resolucion]} AS Periodo', *(f'"{dimension}"' for dimension in dimensiones)])
+        grupos = ", ".join([PERIODOS_SQL[resolucion], *(f'"{dimension}"' for dimension in dimensiones)])
+        resultado = self._consultar(
+            f"SELECT {seleccion}, COUNT(*) AS CantidadLeads FROM leads{donde} GROUP BY {grupos} ORDER BY {grupos}",
+            parametros
+        )
+        resultado["Periodo"] = pd.to_datetime(resultado["Periodo"], unit="s")
+        return resultado
+
+    def _orden(self, ordenar_por, ascendente):
+        # A igual valor se conserva el orden por fecha, como en ordenar_posiciones
+        sentido = "ASC" if ascendente else "DESC"
+        if ordenar_por == "FechaIngreso":
+            return f" ORDER BY FechaIngreso {sentido}, rowid {sentido}"
+        return f' ORDER BY "{ordenar_por}" {sentido}, FechaIngreso, rowid'
+
+    def columnas(self):
+        """
+        Devuelve las columnas de origen de los leads guardadas en la base.
+
+        No incluye la de búsqueda por texto ni las derivadas de FechaIngreso, igual que
+        los leads en memoria.
+
+        Returns:
+            list: Nombres de las columnas
+        """
+        info = self._consultar("SELECT name FROM pragma_table_info('leads')")
+        return [columna for columna in info["name"] if columna != "Texto" and columna not in COLUMNAS_DERIVADAS]
+
+    def _convertir(self, filas):
+        if "FechaIngreso" in filas.columns:
+            filas["FechaIngreso"] = pd.to_datetime(filas["FechaIngreso"], unit="s")
+        return filas
+
+    @medir_etapa("filtros")
+    def leer(self, columnas, ordenar_por="FechaIngreso", ascendente=True, limite=-1, desplazamiento=0, **filtros):
+        """
+        Lee una página de leads que cumplen los filtros, en el orden pedido.
+
+        Args:
+            columnas (list): Columnas a leer
+            ordenar_por (str): Columna por la que ordenar
+            ascendente (bool): Sentido del orden
+            limite (int): Cantidad máxima de filas (-1 = todas)
+            desplazamiento (int): Filas que se saltean
+
+        Returns:
+            DataFrame: Leads de la página
+        """
+        donde, parametros = self._condiciones(**filtros)
+        lista = ", ".join(f'"{columna}"' for columna in columnas)
+        sql = f"SELECT {lista} FROM leads{donde}{self._orden(ordenar_por, ascendente)} LIMIT ? OFFSET ?"
+        return self._convertir(self._consultar(sql, [*parametros, limite, desplazamiento]))
+
+    def bloques(self, columnas=None, ordenar_por="FechaIngreso", ascendente=True, filas_por_bloque=FILAS_POR_BLOQUE, **filtros):
+        """
+        Recorre por bloques los leads que cumplen los filtros (ej. para exportarlos).
+
+        Args:
+            columnas (list): Columnas a leer (None = todas las de los leads)
+            ordenar_por (str): Columna por la que ordenar
+            ascendente (bool): Sentido del orden
+            filas_por_bloque (int): Filas por bloque
+
+        Yields:
+            DataFrame: Bloques de leads; al menos uno, aunque esté vacío
+        """
+        columnas = columnas or self.columnas()
+        donde, parametros = self._condiciones(**filtros)
+        lista = ", ".join(f'"{columna}"' for columna in columnas)
+        sql = f"SELECT {lista} FROM leads{donde}{self._orden(ordenar_por, ascendente)}"
+        with closing(sqlite3.connect(f"file:{self.ruta_base}?mode=ro", uri=True)) as conexion:
+            vacio = True
+            for bloque in pd.read_sql_query(sql, conexion, params=parametros, chunksize=filas_por_bloque):
+                vacio = False
+                yield self._convertir(bloque)
+            if vacio:
+                yield pd.DataFrame(columns=columnas)
+
+# Función para obtener la base SQL al día con el archivo de origen
+@medir_etapa("carga")
+def cargar_base_sql(ruta=RUTA_LEADS):
+    """
+    Devuelve la base SQLite de los leads, reconstruyéndola si cambió el origen.
+
+    La base se arma desde el snapshot Parquet, por bloques, y queda en .cache/ junto
+    a él; otros procesos la reutilizan mientras la versión de los datos no cambie.
+
+    Args:
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        BaseLeadsSQL: Base lista para consultar
+    """
+    return _base_version(ruta, version_datos(ruta))
+
+@st.cache_resource(max_entries=1)
+def _base_version(ruta, version):
+    ruta_base = _ruta_base(ruta)
+    if _version_base(ruta_base) != version:
+        _construir_base(ruta, ruta_base, version)
+    return BaseLeadsSQL(ruta_base, version)
+
+# Función para obtener los conteos de las páginas desde el backend configurado
+def cargar_conteos(ruta=RUTA_LEADS):
+    """
+    Devuelve el origen de los conteos de las páginas: la base SQL o el cubo en memoria.
+
+    Args:
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        BaseLeadsSQL o ConteosCubo: Objeto con version, rango_fechas, valores, consultar y tendencia
+    """
+    if backend_sql():
+        return cargar_base_sql(ruta)
+    return ConteosCubo(cargar_cubo(ruta), ruta)
@@ -0,0 +1,140 @@
+import pandas as pd
+from utils.data_loader import RUTA_LEADS, cargar_agregado, concatenar_leads, registrar_agregado, seleccionar_leads
+from utils.derivadas import DIAS_CODIGO
+from utils.instrumentacion import medir_etapa
+from utils.series import cargar_series, consultar_series
+
+# Dimensiones del cubo de conteos; FechaIngreso queda truncada al día
+DIMENSIONES_CUBO = ['FechaIngreso', 'Bloque30min', 'DiaSemana', 'Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente']
+
+# Función para construir el cubo de conteos a partir de los leads
+def construir_cubo(df):
+    """
+    Cuenta los leads por cada combinación de las dimensiones del cubo.
+
+    Args:
+        df (DataFrame): Leads enriquecidos (como los devuelve cargar_datos)
+
+    Returns:
+        DataFrame: Una fila por celda no vacía, con la columna Cantidad, ordenado por fecha
+    """
+    fecha = df["FechaIngreso"]
+    celdas = pd.DataFrame({
+        "FechaIngreso": fecha.dt.normalize(),
+        "Bloque30min": (fecha.dt.hour * 2 + fecha.dt.minute // 30).astype("int8"),
+        "DiaSemana": fecha.dt.dayofweek.astype("int8")
+    })
+    for columna in DIMENSIONES_CUBO[3:]:
+        celdas[columna] = df[columna]
+
+    return celdas.groupby(DIMENSIONES_CUBO, observed=True).size().reset_index(name="Cantidad")
+
+# Función para sumar dos cubos (ej. el guardado y el de los leads recién agregados)
+def combinar_cubos(cubo, cubo_nuevo):
+    """
+    Suma las celdas de dos cubos de conteos.
+
+    Args:
+        cubo (DataFrame): Cubo de conteos previo
+        cubo_nuevo (DataFrame): Cubo de conteos de las filas nuevas
+
+    Returns:
+        DataFrame: Cubo con las celdas de ambos, ordenado por fecha
+    """
+    return concatenar_leads(cubo, cubo_nuevo).groupby(DIMENSIONES_CUBO, observed=True)["Cantidad"].sum().reset_index()
+
+# El cubo se guarda junto al snapshot y se actualiza con las filas agregadas al CSV
+registrar_agregado("cubo", construir_cubo, combinar_cubos)
+
+# Función para obtener el cubo de la versión actual de los datos
+def cargar_cubo(ruta=RUTA_LEADS):
+    """
+    Devuelve el cubo de conteos de los leads, al día con el archivo de origen.
+
+    Args:
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        DataFrame: Cubo de conteos (ver construir_cubo)
+    """
+    return cargar_agregado("cubo", ruta)
+
+# Función para consultar el cubo con los mismos filtros que aplicar_filtros
+@medir_etapa("agregacion")
+def consultar_cubo(cubo, dimensiones, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None,
+                   estados=None, tipos_cliente=None, excluir_domingos=False):
+    """
+    Suma las celdas del cubo que cumplen los filtros, agrupando por las dimensiones pedidas.
+
+    Además de las dimensiones del cubo se puede agrupar por HoraIngreso y DiaCodigo,
+    que se derivan de Bloque30min y DiaSemana. El filtro de fechas trabaja por día.
+
+    Args:
+        cubo (DataFrame): Cubo de conteos (ver cargar_cubo)
+        dimensiones (list): Columnas por las que agrupar
+        fecha_inicio (datetime): Fecha de inicio para filtrar
+        fecha_fin (datetime): Fecha final para filtrar
+        servicios (list): Lista de servicios para filtrar
+        canales (list): Lista de canales para filtrar
+        estados (list): Lista de estados para filtrar
+        tipos_cliente (list): Lista de tipos de cliente para filtrar
+        excluir_domingos (bool): Descartar los leads ingresados en domingo
+
+    Returns:
+        DataFrame: Dimensiones pedidas y la columna CantidadLeads
+    """
+    # Las celdas son diarias: el día de la fecha inicial se incluye completo
+    if fecha_inicio:
+        fecha_inicio = pd.Timestamp(fecha_inicio).normalize()
+
+    celdas = seleccionar_leads(
+        cubo,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        servicios=servicios,
+        canales=canales,
+        estados=estados,
+        tipos_cliente=tipos_cliente,
+        excluir_domingos=excluir_domingos
+    ).datos
+
+    # Dimensiones derivadas: se calculan sobre las celdas, no sobre los leads
+    if "HoraIngreso" in dimensiones:
+        celdas = celdas.assign(HoraIngreso=celdas["Bloque30min"] // 2)
+    if "DiaCodigo" in dimensiones:
+        celdas = celdas.assign(DiaCodigo=pd.Categorical.from_codes(celdas["DiaSemana"], categories=DIAS_CODIGO, ordered=True))
+
+    return celdas.groupby(dimensiones, observed=True)["Cantidad"].sum().reset_index(name="CantidadLeads")
+
+# Conteos de las páginas resueltos sobre el cubo en memoria
+class ConteosCubo:
+    """
+    Da acceso a los conteos del cubo con la misma interfaz que BaseLeadsSQL.
+
+    Las series por período (ver utils/series.py) se cargan recién al pedir una tendencia.
+
+    Args:
+        cubo (DataFrame): Cubo de conteos (ver cargar_cubo)
+        ruta (str): Ruta del CSV de origen
+    """
+
+    def __init__(self, cubo, ruta=RUTA_LEADS):
+        self.cubo = cubo
+        self.ruta = ruta
+        self.version = cubo.attrs.get("version")
+
+    def rango_fechas(self):
+        """Devuelve el primer y el último día con leads."""
+        return self.cubo["FechaIngreso"].min(), self.cubo["FechaIngreso"].max()
+
+    def valores(self, columna):
+        """Devuelve los valores distintos de una dimensión en orden de aparición."""
+        return self.cubo[columna].unique().tolist()
+
+    def consultar(self, dimensiones, **filtros):
+        """Suma las celdas que cumplen los filtros (ver consultar_cubo)."""
+        return consultar_cubo(self.cubo, dimensiones, **filtros)
+
+    def tendencia(self, resolucion, dimensiones, **filtros):
+        """Suma los leads de cada período de la resolución (ver consultar_series)."""
+        return consultar_series(cargar_series(self.ruta), resolucion, dimensiones, **filtros)
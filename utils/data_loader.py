@@ -1,41 +1,776 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import weakref
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
 from datetime import datetime, timedelta
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.derivadas import registrar_dataset
+from utils.indices import IndiceBitmap, IndiceTexto, SeleccionLeads
+from utils.instrumentacion import medir_etapa, registrar_informe
 
-# Función para cargar y procesar los datos iniciales (ahora sin usar locale)
-@st.cache_data
-def cargar_datos():
-    df = pd.read_csv("leads.csv", parse_dates=["FechaIngreso"])
-    
-    df["HoraIngreso"] = df["FechaIngreso"].dt.hour
-    df["MinutoIngreso"] = df["FechaIngreso"].dt.minute
-    df["Bloque30min"] = df["HoraIngreso"].astype(str) + ":" + ((df["MinutoIngreso"] // 30) * 30).astype(str).str.zfill(2)
-    
-    df["DiaSemana"] = df["FechaIngreso"].dt.dayofweek
-    
-    # Mapeo manual de los días de la semana
-    dias_semana_mapping = {
-        0: 'Lunes',
-        1: 'Martes',
-        2: 'Miércoles',
-        3: 'Jueves',
-        4: 'Viernes',
-        5: 'Sábado',
-        6: 'Domingo'
+# Archivo de origen de los leads y carpeta donde se guarda el snapshot columnar
+RUTA_LEADS = "leads.csv"
+DIRECTORIO_CACHE = ".cache"
+
+# Incrementar cuando cambien las columnas guardadas, así se descartan los snapshots viejos
+VERSION_ESQUEMA = 6
+
+# Cantidad de partes que puede acumular el snapshot antes de reescribirlo en una sola
+MAXIMO_PARTES = 20
+
+# Agregados derivados que se guardan junto al snapshot: nombre -> (construir, combinar)
+AGREGADOS = {}
+
+# Lectura por bloques: a partir de este tamaño del origen los agregados se construyen
+# sin cargar todos los leads en memoria
+FILAS_POR_BLOQUE = 200_000
+UMBRAL_BLOQUES_BYTES = 512 * 1024 * 1024
+
+# Columnas de baja cardinalidad que se guardan como categóricas en modo compacto
+COLUMNAS_CATEGORICAS = ['Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente', 'Clasificacion', 'Agente']
+
+# Etiquetas de los 48 bloques de 30 minutos del día (índice = código de bloque)
+ETIQUETAS_BLOQUE30MIN = [f"{hora}:{minuto:02d}" for hora in range(24) for minuto in (0, 30)]
+
+# Datasets compartidos que siguen en la caché y sesiones que recibieron cada uno:
+# (ruta, versión, compacto) -> DataFrame / ids de sesión
+_datasets = weakref.WeakValueDictionary()
+_sesiones_dataset = {}
+_bytes_dataset = {}
+_candado_datasets = threading.Lock()
+
+
+# Función para obtener la versión (tamaño y fecha de modificación) del archivo de origen
+def version_datos(ruta=RUTA_LEADS):
+    """
+    Devuelve un identificador de la versión actual del archivo de leads.
+    
+    Args:
+        ruta (str): Ruta del CSV de origen
+        
+    Returns:
+        str: Identificador "tamaño-mtime" que cambia cuando cambia el archivo
+    """
+    estado = os.stat(ruta)
+    return f"{estado.st_size}-{estado.st_mtime_ns}"
+
+# Función para calcular el hash de los primeros `tamano` bytes del archivo de origen
+def _hash_prefijo(ruta, tamano):
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as archivo:
+        restante = tamano
+        while restante > 0:
+            bloque = archivo.read(min(restante, 1024 * 1024))
+            if not bloque:
+                break
+            sha.update(bloque)
+            restante -= len(bloque)
+    return sha
+
+# Función para obtener las rutas del snapshot (carpeta de partes parquet + metadatos) de un archivo de origen
+def _rutas_snapshot(ruta, compacto):
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    if not compacto:
+        nombre += ".objetos"
+    base = os.path.join(DIRECTORIO_CACHE, nombre)
+    return base, base + ".json"
+
+# Función para leer los metadatos del snapshot, si existen y son del esquema actual
+def _leer_meta(ruta_meta):
+    try:
+        with open(ruta_meta, "r") as archivo_meta:
+            meta = json.load(archivo_meta)
+    except (OSError, ValueError):
+        return None
+    if meta.get("esquema") != VERSION_ESQUEMA:
+        return None
+    return meta
+
+# Función para escribir los metadatos del snapshot de forma atómica
+def _escribir_meta(ruta_meta, meta):
+    temporal = ruta_meta + ".tmp"
+    with open(temporal, "w") as archivo_meta:
+        json.dump(meta, archivo_meta)
+    os.replace(temporal, ruta_meta)
+
+# Función para escribir un parquet de forma atómica
+def _escribir_parquet(df, ruta_parquet):
+    temporal = ruta_parquet + ".tmp"
+    df.to_parquet(temporal, index=False)
+    os.replace(temporal, ruta_parquet)
+
+# Función para comparar el archivo de origen con lo ya ingerido en el snapshot
+def _comparar_con_snapshot(ruta, ruta_meta, meta, estado):
+    if meta is None:
+        return "cambiado", None
+    
+    if meta["tamano"] == estado.st_size:
+        if meta["mtime_ns"] == estado.st_mtime_ns:
+            return "vigente", None
+        # Si solo cambió la fecha de modificación (ej. un checkout), se confirma por contenido
+        if meta["sha256"] == _hash_prefijo(ruta, estado.st_size).hexdigest():
+            meta["mtime_ns"] = estado.st_mtime_ns
+            _guardar_meta(ruta_meta, meta)
+            return "vigente", None
+        return "cambiado", None
+    
+    # El archivo creció: si el contenido ya ingerido no cambió, alcanza con procesar lo agregado
+    if estado.st_size > meta["tamano"] and meta["termina_en_salto"]:
+        sha = _hash_prefijo(ruta, meta["tamano"])
+        if sha.hexdigest() == meta["sha256"]:
+            return "agregadas", sha
+    return "cambiado", None
+
+# Función para leer las partes del snapshot como un único DataFrame ordenado por fecha
+def _leer_partes(directorio, meta):
+    df = pd.read_parquet([os.path.join(directorio, parte) for parte in meta["partes"]])
+    # Las partes escritas por bloques pueden no estar en orden entre sí
+    if not meta.get("ordenado", True):
+        df = df.sort_values("FechaIngreso", kind="stable", ignore_index=True)
+    return df
+
+# Función para sincronizar el snapshot con el archivo de origen y devolver los leads
+def _sincronizar_snapshot(ruta, compacto):
+    directorio, ruta_meta = _rutas_snapshot(ruta, compacto)
+    meta = _leer_meta(ruta_meta)
+    estado = os.stat(ruta)
+    
+    situacion, sha = _comparar_con_snapshot(ruta, ruta_meta, meta, estado)
+    if situacion == "vigente":
+        return _leer_partes(directorio, meta)
+    if situacion == "agregadas":
+        return _ingerir_agregadas(ruta, estado, compacto, meta, sha, _leer_partes(directorio, meta))
+    return _reconstruir_snapshot(ruta, estado, compacto)
+
+# Función para releer el archivo completo y regenerar el snapshot y sus agregados
+def _reconstruir_snapshot(ruta, estado, compacto):
+    # Se lee exactamente el tamaño observado, por si el archivo sigue creciendo mientras tanto
+    with open(ruta, "rb") as archivo:
+        contenido = archivo.read(estado.st_size)
+    fuente = leer_fuente(io.BytesIO(contenido))
+    df = enriquecer_datos(fuente, compacto)
+    
+    meta = {
+        "esquema": VERSION_ESQUEMA,
+        "tamano": len(contenido),
+        "mtime_ns": estado.st_mtime_ns,
+        "sha256": hashlib.sha256(contenido).hexdigest(),
+        "termina_en_salto": contenido.endswith(b"\n"),
+        "columnas": list(fuente.columns),
+        "ultima_fecha": _ultima_fecha(df),
+        "ordenado": True,
+        "partes": [],
+        "agregados": []
     }
-    df["NombreDiaSemana"] = df["DiaSemana"].map(dias_semana_mapping)
+    agregados = {nombre: construir(df) for nombre, (construir, _) in AGREGADOS.items()}
+    _guardar_snapshot(ruta, compacto, meta, df, agregados, reemplazar=True)
+    return df
+
+# Función para incorporar al snapshot solo las filas agregadas al final del archivo
+def _ingerir_agregadas(ruta, estado, compacto, meta, sha, previo):
+    with open(ruta, "rb") as archivo:
+        archivo.seek(meta["tamano"])
+        contenido = archivo.read(estado.st_size - meta["tamano"])
+    nuevos = enriquecer_datos(
+        leer_fuente(io.BytesIO(contenido), header=None, names=meta["columnas"]),
+        compacto
+    )
+    
+    # Si llegaron leads con fecha anterior a la última ingerida hay que reordenar todo
+    en_orden = len(nuevos) == 0 or meta["ultima_fecha"] is None or nuevos["FechaIngreso"].iloc[0] >= pd.Timestamp(meta["ultima_fecha"])
+    df = concatenar_leads(previo, nuevos)
+    if not en_orden:
+        df = df.sort_values("FechaIngreso", kind="stable", ignore_index=True)
+    
+    sha.update(contenido)
+    meta.update({
+        "tamano": estado.st_size,
+        "mtime_ns": estado.st_mtime_ns,
+        "sha256": sha.hexdigest(),
+        "termina_en_salto": contenido.endswith(b"\n"),
+        "ultima_fecha": _ultima_fecha(df)
+    })
+    
+    # Los agregados guardados se combinan con los de las filas nuevas
+    agregados = {}
+    for nombre in meta["agregados"]:
+        previo_agregado = _leer_agregado(ruta, compacto, nombre)
+        if nombre in AGREGADOS and previo_agregado is not None:
+            construir, combinar = AGREGADOS[nombre]
+            agregados[nombre] = combinar(previo_agregado, construir(nuevos))
+    
+    # Las filas nuevas se agregan como otra parte, salvo que haya que reescribir el snapshot
+    mismos_tipos = previo.dtypes.astype(str).equals(df.dtypes.astype(str))
+    if en_orden and mismos_tipos and meta.get("ordenado", True) and len(meta["partes"]) < MAXIMO_PARTES:
+        _guardar_snapshot(ruta, compacto, meta, df.iloc[len(previo):], agregados, reemplazar=False)
+    else:
+        meta["ordenado"] = True
+        _guardar_snapshot(ruta, compacto, meta, df, agregados, reemplazar=True)
+    return df
+
+# Función para obtener la última FechaIngreso como texto para los metadatos
+def _ultima_fecha(df):
+    if len(df) == 0:
+        return None
+    return df["FechaIngreso"].iloc[-1].isoformat()
+
+# Función para guardar partes, agregados y metadatos del snapshot
+def _guardar_snapshot(ruta, compacto, meta, df, agregados, reemplazar):
+    directorio, ruta_meta = _rutas_snapshot(ruta, compacto)
+    
+    # Si el disco no es escribible (ej. despliegue de solo lectura) se sigue sin snapshot
+    try:
+        os.makedirs(directorio, exist_ok=True)
+        if reemplazar:
+            meta["partes"] = []
+        parte = f"parte-{len(meta['partes']):05d}.parquet"
+        _escribir_parquet(df, os.path.join(directorio, parte))
+        meta["partes"].append(parte)
+        
+        for nombre, agregado in agregados.items():
+            _escribir_parquet(agregado, f"{directorio}.{nombre}.parquet")
+        meta["agregados"] = sorted(agregados)
+        
+        _escribir_meta(ruta_meta, meta)
+        
+        # Las partes que ya no figuran en los metadatos se borran recién después de actualizarlos
+        for sobrante in set(os.listdir(directorio)) - set(meta["partes"]):
+            os.remove(os.path.join(directorio, sobrante))
+    except OSError:
+        pass
+
+# Función para actualizar solo los metadatos del snapshot
+def _guardar_meta(ruta_meta, meta):
+    try:
+        _escribir_meta(ruta_meta, meta)
+    except OSError:
+        pass
+
+# Función para leer un agregado guardado junto al snapshot
+def _leer_agregado(ruta, compacto, nombre):
+    directorio, _ = _rutas_snapshot(ruta, compacto)
+    try:
+        return pd.read_parquet(f"{directorio}.{nombre}.parquet")
+    except OSError:
+        return None
+
+# Función para registrar un agregado que se mantiene junto al snapshot
+def registrar_agregado(nombre, construir, combinar):
+    """
+    Registra un agregado derivado de los leads que se guarda junto al snapshot.
+    
+    Cuando al archivo de origen solo se le agregan filas, el agregado se actualiza
+    combinando el valor guardado con el construido sobre las filas nuevas.
+    
+    Args:
+        nombre (str): Nombre del agregado (también se usa en el nombre del archivo)
+        construir (callable): Recibe leads enriquecidos y devuelve el agregado (DataFrame)
+        combinar (callable): Recibe el agregado previo y el de las filas nuevas y devuelve el total
+    """
+    AGREGADOS[nombre] = (construir, combinar)
+
+# Función para obtener un agregado registrado de la versión actual de los datos
+@medir_etapa("carga")
+def cargar_agregado(nombre, ruta=RUTA_LEADS, compacto=True):
+    """
+    Devuelve un agregado registrado con registrar_agregado, al día con el archivo de origen.
+    
+    Args:
+        nombre (str): Nombre del agregado
+        ruta (str): Ruta del CSV de origen
+        compacto (bool): Representación de los leads (ver enriquecer_datos)
+        
+    Returns:
+        DataFrame: El agregado
+    """
+    return _agregado_version(nombre, ruta, version_datos(ruta), compacto)
+
+@st.cache_resource(max_entries=8)
+def _agregado_version(nombre, ruta, version, compacto):
+    agregado = _obtener_agregado(nombre, ruta, version, compacto)
+    # Como con los leads, la versión viaja con el agregado (ej. para cachear gráficos)
+    agregado.attrs["version"] = version
+    return agregado
+
+# Función para leer el agregado guardado o construirlo a partir de los leads
+def _obtener_agregado(nombre, ruta, version, compacto):
+    _, ruta_meta = _rutas_snapshot(ruta, compacto)
+    
+    # Con orígenes grandes se sincroniza por bloques, sin cargar los leads en memoria
+    if os.stat(ruta).st_size > UMBRAL_BLOQUES_BYTES:
+        meta = sincronizar_en_bloques(ruta, compacto)
+        if meta is not None and nombre in meta["agregados"]:
+            agregado = _leer_agregado(ruta, compacto, nombre)
+            if agregado is not None:
+                return agregado
+    
+    # cargar_datos sincroniza el snapshot, actualizando los agregados guardados
+    df = cargar_datos(ruta, compacto)
+    
+    meta = _leer_meta(ruta_meta)
+    if meta is not None and nombre in meta["agregados"] and f"{meta['tamano']}-{meta['mtime_ns']}" == version:
+        agregado = _leer_agregado(ruta, compacto, nombre)
+        if agregado is not None:
+            return agregado
+    
+    construir, _ = AGREGADOS[nombre]
+    agregado = construir(df)
+    if meta is not None and f"{meta['tamano']}-{meta['mtime_ns']}" == version:
+        _guardar_agregado(ruta, compacto, ruta_meta, meta, nombre, agregado)
+    return agregado
+
+# Función para guardar un agregado construido después de sincronizar el snapshot
+def _guardar_agregado(ruta, compacto, ruta_meta, meta, nombre, agregado):
+    directorio, _ = _rutas_snapshot(ruta, compacto)
+    try:
+        _escribir_parquet(agregado, f"{directorio}.{nombre}.parquet")
+        meta["agregados"] = sorted(set(meta["agregados"]) | {nombre})
+        _escribir_meta(ruta_meta, meta)
+    except OSError:
+        pass
+
+# Lector que entrega a pandas solo los bytes observados del origen y calcula su hash al pasar
+class _LectorAcotado:
+    def __init__(self, archivo, tamano, sha):
+        self.archivo = archivo
+        self.restante = tamano
+        self.sha = sha
+        self.ultimo_byte = b""
+    
+    def read(self, cantidad=-1):
+        if cantidad is None or cantidad < 0 or cantidad > self.restante:
+            cantidad = self.restante
+        datos = self.archivo.read(cantidad)
+        self.restante -= len(datos)
+        self.sha.update(datos)
+        if datos:
+            self.ultimo_byte = datos[-1:]
+        return datos
+
+# Función para sincronizar snapshot y agregados leyendo el origen por bloques
+def sincronizar_en_bloques(ruta=RUTA_LEADS, compacto=True, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Pone al día el snapshot y los agregados registrados leyendo el CSV por bloques.
+    
+    Cada bloque se enriquece, se escribe como grupo de filas de una parte Parquet y se
+    suma a los agregados, así la memoria usada depende de filas_por_bloque y no del
+    tamaño del archivo. Si al CSV solo se le agregaron filas, se leen solo esas.
+    
+    Con más de MAXIMO_PARTES partes, se unen en una sola.
+    
+    Args:
+        ruta (str): Ruta del CSV de origen
+        compacto (bool): Representación de los leads (ver enriquecer_datos)
+        filas_por_bloque (int): Filas que se procesan por vez
+        
+    Returns:
+        dict: Metadatos del snapshot sincronizado, o None si no se pudo escribir
+    """
+    # Si el disco no es escribible (ej. despliegue de solo lectura) se sigue sin snapshot
+    try:
+        return _sincronizar_en_bloques(ruta, compacto, filas_por_bloque)
+    except OSError:
+        return None
+
+# Función que escribe el snapshot por bloques (ver sincronizar_en_bloques)
+def _sincronizar_en_bloques(ruta, compacto, filas_por_bloque):
+    directorio, ruta_meta = _rutas_snapshot(ruta, compacto)
+    meta = _leer_meta(ruta_meta)
+    estado = os.stat(ruta)
+    
+    situacion, sha = _comparar_con_snapshot(ruta, ruta_meta, meta, estado)
+    if situacion == "vigente":
+        return meta
+    
+    if situacion == "agregadas":
+        desde = meta["tamano"]
+        opciones = {"header": None, "names": meta["columnas"]}
+        agregados = {nombre: _leer_agregado(ruta, compacto, nombre) for nombre in meta["agregados"] if nombre in AGREGADOS}
+        agregados = {nombre: agregado for nombre, agregado in agregados.items() if agregado is not None}
+        # Las partes nuevas respetan el esquema de las existentes
+        esquema = pq.read_schema(os.path.join(directorio, meta["partes"][0]))
+    else:
+        desde = 0
+        sha = hashlib.sha256()
+        opciones = {}
+        meta = {
+            "esquema": VERSION_ESQUEMA,
+            "columnas": None,
+            "ultima_fecha": None,
+            "ordenado": True,
+            "partes": []
+        }
+        agregados = dict.fromkeys(AGREGADOS)
+        esquema = None
+    
+    os.makedirs(directorio, exist_ok=True)
+    parte = f"parte-{len(meta['partes']):05d}.parquet"
+    temporal = os.path.join(directorio, parte + ".tmp")
+    escritor = None
+    
+    with open(ruta, "rb") as archivo:
+        archivo.seek(desde)
+        lector = _LectorAcotado(archivo, estado.st_size - desde, sha)
+        for bloque in leer_fuente(lector, chunksize=filas_por_bloque, **opciones):
+            if meta["columnas"] is None:
+                meta["columnas"] = list(bloque.columns)
+            bloque = enriquecer_datos(bloque, compacto)
+            if len(bloque) == 0:
+                continue
+            
+            # Cada bloque queda ordenado, pero entre bloques el orden depende del archivo
+            if meta["ultima_fecha"] is not None and bloque["FechaIngreso"].iloc[0] < pd.Timestamp(meta["ultima_fecha"]):
+                meta["ordenado"] = False
+            meta["ultima_fecha"] = max(filter(None, [meta["ultima_fecha"], _ultima_fecha(bloque)]))
+            
+            if escritor is None:
+                esquema = esquema or esquema_parquet(bloque)
+                escritor = pq.ParquetWriter(temporal, esquema)
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+            
+            for nombre, agregado in agregados.items():
+                construir, combinar = AGREGADOS[nombre]
+                parcial = construir(bloque)
+                agregados[nombre] = parcial if agregado is None else combinar(agregado, parcial)
+    
+    if escritor is not None:
+        escritor.close()
+        os.replace(temporal, os.path.join(directorio, parte))
+        meta["partes"].append(parte)
+    if len(meta["partes"]) > MAXIMO_PARTES:
+        _compactar_partes(directorio, meta)
+    
+    for nombre, agregado in agregados.items():
+        if agregado is not None:
+            _escribir_parquet(agregado, f"{directorio}.{nombre}.parquet")
+    meta["agregados"] = sorted(nombre for nombre, agregado in agregados.items() if agregado is not None)
+    
+    meta.update({
+        "tamano": estado.st_size,
+        "mtime_ns": estado.st_mtime_ns,
+        "sha256": sha.hexdigest(),
+        "termina_en_salto": lector.ultimo_byte == b"\n" if lector.ultimo_byte else meta.get("termina_en_salto", True)
+    })
+    _escribir_meta(ruta_meta, meta)
+    
+    # Las partes que ya no figuran en los metadatos se borran recién después de actualizarlos
+    for sobrante in set(os.listdir(directorio)) - set(meta["partes"]):
+        os.remove(os.path.join(directorio, sobrante))
+    return meta
+
+# Función para unir las partes del snapshot en una sola, copiando grupo de filas por grupo de filas
+def _compactar_partes(directorio, meta):
+    rutas = [os.path.join(directorio, parte) for parte in meta["partes"]]
+    # Con más categorías en una parte, sus índices de diccionario pueden ser más anchos
+    esquema = pa.unify_schemas([pq.read_schema(ruta_parte) for ruta_parte in rutas], promote_options="permissive")
+    parte = f"parte-{len(meta['partes']):05d}.parquet"
+    temporal = os.path.join(directorio, parte + ".tmp")
+    with pq.ParquetWriter(temporal, esquema) as escritor:
+        for ruta_parte in rutas:
+            archivo = pq.ParquetFile(ruta_parte)
+            for grupo in range(archivo.num_row_groups):
+                escritor.write_table(archivo.read_row_group(grupo).cast(esquema))
+    os.replace(temporal, os.path.join(directorio, parte))
+    # Las partes anteriores se borran recién después de actualizar los metadatos
+    meta["partes"] = [parte]
+
+# Función para obtener las partes Parquet del snapshot al día, sin cargar los leads
+def partes_snapshot(ruta=RUTA_LEADS, compacto=True):
+    """
+    Sincroniza el snapshot por bloques y devuelve las rutas de sus partes.
+    
+    Args:
+        ruta (str): Ruta del CSV de origen
+        compacto (bool): Representación de los leads (ver enriquecer_datos)
+        
+    Returns:
+        list: Rutas de las partes Parquet, en orden de ingreso
+        
+    Raises:
+        OSError: Si no se pudo escribir el snapshot (ej. disco de solo lectura)
+    """
+    directorio, _ = _rutas_snapshot(ruta, compacto)
+    meta = sincronizar_en_bloques(ruta, compacto)
+    if meta is None:
+        raise OSError(f"No se pudo escribir el snapshot de {ruta} en {DIRECTORIO_CACHE}")
+    return [os.path.join(directorio, parte) for parte in meta["partes"]]
+
+# Función para armar el esquema Parquet de un archivo escrito por bloques (partes del snapshot, exportación)
+def esquema_parquet(bloque):
+    """
+    Arma el esquema Parquet de un archivo que se escribe por bloques, a partir del primero.
+    
+    Args:
+        bloque (DataFrame): Primer bloque a escribir
+        
+    Returns:
+        pa.Schema: Esquema para todos los bloques
+    """
+    esquema = pa.Schema.from_pandas(bloque, preserve_index=False)
+    # Una columna vacía en el primer bloque se infiere como nula (o como float, si viene del CSV); se guarda como texto
+    vacias = {columna for columna in bloque.columns if bloque[columna].isna().all()}
+    campos = [
+        campo.with_type(pa.string()) if pa.types.is_null(campo.type) or campo.name in vacias else campo
+        for campo in esquema
+    ]
+    return pa.schema(campos, metadata=esquema.metadata)
+
+# Función para leer del snapshot solo los leads de un rango de fechas
+def leer_rango(fecha_inicio, fecha_fin, ruta=RUTA_LEADS, compacto=True, columnas=None):
+    """
+    Lee del snapshot los leads de un rango sin cargar el resto (para el detalle de orígenes grandes).
+    
+    Args:
+        fecha_inicio (datetime): Fecha de inicio (inclusive)
+        fecha_fin (datetime): Fecha final (inclusive)
+        ruta (str): Ruta del CSV de origen
+        compacto (bool): Representación de los leads (ver enriquecer_datos)
+        columnas (list): Columnas a leer (todas si es None)
+        
+    Returns:
+        DataFrame: Leads del rango ordenados por FechaIngreso
+    """
+    directorio, _ = _rutas_snapshot(ruta, compacto)
+    meta = sincronizar_en_bloques(ruta, compacto)
+    if meta is None:
+        # Sin snapshot se filtran los leads en memoria
+        df = cargar_datos(ruta, compacto)
+        df = df[df["FechaIngreso"].between(pd.Timestamp(fecha_inicio), pd.Timestamp(fecha_fin))]
+        return (df if columnas is None else df[columnas]).reset_index(drop=True)
+    filtros = [
+        ("FechaIngreso", ">=", pd.Timestamp(fecha_inicio)),
+        ("FechaIngreso", "<=", pd.Timestamp(fecha_fin))
+    ]
+    df = pd.read_parquet([os.path.join(directorio, parte) for parte in meta["partes"]], columns=columnas, filters=filtros)
+    return df.sort_values("FechaIngreso", kind="stable", ignore_index=True)
+
+# Función para leer el CSV de origen
+def leer_fuente(ruta=RUTA_LEADS, **opciones):
+    """
+    Lee el CSV de leads sin columnas derivadas.
+    
+    Args:
+        ruta (str): Ruta (o buffer) del CSV de origen
+        **opciones: Opciones adicionales para pd.read_csv
+        
+    Returns:
+        DataFrame: Leads tal como vienen en el archivo
+    """
+    return pd.read_csv(ruta, parse_dates=["FechaIngreso"], **opciones)
+
+# Función para preparar los leads del origen (ahora sin usar locale)
+def enriquecer_datos(df, compacto=True):
+    """
+    Normaliza las categorías vacías y ordena los leads por FechaIngreso
+    (aplicar_filtros depende de ese orden).
     
-    dias_mapping = {0: 'L', 1: 'M', 2: 'X', 3: 'J', 4: 'V', 5: 'S', 6: 'D'}
-    df["DiaCodigo"] = df["DiaSemana"].map(dias_mapping)
+    Las columnas derivadas de FechaIngreso (HoraIngreso, Bloque30min, DiaSemana, etc.)
+    no se agregan acá: se calculan al primer acceso con df.derivadas (ver
+    utils/derivadas.py), solo las que alguna página usa. En modo compacto las columnas
+    de baja cardinalidad quedan como categóricas.
     
-    df["Semana"] = df["FechaIngreso"].dt.isocalendar().week
+    Args:
+        df (DataFrame): Leads tal como vienen del origen
+        compacto (bool): Usar la representación categórica
+        
+    Returns:
+        DataFrame: Leads ordenados por fecha
+    """
+    df = df.sort_values("FechaIngreso", kind="stable", ignore_index=True)
     
-    for columna in ['Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente', 'Clasificacion']:
+    for columna in COLUMNAS_CATEGORICAS:
         if columna in df.columns:
             df[columna] = df[columna].fillna('No especificado')
+            if compacto:
+                df[columna] = df[columna].astype("category")
     
     return df
 
+# Función para obtener las etiquetas "H:MM" de los bloques de 30 minutos
+def etiquetas_bloque30min(bloques):
+    """
+    Convierte códigos de bloque de 30 minutos en etiquetas para mostrar.
+    
+    Args:
+        bloques (Series): Códigos de bloque (modo compacto) o etiquetas ya armadas
+        
+    Returns:
+        Series: Etiquetas con formato "H:MM"
+    """
+    if not pd.api.types.is_integer_dtype(bloques):
+        return bloques
+    return pd.Series(ETIQUETAS_BLOQUE30MIN, dtype=object).take(bloques.to_numpy()).set_axis(bloques.index)
+
+# Función para comparar la memoria por columna entre la representación original y la compacta
+def reporte_memoria(ruta=RUTA_LEADS):
+    """
+    Compara los bytes por columna de la representación con objetos y la compacta.
+    
+    Args:
+        ruta (str): Ruta del CSV de origen
+        
+    Returns:
+        DataFrame: Bytes por columna antes/después y porcentaje de reducción
+    """
+    fuente = leer_fuente(ruta)
+    antes = enriquecer_datos(fuente, compacto=False).memory_usage(index=False, deep=True)
+    despues = enriquecer_datos(fuente, compacto=True).memory_usage(index=False, deep=True)
+    
+    reporte = pd.DataFrame({"Bytes_antes": antes, "Bytes_despues": despues})
+    reporte.loc["Total"] = reporte.sum()
+    reporte["Reduccion"] = 1 - reporte["Bytes_despues"] / reporte["Bytes_antes"]
+    return reporte.rename_axis("Columna").reset_index()
+
+# Función para unir leads ya cargados con leads nuevos
+def concatenar_leads(*partes):
+    """
+    Concatena DataFrames con el mismo esquema conservando las columnas categóricas.
+    
+    Args:
+        *partes (DataFrame): Leads (o agregados) en el orden en que se deben unir
+        
+    Returns:
+        DataFrame: Filas de todas las partes, una a continuación de la otra
+    """
+    # Las categorías se unifican antes de concatenar; si difieren pandas pasaría la columna a objetos
+    tipos_comunes = {}
+    for columna in partes[0].columns:
+        tipo = partes[0][columna].dtype
+        if not isinstance(tipo, pd.CategoricalDtype):
+            continue
+        if all(parte[columna].dtype == tipo for parte in partes[1:]):
+            continue
+        categorias = tipo.categories
+        for parte in partes[1:]:
+            categorias = categorias.union(pd.Index(parte[columna].unique().dropna()), sort=False)
+        tipos_comunes[columna] = pd.CategoricalDtype(categorias, ordered=tipo.ordered)
+    if tipos_comunes:
+        partes = [parte.astype(tipos_comunes) for parte in partes]
+    
+    return pd.concat(partes, ignore_index=True)
+
+# Función para cargar y procesar los datos iniciales
+@medir_etapa("carga")
+def cargar_datos(ruta=RUTA_LEADS, compacto=True):
+    """
+    Carga los leads enriquecidos, reutilizando el snapshot en disco si el origen no cambió.
+    
+    La vista que se devuelve comparte memoria con el dataset de todas las sesiones: los
+    puntos de entrada (app.py, las páginas, servidor.py y los benchmarks) activan
+    Copy-on-Write de pandas para que modificarla no toque el dataset compartido.
+    
+    Args:
+        ruta (str): Ruta del CSV de origen
+        compacto (bool): Usar la representación categórica (ver enriquecer_datos)
+        
+    Returns:
+        DataFrame: Leads (vista del dataset compartido; columnas derivadas en df.derivadas)
+    """
+    version = version_datos(ruta)
+    compartido = _cargar_datos_version(ruta, version, compacto)
+    
+    clave = (ruta, version, compacto)
+    contexto = get_script_run_ctx()
+    with _candado_datasets:
+        _datasets[clave] = compartido
+        if contexto is not None:
+            _sesiones_dataset.setdefault(clave, set()).add(contexto.session_id)
+    
+    # Cada llamada recibe su propia vista: modificarla copia solo las columnas tocadas
+    return compartido.copy(deep=False)
+
+# Los leads se cargan una sola vez por proceso y versión, y todas las sesiones comparten el mismo DataFrame
+@st.cache_resource(max_entries=2)
+def _cargar_datos_version(ruta, version, compacto):
+    df = _sincronizar_snapshot(ruta, compacto)
+    
+    # La versión viaja con el DataFrame para asociarle los índices y las columnas derivadas calculadas sobre él
+    df.attrs["version"] = version
+    registrar_dataset(df)
+    return df
+
+# Función para medir cuánta memoria se ahorra compartiendo los leads entre sesiones
+def memoria_compartida():
+    """
+    Calcula, para cada versión de los leads en memoria, cuántas sesiones la comparten
+    y cuánta memoria ocuparían si cada una tuviera su propia copia.
+    
+    Returns:
+        list: Un dict por versión con Version, Bytes, Sesiones y Bytes_ahorrados
+    """
+    # Solo cuentan las sesiones todavía abiertas (fuera del servidor no se puede saber)
+    runtime = Runtime.instance() if Runtime.exists() else None
+    with _candado_datasets:
+        datasets = list(_datasets.items())
+        for clave in [clave for clave in _sesiones_dataset if clave not in _datasets]:
+            del _sesiones_dataset[clave]
+            _bytes_dataset.pop(clave, None)
+        if runtime is not None:
+            for sesiones in _sesiones_dataset.values():
+                sesiones.difference_update([sesion for sesion in sesiones if not runtime.is_active_session(sesion)])
+        sesiones = {clave: len(ids) for clave, ids in _sesiones_dataset.items()}
+    
+    reporte = []
+    for clave, df in datasets:
+        if clave not in _bytes_dataset:
+            _bytes_dataset[clave] = int(df.memory_usage(index=True, deep=True).sum())
+        bytes_dataset = _bytes_dataset[clave]
+        cantidad = sesiones.get(clave, 0)
+        reporte.append({
+            "Version": clave[1],
+            "Bytes": bytes_dataset,
+            "Sesiones": cantidad,
+            "Bytes_ahorrados": bytes_dataset * max(cantidad - 1, 0)
+        })
+    return reporte
+
+# El panel de diagnóstico muestra el ahorro junto a los tiempos de cada página
+registrar_informe("Leads compartidos entre sesiones", memoria_compartida)
+
+# Función para obtener el índice de filtros de los leads cargados
+@medir_etapa("carga")
+def cargar_indice(df):
+    """
+    Devuelve el índice bitmap de los leads, construido una sola vez por versión de datos.
+    
+    Args:
+        df (DataFrame): Leads tal como los devuelve cargar_datos
+        
+    Returns:
+        IndiceBitmap: Máscaras por valor de las columnas filtrables
+    """
+    return _indice_version(df, df.attrs.get("version"))
+
+@st.cache_resource(max_entries=2)
+def _indice_version(_df, version):
+    return IndiceBitmap(_df)
+
+# Función para obtener el índice de búsqueda por texto de los leads cargados
+@medir_etapa("carga")
+def cargar_indice_texto(df):
+    """
+    Devuelve el índice de trigramas de Nombre, Email y Notas, construido una sola vez por versión de datos.
+    
+    Args:
+        df (DataFrame): Leads tal como los devuelve cargar_datos
+        
+    Returns:
+        IndiceTexto: Índice para la búsqueda por texto
+    """
+    return _indice_texto_version(df, df.attrs.get("version"))
+
+@st.cache_resource(max_entries=2)
+def _indice_texto_version(_df, version):
+    return IndiceTexto(_df)
+
 # Función para generar rangos de fechas
 def generar_rango_fechas(dias=30):
     """
@@ -51,40 +786,144 @@ def generar_rango_fechas(dias=30):
     fecha_inicial = fecha_final - timedelta(days=dias)
     return fecha_inicial, fecha_final
 
+# Función para ubicar un rango de fechas mediante búsqueda binaria
+def rango_posiciones(df, fecha_inicio, fecha_fin):
+    """
+    Devuelve las posiciones [inicio, fin) de las filas con FechaIngreso dentro del rango.
+    
+    Args:
+        df (DataFrame): DataFrame de leads ordenado por FechaIngreso
+        fecha_inicio (datetime): Fecha de inicio (inclusive; None = desde el principio)
+        fecha_fin (datetime): Fecha final (inclusive; None = hasta el final)
+        
+    Returns:
+        tuple: Posición inicial y final (exclusiva) para usar con iloc
+    """
+    fechas = df["FechaIngreso"].to_numpy()
+    inicio = 0 if fecha_inicio is None else fechas.searchsorted(pd.Timestamp(fecha_inicio).to_datetime64(), side="left")
+    fin = len(fechas) if fecha_fin is None else fechas.searchsorted(pd.Timestamp(fecha_fin).to_datetime64(), side="right")
+    # Un rango invertido (fecha final anterior a la inicial) no selecciona filas
+    return int(inicio), int(max(inicio, fin))
+
+# Función para seleccionar leads sin materializar las filas
+@medir_etapa("filtros")
+def seleccionar_leads(df, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None, estados=None,
+                      tipos_cliente=None, excluir_domingos=False, indice=None):
+    """
+    Resuelve los filtros comunes como un tramo de fechas más una máscara booleana.
+    
+    Cada extremo del rango de fechas es opcional (None = sin límite de ese lado).
+    
+    Con un índice (ver cargar_indice) cada filtro es un OR de máscaras precalculadas;
+    sin índice se compara fila por fila con isin dentro del tramo de fechas.
+    
+    Args:
+        df (DataFrame): DataFrame de leads ordenado por FechaIngreso (como lo devuelve cargar_datos)
+        fecha_inicio (datetime): Fecha de inicio para filtrar
+        fecha_fin (datetime): Fecha final para filtrar
+        servicios (list): Lista de servicios para filtrar
+        canales (list): Lista de canales para filtrar
+        estados (list): Lista de estados para filtrar
+        tipos_cliente (list): Lista de tipos de cliente para filtrar
+        excluir_domingos (bool): Descartar los leads ingresados en domingo
+        indice (IndiceBitmap): Índice construido sobre df
+        
+    Returns:
+        SeleccionLeads: Selección cuyas filas se materializan con .datos
+    """
+    # Filtro de fechas: como df está ordenado por fecha, el rango es un tramo contiguo (sin copia)
+    inicio, fin = 0, len(df)
+    if fecha_inicio or fecha_fin:
+        inicio, fin = rango_posiciones(df, fecha_inicio or None, fecha_fin or None)
+    
+    filtros = [
+        ("Servicio", servicios),
+        ("CanalOrigen", canales),
+        ("Estado", estados),
+        ("TipoDeCliente", tipos_cliente),
+        ("DiaSemana", range(6) if excluir_domingos else None)
+    ]
+    
+    # Combinar los filtros con AND dentro del tramo
+    mascara = None
+    for columna, valores in filtros:
+        if not valores:
+            continue
+        if indice is not None:
+            mascara_columna = indice.mascara(columna, valores, inicio, fin)
+        else:
+            mascara_columna = df.derivadas.tramo(columna, inicio, fin).isin(valores).to_numpy()
+        if mascara_columna is not None:
+            mascara = mascara_columna if mascara is None else mascara & mascara_columna
+    
+    return SeleccionLeads(df, inicio, fin, mascara)
+
 # Función para aplicar filtros comunes a los dataframes
-def aplicar_filtros(df, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None, estados=None):
+@medir_etapa("filtros")
+def aplicar_filtros(df, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None, estados=None,
+                    tipos_cliente=None, excluir_domingos=False, indice=None):
     """
     Aplica filtros comunes al DataFrame de leads.
     
+    El resultado comparte memoria con df; con Copy-on-Write, modificarlo copia solo lo tocado.
+    
     Args:
-        df (DataFrame): DataFrame de leads
+        df (DataFrame): DataFrame de leads ordenado por FechaIngreso (como lo devuelve cargar_datos)
         fecha_inicio (datetime): Fecha de inicio para filtrar
         fecha_fin (datetime): Fecha final para filtrar
         servicios (list): Lista de servicios para filtrar
         canales (list): Lista de canales para filtrar
         estados (list): Lista de estados para filtrar
+        tipos_cliente (list): Lista de tipos de cliente para filtrar
+        excluir_domingos (bool): Descartar los leads ingresados en domingo
+        indice (IndiceBitmap): Índice construido sobre df (opcional)
         
     Returns:
         DataFrame: DataFrame filtrado
     """
-    # Copia para no modificar el original
-    df_filtrado = df.copy()
-    
-    # Aplicar filtros de fecha
-    if fecha_inicio and fecha_fin:
-        df_filtrado = df_filtrado[(df_filtrado["FechaIngreso"] >= fecha_inicio) & 
-                                (df_filtrado["FechaIngreso"] <= fecha_fin)]
-    
-    # Aplicar filtros de servicio
-    if servicios and len(servicios) > 0:
-        df_filtrado = df_filtrado[df_filtrado["Servicio"].isin(servicios)]
+    return seleccionar_leads(
+        df,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        servicios=servicios,
+        canales=canales,
+        estados=estados,
+        tipos_cliente=tipos_cliente,
+        excluir_domingos=excluir_domingos,
+        indice=indice
+    ).datos
+
+# Función para obtener el orden de las filas según una columna, sin reordenar el DataFrame
+@medir_etapa("filtros")
+def ordenar_posiciones(df, columna, ascendente=True):
+    """
+    Devuelve las posiciones (para iloc) de df ordenadas por columna.
     
-    # Aplicar filtros de canal
-    if canales and len(canales) > 0:
-        df_filtrado = df_filtrado[df_filtrado["CanalOrigen"].isin(canales)]
+    Los leads ya vienen ordenados por FechaIngreso, así que ordenar por fecha no
+    cuesta nada; para el resto se ordenan enteros que siguen el orden alfabético de los
+    valores (nunca los códigos de las categorías, que no lo siguen). A igual
+    valor se conserva el orden por fecha.
     
-    # Aplicar filtros de estado
-    if estados and len(estados) > 0:
-        df_filtrado = df_filtrado[df_filtrado["Estado"].isin(estados)]
+    Args:
+        df (DataFrame): Leads ordenados por FechaIngreso (ej. el resultado de aplicar_filtros)
+        columna (str): Columna por la que ordenar
+        ascendente (bool): Sentido del orden
+        
+    Returns:
+        ndarray: Posiciones en el orden pedido
+    """
+    if columna == "FechaIngreso":
+        posiciones = np.arange(len(df))
+        return posiciones if ascendente else posiciones[::-1]
     
-    return df_filtrado
\ No newline at end of file
+    serie = df[columna]
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Tras agregar leads las categorías nuevas quedan al final: los códigos se
+        # pasan al rango alfabético de su etiqueta (los nulos, -1, quedan primero)
+        rangos = np.empty(len(serie.cat.categories) + 1, dtype=np.int64)
+        rangos[np.argsort(serie.cat.categories.to_numpy(), kind="stable")] = np.arange(len(serie.cat.categories))
+        rangos[-1] = -1
+        codigos = rangos[serie.cat.codes.to_numpy()]
+    else:
+        codigos, _ = pd.factorize(serie, sort=True)
+    return np.argsort(codigos if ascendente else -codigos, kind="stable")
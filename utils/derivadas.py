@@ -0,0 +1,131 @@
+import threading
+import pandas as pd
+
+# Mapeo manual de los días de la semana (índice = dayofweek)
+DIAS_SEMANA = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+DIAS_CODIGO = ['L', 'M', 'X', 'J', 'V', 'S', 'D']
+
+# Columnas derivadas de FechaIngreso: nombre -> función que las calcula a partir de las fechas.
+# Los bloques de 30 minutos son códigos enteros (0 = 0:00, 1 = 0:30, ..., 47 = 23:30)
+COLUMNAS_DERIVADAS = {
+    'HoraIngreso': lambda fecha: fecha.dt.hour.astype("int8"),
+    'MinutoIngreso': lambda fecha: fecha.dt.minute.astype("int8"),
+    'Bloque30min': lambda fecha: (fecha.dt.hour * 2 + fecha.dt.minute // 30).astype("int8"),
+    'DiaSemana': lambda fecha: fecha.dt.dayofweek.astype("int8"),
+    'NombreDiaSemana': lambda fecha: pd.Series(
+        pd.Categorical.from_codes(fecha.dt.dayofweek, categories=DIAS_SEMANA, ordered=True), index=fecha.index
+    ),
+    'DiaCodigo': lambda fecha: pd.Series(
+        pd.Categorical.from_codes(fecha.dt.dayofweek, categories=DIAS_CODIGO, ordered=True), index=fecha.index
+    ),
+    'Semana': lambda fecha: fecha.dt.isocalendar().week.astype("int8")
+}
+
+# Versiones de los datos que se recuerdan a la vez (igual que la caché de cargar_datos)
+MAXIMO_VERSIONES = 2
+
+# Columnas ya calculadas de cada dataset compartido: versión -> {"filas": n, "columnas": {nombre: Series}}
+_compartidas = {}
+_candado_compartidas = threading.Lock()
+
+# Función para registrar un dataset cuyas columnas derivadas se comparten entre todas sus vistas
+def registrar_dataset(df):
+    """
+    Registra el dataset completo de una versión de los datos.
+
+    Las columnas derivadas que se calculen sobre él (o sobre una vista completa)
+    quedan guardadas para todas las vistas y selecciones de esa versión. Sus filas
+    se identifican por el índice, que debe ser 0..n-1 (como lo devuelve cargar_datos).
+
+    Args:
+        df (DataFrame): Leads con df.attrs["version"]
+    """
+    version = df.attrs.get("version")
+    if version is None or not df.index.equals(pd.RangeIndex(len(df))):
+        return
+    with _candado_compartidas:
+        if version not in _compartidas:
+            _compartidas[version] = {"filas": len(df), "columnas": {}}
+        for vieja in list(_compartidas)[:-MAXIMO_VERSIONES]:
+            del _compartidas[vieja]
+
+# Acceso a las columnas derivadas de FechaIngreso, calculadas recién cuando se piden
+@pd.api.extensions.register_dataframe_accessor("derivadas")
+class ColumnasDerivadas:
+    """
+    Calcula las columnas de COLUMNAS_DERIVADAS al primer acceso y las guarda.
+
+    Sobre el dataset de cargar_datos (o cualquier vista completa) la columna se
+    calcula una vez por versión y la reutilizan todas las sesiones; sobre una
+    selección se toman sus filas de la columna ya calculada o, si todavía no existe,
+    se calcula solo para esas filas. Las columnas que el DataFrame ya tiene se
+    devuelven tal cual.
+
+    Uso: df.derivadas["DiaSemana"], df.derivadas.tramo("HoraIngreso", inicio, fin)
+    o df.derivadas.agregar("HoraIngreso", "Bloque30min").
+
+    Args:
+        df (DataFrame): Leads con la columna FechaIngreso
+    """
+
+    def __init__(self, df):
+        self._df = df
+        self._calculadas = {}
+
+    def _compartida(self):
+        # Columnas del dataset de la misma versión y si este DataFrame lo abarca completo
+        registro = _compartidas.get(self._df.attrs.get("version"))
+        if registro is None or not pd.api.types.is_integer_dtype(self._df.index):
+            return None, False
+        completo = len(self._df) == registro["filas"] and self._df.index.equals(pd.RangeIndex(registro["filas"]))
+        return registro["columnas"], completo
+
+    def __getitem__(self, nombre):
+        return self.tramo(nombre)
+
+    def tramo(self, nombre, inicio=0, fin=None):
+        """
+        Devuelve la columna para las filas [inicio, fin) (por posición).
+
+        Args:
+            nombre (str): Columna derivada (o una columna propia del DataFrame)
+            inicio (int): Primera posición
+            fin (int): Posición final (exclusiva); None = hasta el final
+
+        Returns:
+            Series: Valores de la columna, con el índice de esas filas
+        """
+        if nombre in self._df.columns:
+            return self._df[nombre].iloc[inicio:fin]
+        if nombre not in COLUMNAS_DERIVADAS:
+            raise KeyError(nombre)
+
+        completa = self._calculadas.get(nombre)
+        if completa is None:
+            columnas, completo = self._compartida()
+            if columnas is not None and nombre in columnas:
+                completa = columnas[nombre]
+                if not completo:
+                    completa = completa.take(self._df.index.to_numpy()).set_axis(self._df.index)
+                self._calculadas[nombre] = completa
+            elif inicio == 0 and fin is None:
+                completa = COLUMNAS_DERIVADAS[nombre](self._df["FechaIngreso"]).rename(nombre)
+                self._calculadas[nombre] = completa
+                if completo:
+                    columnas[nombre] = completa
+            else:
+                # Solo se pidió un tramo: se calcula para esas filas y no se guarda
+                return COLUMNAS_DERIVADAS[nombre](self._df["FechaIngreso"].iloc[inicio:fin]).rename(nombre)
+        return completa.iloc[inicio:fin]
+
+    def agregar(self, *nombres):
+        """
+        Devuelve el DataFrame con las columnas derivadas pedidas agregadas.
+
+        Args:
+            *nombres (str): Columnas a agregar; sin nombres, todas las de COLUMNAS_DERIVADAS
+
+        Returns:
+            DataFrame: Copia (sin copiar datos, con Copy-on-Write) con las columnas agregadas
+        """
+        return self._df.assign(**{nombre: self[nombre] for nombre in nombres or COLUMNAS_DERIVADAS})
@@ -0,0 +1,130 @@
+import gzip
+import io
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.data_loader import esquema_parquet, etiquetas_bloque30min
+from utils.instrumentacion import medir_etapa
+
+# Formatos de exportación: nombre visible -> (extensión, tipo MIME)
+FORMATOS_EXPORTACION = {
+    "CSV": ("csv", "text/csv"),
+    "CSV comprimido (gzip)": ("csv.gz", "application/gzip"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet")
+}
+
+# Filas que se convierten por vez al exportar
+FILAS_POR_BLOQUE_EXPORTACION = 50_000
+
+# Prefijo de los archivos exportados en el directorio temporal
+PREFIJO_EXPORTACION = "leads_sps_"
+
+# Función para recorrer las filas a exportar por bloques
+def _bloques(df, posiciones, filas_por_bloque):
+    posiciones = np.arange(len(df)) if posiciones is None else posiciones
+    # Siempre hay al menos un bloque (aunque vacío) para escribir encabezado y esquema
+    for inicio in range(0, max(len(posiciones), 1), filas_por_bloque):
+        yield df.iloc[posiciones[inicio:inicio + filas_por_bloque]]
+
+# Función para agregar a un bloque las columnas derivadas de FechaIngreso, como en el CSV original
+def _con_derivadas(bloque):
+    if not pd.api.types.is_datetime64_any_dtype(bloque["FechaIngreso"]):
+        # El bloque vacío de la base SQL trae las columnas sin tipo
+        bloque = bloque.astype({"FechaIngreso": "datetime64[ns]"})
+    bloque = bloque.derivadas.agregar()
+    return bloque.assign(Bloque30min=etiquetas_bloque30min(bloque["Bloque30min"]))
+
+# Función para escribir los bloques como CSV (comprimido o no) en un archivo binario
+def _escribir_csv(archivo, bloques, comprimir):
+    destino = gzip.GzipFile(fileobj=archivo, mode="wb") if comprimir else archivo
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    for i, bloque in enumerate(bloques):
+        bloque.to_csv(texto, header=(i == 0), index=False)
+    texto.flush()
+    # Se suelta el archivo sin cerrarlo; el GzipFile sí se cierra para escribir el final
+    texto.detach()
+    if comprimir:
+        destino.close()
+
+# Función para escribir los bloques como Parquet, un grupo de filas por bloque
+def _escribir_parquet(archivo, bloques):
+    escritor = None
+    try:
+        for bloque in bloques:
+            if escritor is None:
+                # Mismo esquema que las partes del snapshot: una columna vacía en el primer bloque queda como texto
+                esquema = esquema_parquet(bloque)
+                escritor = pq.ParquetWriter(archivo, esquema, compression="zstd")
+            escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+    finally:
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:
+        raise ValueError("No hay bloques para exportar: se necesita al menos uno (aunque esté vacío) para el esquema")
+
+# Función para exportar leads por bloques en el formato elegido
+def exportar_leads(df, formato, posiciones=None, filas_por_bloque=FILAS_POR_BLOQUE_EXPORTACION):
+    """
+    Genera el archivo de exportación convirtiendo las filas por bloques.
+
+    Cada bloque se escribe (y se comprime, si corresponde) apenas se convierte,
+    directamente en un archivo en disco; así no se arma el archivo completo en
+    memoria.
+
+    Args:
+        df (DataFrame): Leads a exportar
+        formato (str): Una de las claves de FORMATOS_EXPORTACION
+        posiciones (ndarray): Orden de las filas a exportar (todas, en su orden, si es None)
+        filas_por_bloque (int): Filas que se convierten por vez
+
+    Returns:
+        str: Ruta del archivo exportado (ver exportar_bloques)
+    """
+    return exportar_bloques(_bloques(df, posiciones, filas_por_bloque), formato)
+
+# Función para exportar bloques de leads ya armados (ej. leídos de la base SQL)
+@medir_etapa("exportacion")
+def exportar_bloques(bloques, formato):
+    """
+    Genera el archivo de exportación a partir de bloques de leads con las mismas columnas.
+
+    A cada bloque se le agregan las columnas derivadas de FechaIngreso (HoraIngreso,
+    Bloque30min como "H:MM", DiaSemana, etc.), igual que en la exportación original.
+
+    Args:
+        bloques (iterable): DataFrames a escribir, en orden (al menos uno, aunque esté vacío)
+        formato (str): Una de las claves de FORMATOS_EXPORTACION
+        
+    Returns:
+        str: Ruta del archivo exportado, en el directorio temporal; quien lo pidió lo
+        borra con descartar_exportacion cuando ya no lo necesita
+    """
+    extension = FORMATOS_EXPORTACION[formato][0]
+    descriptor, ruta = tempfile.mkstemp(prefix=PREFIJO_EXPORTACION, suffix=f".{extension}")
+    bloques = (_con_derivadas(bloque) for bloque in bloques)
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            if formato == "Parquet":
+                _escribir_parquet(archivo, bloques)
+            else:
+                _escribir_csv(archivo, bloques, comprimir=formato == "CSV comprimido (gzip)")
+    except BaseException:
+        descartar_exportacion(ruta)
+        raise
+    return ruta
+
+# Función para borrar un archivo exportado
+def descartar_exportacion(ruta):
+    """
+    Borra un archivo generado por exportar_bloques, si todavía existe.
+
+    Args:
+        ruta (str): Ruta del archivo exportado
+    """
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,376 @@
+import pandas as pd
+import plotly.express as px
+from utils.data_loader import etiquetas_bloque30min
+from utils.derivadas import DIAS_CODIGO
+from utils.graficos import figura_cacheada
+from utils.instrumentacion import etapa
+from utils.metricas import calcular_metricas
+from utils.muestreo import grafico_lineas
+from utils.series import ETIQUETAS_RESOLUCION, elegir_resolucion
+
+# Opciones de visualización de las páginas; la primera es la que se muestra por defecto
+VISTAS_TEMPORALES = ["Horas", "Bloques de 30 minutos"]
+TIPOS_GRAFICO_SERVICIO = ["Gráfico de Sunburst", "Gráfico de Barras", "Gráfico de Líneas Temporales"]
+
+# Colores de cada estado, comunes a los gráficos por estado
+COLORES_ESTADO = {
+    "Asesorado": "#00CC96",
+    "Pendiente": "#FFA15A",
+    "Descartado": "#EF553B"
+}
+
+# Función para obtener los gráficos por hora/bloque y de la franja especial (página por horario)
+def figuras_por_hora(conteos, filtros, vista_temporal):
+    """
+    Devuelve el gráfico general por hora o bloque de 30 minutos y el de la franja de 17:00 a 21:00.
+
+    Las figuras de este módulo salen de la caché de figuras (ver figura_cacheada) con
+    la misma clave desde las páginas y desde el precalentamiento del servidor.
+
+    Args:
+        conteos (ConteosCubo o BaseLeadsSQL): Origen de los conteos (ver cargar_conteos)
+        filtros (dict): Filtros de la página (fechas, servicios, canales, excluir_domingos)
+        vista_temporal (str): Una de VISTAS_TEMPORALES
+
+    Returns:
+        tuple: (figura general, figura de la franja)
+    """
+    # Solo estos gráficos dependen de la vista temporal
+    return figura_cacheada(
+        "horario_por_hora", conteos.version, dict(filtros, vista_temporal=vista_temporal),
+        lambda: _armar_por_hora(conteos, filtros, vista_temporal)
+    )
+
+# Función que arma los gráficos por hora/bloque (ver figuras_por_hora)
+def _armar_por_hora(conteos, filtros, vista_temporal):
+    # Preparar datos según la vista temporal seleccionada
+    if vista_temporal == "Horas":
+        # Agrupación por hora
+        leads_por_hora = conteos.consultar(["HoraIngreso"], **filtros)
+        eje_x = "HoraIngreso"
+        etiqueta_x = "Hora del día"
+        titulo_grafico = "Cantidad de Leads por Hora (Todo el día)"
+
+        # Franja horaria especial (17:00 - 21:00)
+        leads_franja = leads_por_hora[leads_por_hora["HoraIngreso"].between(17, 21)]
+        titulo_franja = "Cantidad de Leads entre 17:00 y 21:00"
+    else:
+        # Agrupación por bloques de 30 minutos
+        leads_por_hora = conteos.consultar(["Bloque30min"], **filtros)
+        eje_x = "Bloque30min"
+        etiqueta_x = "Bloque de 30 minutos"
+        titulo_grafico = "Cantidad de Leads por Bloques de 30 minutos"
+
+        # Para bloques de 30 min, tomamos de 17:00 a 21:30 (códigos de bloque 34 a 42)
+        leads_franja = leads_por_hora[leads_por_hora["Bloque30min"].between(34, 42)]
+        titulo_franja = "Cantidad de Leads entre 17:00 y 21:30 (bloques de 30 min)"
+
+        # Las etiquetas "H:MM" se arman recién para graficar
+        leads_por_hora = leads_por_hora.assign(Bloque30min=etiquetas_bloque30min(leads_por_hora["Bloque30min"]))
+        leads_franja = leads_franja.assign(Bloque30min=etiquetas_bloque30min(leads_franja["Bloque30min"]))
+
+    # Gráfico general de leads por hora/bloque
+    fig_general = px.bar(
+        leads_por_hora,
+        x=eje_x,
+        y="CantidadLeads",
+        labels={eje_x: etiqueta_x, "CantidadLeads": "Cantidad de Leads"},
+        title=titulo_grafico,
+        color_discrete_sequence=["#636EFA"]
+    )
+
+    # Gráfico para la franja especial
+    fig_franja = px.bar(
+        leads_franja,
+        x=eje_x,
+        y="CantidadLeads",
+        labels={eje_x: f"{etiqueta_x} (17:00 - 21:00)", "CantidadLeads": "Cantidad de Leads"},
+        title=titulo_franja,
+        color_discrete_sequence=["#EF553B"]
+    )
+    return fig_general, fig_franja
+
+# Función para obtener el gráfico de leads por día de la semana (página por horario)
+def figura_dias(conteos, filtros):
+    """
+    Devuelve el gráfico de leads por día de la semana, de lunes a domingo.
+
+    Args:
+        conteos (ConteosCubo o BaseLeadsSQL): Origen de los conteos (ver cargar_conteos)
+        filtros (dict): Filtros de la página
+
+    Returns:
+        Figure: Gráfico de barras
+    """
+    return figura_cacheada("horario_dias", conteos.version, filtros, lambda: _armar_dias(conteos, filtros))
+
+# Función que arma el gráfico por día de la semana (ver figura_dias)
+def _armar_dias(conteos, filtros):
+    # Agrupar por día de la semana, ordenados correctamente (L, M, X, J, V, S, D)
+    leads_por_dia = conteos.consultar(["DiaCodigo"], **filtros)
+    leads_por_dia["DiaCodigo"] = pd.Categorical(leads_por_dia["DiaCodigo"], categories=DIAS_CODIGO, ordered=True)
+    leads_por_dia = leads_por_dia.sort_values("DiaCodigo")
+
+    return px.bar(
+        leads_por_dia,
+        x="DiaCodigo",
+        y="CantidadLeads",
+        labels={"DiaCodigo": "Día de la semana", "CantidadLeads": "Cantidad de Leads"},
+        title="Cantidad de Leads por Día de la Semana",
+        color_discrete_sequence=["#00CC96"]
+    )
+
+# Función para obtener el heatmap de leads por día y hora (página por horario)
+def figura_heatmap(conteos, filtros):
+    """
+    Devuelve el heatmap de leads por día de la semana y hora, con la cantidad en cada celda.
+
+    Args:
+        conteos (ConteosCubo o BaseLeadsSQL): Origen de los conteos (ver cargar_conteos)
+        filtros (dict): Filtros de la página
+
+    Returns:
+        Figure: Heatmap
+    """
+    return figura_cacheada("horario_heatmap", conteos.version, filtros, lambda: _armar_heatmap(conteos, filtros))
+
+# Función que arma el heatmap por día y hora (ver figura_heatmap)
+def _armar_heatmap(conteos, filtros):
+    # Crear tabla pivote para el heatmap, con los días de la semana en orden
+    heatmap_data = conteos.consultar(["DiaCodigo", "HoraIngreso"], **filtros).pivot(
+        index="DiaCodigo",
+        columns="HoraIngreso",
+        values="CantidadLeads"
+    ).fillna(0).astype(int)
+    heatmap_data = heatmap_data.reindex(DIAS_CODIGO)
+
+    # Crear heatmap
+    fig_heatmap = px.imshow(
+        heatmap_data,
+        labels=dict(x="Hora del día", y="Día de la semana", color="Cantidad de Leads"),
+        x=heatmap_data.columns,
+        y=heatmap_data.index,
+        title="Distribución de Leads por Día y Hora",
+        color_continuous_scale="YlOrRd"
+    )
+
+    # Añadir números a las celdas con leads, como texto de la propia traza
+    fig_heatmap.update_traces(
+        text=heatmap_data.fillna(0).astype(int).astype(str).where(heatmap_data > 0, "").to_numpy(),
+        texttemplate="%{text}",
+        textfont=dict(color="black")
+    )
+    return fig_heatmap
+
+# Función para obtener el gráfico principal de la página por servicio
+def figura_servicio_principal(conteos, filtros, tipo_grafico):
+    """
+    Devuelve el gráfico de leads por servicio y canal (sunburst o barras) o la evolución por servicio.
+
+    Args:
+        conteos (ConteosCubo o BaseLeadsSQL): Origen de los conteos (ver cargar_conteos)
+        filtros (dict): Filtros de la página (fechas, canales, estados, excluir_domingos)
+        tipo_grafico (str): Uno de TIPOS_GRAFICO_SERVICIO
+
+    Returns:
+        Figure: Gráfico principal
+    """
+    return figura_cacheada(
+        "servicio_principal", conteos.version, dict(filtros, tipo_grafico=tipo_grafico),
+        lambda: _armar_servicio_principal(conteos, filtros, tipo_grafico)
+    )
+
+# Función que arma el gráfico principal según el tipo de visualización (ver figura_servicio_principal)
+def _armar_servicio_principal(conteos, filtros, tipo_grafico):
+    if tipo_grafico == "Gráfico de Sunburst":
+        return px.sunburst(
+            conteos.consultar(["Servicio", "CanalOrigen"], **filtros),
+            path=["Servicio", "CanalOrigen"],
+            values="CantidadLeads",
+            title="Distribución de Leads por Servicio y Canal de Origen",
+            color_discrete_sequence=px.colors.qualitative.Pastel
+        )
+
+    if tipo_grafico == "Gráfico de Barras":
+        return px.bar(
+            conteos.consultar(["Servicio", "CanalOrigen"], **filtros),
+            x="Servicio",
+            y="CantidadLeads",
+            color="CanalOrigen",
+            title="Cantidad de Leads por Servicio y Canal de Origen",
+            barmode="group"
+        )
+
+    # Gráfico de Líneas Temporales: series precalculadas, con la resolución que corresponde al rango elegido
+    resolucion = elegir_resolucion(filtros["fecha_inicio"], filtros["fecha_fin"])
+    leads_por_periodo = conteos.tendencia(resolucion, ["Servicio"], **filtros)
+
+    # Gráfico de líneas reducido al presupuesto de puntos (WebGL si son muchos)
+    fig = grafico_lineas(
+        leads_por_periodo,
+        x="Periodo",
+        y="CantidadLeads",
+        color="Servicio",
+        title=f"Evolución Temporal de Leads por Servicio (por {ETIQUETAS_RESOLUCION[resolucion]})"
+    )
+    fig.update_layout(
+        xaxis_title="Fecha",
+        yaxis_title="Cantidad de Leads",
+        legend_title="Servicio"
+    )
+    return fig
+
+# Función para obtener el gráfico de estados por servicio (página por servicio)
+def figura_servicio_estado(conteos, filtros):
+    """
+    Devuelve el gráfico de barras apiladas de estados por servicio.
+
+    Args:
+        conteos (ConteosCubo o BaseLeadsSQL): Origen de los conteos (ver cargar_conteos)
+        filtros (dict): Filtros de la página
+
+    Returns:
+        Figure: Gráfico de barras
+    """
+    return figura_cacheada("servicio_estado", conteos.version, filtros, lambda: px.bar(
+        conteos.consultar(["Servicio", "Estado"], **filtros),
+        x="Servicio",
+        y="CantidadLeads",
+        color="Estado",
+        title="Distribución de Estados por Servicio",
+        color_discrete_map=COLORES_ESTADO
+    ))
+
+# Función para obtener el gráfico de tendencia de la página de detalles
+def figura_tendencia(version, filtros, texto_busqueda, contar_por_periodo):
+    """
+    Devuelve la evolución de los leads filtrados, con la resolución que corresponde al rango de fechas.
+
+    En la página de detalles los gráficos se cachean por versión, filtros y texto
+    buscado; el orden de la tabla no los afecta.
+
+    Args:
+        version (str): Versión de los datos
+        filtros (dict): Filtros de la página (fechas, servicios, canales, estados, tipos_cliente)
+        texto_busqueda (str): Texto buscado ("" sin búsqueda)
+        contar_por_periodo (callable): Recibe la resolución y devuelve Periodo y CantidadLeads
+
+    Returns:
+        Figure: Gráfico de líneas
+    """
+    resolucion = elegir_resolucion(filtros["fecha_inicio"], filtros["fecha_fin"])
+
+    # Función para armar el gráfico (reducido al presupuesto de puntos; WebGL si son muchos)
+    def armar():
+        fig_tendencia = grafico_lineas(
+            contar_por_periodo(resolucion),
+            x="Periodo",
+            y="CantidadLeads",
+            title=f"Evolución de Leads por {ETIQUETAS_RESOLUCION[resolucion].capitalize()}"
+        )
+        fig_tendencia.update_layout(xaxis_title="Fecha", yaxis_title="Cantidad de Leads")
+        return fig_tendencia
+
+    return figura_cacheada("detalle_tendencia", version, dict(filtros, texto_busqueda=texto_busqueda), armar)
+
+# Función para obtener el gráfico de distribución por tipo de cliente (página de detalles)
+def figura_tipo_cliente(version, filtros, texto_busqueda, conteos):
+    """
+    Devuelve el gráfico de torta de los leads filtrados por tipo de cliente.
+
+    Args:
+        version (str): Versión de los datos
+        filtros (dict): Filtros de la página
+        texto_busqueda (str): Texto buscado ("" sin búsqueda)
+        conteos (DataFrame): Leads filtrados contados por Servicio, CanalOrigen, Estado y TipoDeCliente
+
+    Returns:
+        Figure: Gráfico de torta
+    """
+    return figura_cacheada(
+        "detalle_tipo_cliente", version, dict(filtros, texto_busqueda=texto_busqueda),
+        lambda: _armar_tipo_cliente(conteos)
+    )
+
+# Función que arma el gráfico por tipo de cliente (ver figura_tipo_cliente)
+def _armar_tipo_cliente(conteos):
+    with etapa("agregacion"):
+        tipo_cliente_counts = conteos.groupby("TipoDeCliente", observed=True)["CantidadLeads"].sum().sort_values(ascending=False, kind="stable").reset_index()
+    tipo_cliente_counts.columns = ["TipoDeCliente", "Cantidad"]
+
+    return px.pie(
+        tipo_cliente_counts,
+        values="Cantidad",
+        names="TipoDeCliente",
+        title="Distribución por Tipo de Cliente",
+        hole=0.4
+    )
+
+# Función para obtener el gráfico de estado por tipo de cliente (página de detalles)
+def figura_estado_tipo_cliente(version, filtros, texto_busqueda, conteos):
+    """
+    Devuelve el gráfico de barras de los estados de los leads filtrados por tipo de cliente.
+
+    Args:
+        version (str): Versión de los datos
+        filtros (dict): Filtros de la página
+        texto_busqueda (str): Texto buscado ("" sin búsqueda)
+        conteos (DataFrame): Leads filtrados contados por Servicio, CanalOrigen, Estado y TipoDeCliente
+
+    Returns:
+        Figure: Gráfico de barras
+    """
+    return figura_cacheada(
+        "detalle_estado_tipo_cliente", version, dict(filtros, texto_busqueda=texto_busqueda),
+        lambda: _armar_estado_tipo_cliente(conteos)
+    )
+
+# Función que arma el gráfico de estado por tipo de cliente (ver figura_estado_tipo_cliente)
+def _armar_estado_tipo_cliente(conteos):
+    with etapa("agregacion"):
+        estado_tipo_cliente = conteos.groupby(["TipoDeCliente", "Estado"], observed=True)["CantidadLeads"].sum().reset_index(name="Cantidad")
+
+    return px.bar(
+        estado_tipo_cliente,
+        x="TipoDeCliente",
+        y="Cantidad",
+        color="Estado",
+        title="Estado de Leads por Tipo de Cliente",
+        barmode="group",
+        color_discrete_map=COLORES_ESTADO
+    )
+
+# Función para obtener el gráfico de tasa de efectividad por servicio y canal (página de detalles)
+def figura_efectividad(version, filtros, texto_busqueda, conteos):
+    """
+    Devuelve el gráfico de barras de la tasa de efectividad de los leads filtrados por servicio y canal.
+
+    Args:
+        version (str): Versión de los datos
+        filtros (dict): Filtros de la página
+        texto_busqueda (str): Texto buscado ("" sin búsqueda)
+        conteos (DataFrame): Leads filtrados contados por Servicio, CanalOrigen, Estado y TipoDeCliente
+
+    Returns:
+        Figure: Gráfico de barras
+    """
+    return figura_cacheada(
+        "detalle_efectividad", version, dict(filtros, texto_busqueda=texto_busqueda),
+        lambda: _armar_efectividad(conteos)
+    )
+
+# Función que arma el gráfico de efectividad (ver figura_efectividad)
+def _armar_efectividad(conteos):
+    fig_efectividad = px.bar(
+        calcular_metricas(conteos, ["Servicio", "CanalOrigen"], pesos="CantidadLeads", canales=[]),
+        x="Servicio",
+        y="TasaEfectividad",
+        color="CanalOrigen",
+        title="Tasa de Efectividad por Servicio y Canal",
+        barmode="group",
+        text_auto=".1%"
+    )
+
+    # Configurar formato de porcentaje
+    fig_efectividad.update_layout(yaxis_tickformat=".1%")
+    return fig_efectividad
@@ -0,0 +1,103 @@
+import threading
+import numpy as np
+from cachetools import LRUCache
+from datetime import date, datetime
+from utils.instrumentacion import etapa, midiendo, registrar_figura
+
+# Cantidad de figuras que se conservan entre reruns (compartidas por todas las sesiones)
+MAXIMO_FIGURAS = 128
+
+# Caché LRU de figuras: (id del gráfico, versión de datos, filtros) -> figura
+_figuras = LRUCache(maxsize=MAXIMO_FIGURAS)
+_candado = threading.Lock()
+
+# Tamaño serializado de las figuras de la caché, calculado solo cuando se mide una página
+_tamanos = LRUCache(maxsize=MAXIMO_FIGURAS)
+
+# Función para llevar un valor de filtro a una forma comparable y hasheable
+def _normalizar_valor(valor):
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        # El orden en que se eligieron las opciones no cambia el gráfico
+        return tuple(sorted((_normalizar_valor(elemento) for elemento in valor), key=repr))
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+# Función para normalizar los filtros que definen un gráfico
+def normalizar_filtros(filtros):
+    """
+    Convierte los filtros en una tupla ordenada e independiente del orden de selección.
+
+    Args:
+        filtros (dict): Filtros del gráfico (nombre -> valor)
+
+    Returns:
+        tuple: Pares (nombre, valor normalizado) ordenados por nombre
+    """
+    return tuple(sorted((nombre, _normalizar_valor(valor)) for nombre, valor in filtros.items()))
+
+# Función para contar los valores de una traza: celdas de un heatmap, puntos de una línea o sectores de un sunburst
+def _puntos_traza(traza):
+    for propiedad in ("z", "x", "values"):
+        valores = getattr(traza, propiedad, None)
+        if valores is not None:
+            return int(np.size(valores))
+    return 0
+
+# Función para medir lo que una figura le manda al navegador
+def tamano_figura(figura):
+    """
+    Cuenta los puntos de una figura y el tamaño de su JSON, que es lo que recibe el navegador.
+
+    Args:
+        figura (Figure): Figura de Plotly
+
+    Returns:
+        dict: puntos de todas las trazas, bytes del JSON y si alguna traza usa WebGL
+    """
+    return {
+        "puntos": sum(_puntos_traza(traza) for traza in figura.data),
+        "bytes": len(figura.to_json().encode("utf-8")),
+        "webgl": any(traza.type.endswith("gl") for traza in figura.data)
+    }
+
+# Función para anotar en la medición en curso el tamaño de cada figura de un gráfico
+def _registrar_tamanos(clave, id_grafico, figura):
+    figuras = figura if isinstance(figura, tuple) else (figura,)
+    with _candado:
+        tamanos = _tamanos.get(clave)
+    if tamanos is None:
+        tamanos = [tamano_figura(elemento) for elemento in figuras]
+        with _candado:
+            _tamanos[clave] = tamanos
+    for i, tamano in enumerate(tamanos):
+        registrar_figura(id_grafico if len(tamanos) == 1 else f"{id_grafico}[{i}]", tamano)
+
+# Función para obtener una figura de la caché o construirla si no está
+def figura_cacheada(id_grafico, version, filtros, construir):
+    """
+    Devuelve la figura del gráfico para esos filtros y versión de datos, construyéndola solo si hace falta.
+
+    Las figuras se comparten entre sesiones: no modificarlas después de obtenerlas. Si
+    se está midiendo la página, se anota el tamaño de cada figura (ver tamano_figura).
+
+    Args:
+        id_grafico (str): Identificador del gráfico (ej. "horario_dias")
+        version (str): Versión de los datos (ej. cubo.attrs["version"])
+        filtros (dict): Únicamente los filtros y opciones que afectan a este gráfico
+        construir (callable): Función sin argumentos que arma la figura (o una tupla de figuras)
+
+    Returns:
+        Figure: Figura del gráfico
+    """
+    clave = (id_grafico, version, normalizar_filtros(filtros))
+    with _candado:
+        figura = _figuras.get(clave)
+    if figura is None:
+        with etapa("figuras"):
+            figura = construir()
+        with _candado:
+            _figuras[clave] = figura
+    if midiendo():
+        _registrar_tamanos(clave, id_grafico, figura)
+    return figura
@@ -0,0 +1,259 @@
+import numpy as np
+import pandas as pd
+from functools import cached_property
+from utils.derivadas import COLUMNAS_DERIVADAS
+
+# Columnas sobre las que las páginas filtran por selección múltiple
+COLUMNAS_INDEXADAS = ['Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente', 'DiaSemana']
+
+# Columnas que abarca la búsqueda por texto
+COLUMNAS_TEXTO = ['Nombre', 'Email', 'Notas']
+
+# Valores que se procesan por vez al construir el índice de texto
+FILAS_POR_TRAMO = 50_000
+
+# Separador entre valores: ningún trigrama del índice lo contiene
+SEPARADOR = "\x00"
+
+# Bits de cada carácter de un trigrama y del número de valor en las claves del índice de texto.
+# Las claves son int64 con signo: 3 * BITS_SIMBOLO + BITS_VALOR no puede pasar de 63
+BITS_SIMBOLO = 11
+BITS_VALOR = 30
+SIMBOLO_MAXIMO = (1 << BITS_SIMBOLO) - 1
+MASCARA_VALOR = (1 << BITS_VALOR) - 1
+
+# Índice de máscaras booleanas por valor, construido una sola vez al cargar los datos
+class IndiceBitmap:
+    """
+    Guarda, para cada columna indexada, una máscara booleana por valor posible.
+
+    Un filtro de selección múltiple se resuelve como OR de las máscaras de los
+    valores elegidos, y varios filtros como AND entre columnas, sin volver a
+    comparar los valores de cada fila.
+
+    Args:
+        df (DataFrame): Leads tal como los devuelve cargar_datos (posiciones fijas)
+        columnas (list): Columnas a indexar
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_INDEXADAS):
+        self.filas = len(df)
+        self.mascaras = {}
+        for columna in columnas:
+            if columna not in df.columns and columna not in COLUMNAS_DERIVADAS:
+                continue
+            codigos, valores = pd.factorize(df.derivadas[columna])
+            self.mascaras[columna] = {valor: codigos == i for i, valor in enumerate(valores)}
+
+    def mascara(self, columna, valores, inicio=0, fin=None):
+        """
+        Devuelve la máscara de las filas [inicio, fin) cuyo valor está en valores.
+
+        Args:
+            columna (str): Columna indexada
+            valores (list): Valores aceptados
+            inicio (int): Primera posición del tramo
+            fin (int): Posición final (exclusiva) del tramo
+
+        Returns:
+            ndarray: Máscara booleana del tramo, o None si el filtro no descarta nada
+        """
+        mascaras = self.mascaras[columna]
+        aceptados = set(valores)
+        elegidos = [valor for valor in mascaras if valor in aceptados]
+        excluidos = [valor for valor in mascaras if valor not in aceptados]
+        if not excluidos:
+            return None
+
+        # Si se eligió la mayoría de los valores conviene negar el OR de los excluidos
+        fin = self.filas if fin is None else fin
+        if len(excluidos) < len(elegidos):
+            return ~self._union(mascaras, excluidos, inicio, fin)
+        return self._union(mascaras, elegidos, inicio, fin)
+
+    def _union(self, mascaras, valores, inicio, fin):
+        resultado = np.zeros(fin - inicio, dtype=bool)
+        for valor in valores:
+            resultado |= mascaras[valor][inicio:fin]
+        return resultado
+
+# Selección de leads que se materializa recién cuando una página necesita las filas
+class SeleccionLeads:
+    """
+    Resultado de aplicar filtros sobre un tramo de fechas.
+
+    Args:
+        df (DataFrame): Leads completos
+        inicio (int): Primera posición del tramo de fechas
+        fin (int): Posición final (exclusiva) del tramo de fechas
+        mascara (ndarray): Máscara booleana dentro del tramo, o None si no hay filtros
+    """
+
+    def __init__(self, df, inicio, fin, mascara=None):
+        self.df = df
+        self.inicio = inicio
+        self.fin = fin
+        self.mascara = mascara
+
+    @cached_property
+    def cantidad(self):
+        """Cantidad de leads seleccionados, sin materializar las filas."""
+        if self.mascara is None:
+            return self.fin - self.inicio
+        return int(np.count_nonzero(self.mascara))
+
+    @cached_property
+    def posiciones(self):
+        """Posiciones (para iloc) de los leads seleccionados."""
+        if self.mascara is None:
+            return np.arange(self.inicio, self.fin)
+        return np.flatnonzero(self.mascara) + self.inicio
+
+    @cached_property
+    def datos(self):
+        """DataFrame con los leads seleccionados."""
+        tramo = self.df.iloc[self.inicio:self.fin]
+        if self.mascara is None:
+            return tramo
+        return tramo[self.mascara]
+
+# Función para llevar textos a minúsculas y sin acentos, para comparar sin distinguirlos
+def normalizar_texto(serie):
+    """
+    Normaliza una serie de textos: minúsculas y sin marcas diacríticas (á -> a, ñ -> n).
+
+    Args:
+        serie (Series): Textos a normalizar (los nulos quedan como texto vacío)
+
+    Returns:
+        Series: Textos normalizados
+    """
+    return (
+        serie.fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.replace(r"[\u0300-\u036f]", "", regex=True)
+        .str.replace(SEPARADOR, "", regex=False)
+        .str.lower()
+    )
+
+# Índice de trigramas para la búsqueda por texto, construido una sola vez al cargar los datos
+class IndiceTexto:
+    """
+    Guarda, para cada columna de texto, los trigramas de cada valor distinto de la columna.
+
+    Los valores repetidos (notas estándar, nombres) se normalizan e indexan una sola vez.
+    Una búsqueda intersecta las listas de los trigramas del texto buscado, empezando
+    por la más corta, verifica la coincidencia exacta solo sobre esos valores y
+    después marca las filas que los tienen. El texto se busca literal (no como
+    expresión regular), sin distinguir mayúsculas ni acentos.
+
+    Args:
+        df (DataFrame): Leads tal como los devuelve cargar_datos (posiciones fijas)
+        columnas (list): Columnas de texto a indexar
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_TEXTO):
+        self.filas = len(df)
+
+        # Por columna: código de valor de cada fila (-1 si es nulo) y los valores distintos normalizados
+        valores = {}
+        for columna in columnas:
+            if columna not in df.columns:
+                continue
+            codigos, unicos = pd.factorize(df[columna])
+            valores[columna] = (codigos.astype(np.int32), normalizar_texto(pd.Series(unicos, dtype=object)))
+
+        # Los caracteres presentes se numeran desde 1 (0 es el separador), así un trigrama
+        # entra en 3 * BITS_SIMBOLO bits y queda lugar para el número de valor en la misma clave
+        presentes = np.zeros(0x110000, dtype=bool)
+        for _, textos in valores.values():
+            for inicio in range(0, len(textos), FILAS_POR_TRAMO):
+                presentes[self._codigos(textos.iloc[inicio:inicio + FILAS_POR_TRAMO])] = True
+        presentes[0] = False
+        self.alfabeto = np.flatnonzero(presentes)
+        # Si hay más caracteres que símbolos, los últimos comparten uno y la verificación descarta los sobrantes
+        self.exacto = len(self.alfabeto) <= SIMBOLO_MAXIMO
+        simbolos = np.zeros(0x110000, dtype=np.int64)
+        simbolos[self.alfabeto] = np.minimum(np.arange(1, len(self.alfabeto) + 1), SIMBOLO_MAXIMO)
+
+        self.columnas = {}
+        for columna, (codigos, textos) in valores.items():
+            claves = [
+                self._trigramas(simbolos[self._codigos(textos.iloc[inicio:inicio + FILAS_POR_TRAMO])], inicio)
+                for inicio in range(0, len(textos), FILAS_POR_TRAMO)
+            ]
+            claves = np.sort(np.concatenate(claves)) if claves else np.empty(0, dtype=np.int64)
+            self.columnas[columna] = (codigos, textos, claves)
+
+    @staticmethod
+    def _codigos(textos):
+        # Puntos de código de los textos, cada uno seguido del separador
+        cadena = SEPARADOR.join(textos) + SEPARADOR
+        return np.frombuffer(cadena.encode("utf-32-le"), dtype=np.uint32)
+
+    @staticmethod
+    def _trigramas(simbolos, inicio):
+        # Clave = trigrama (tres símbolos de 11 bits) seguido del número de valor, ordenadas y sin repetir
+        numeros = inicio + np.cumsum(simbolos == 0)
+        validos = (simbolos[:-2] != 0) & (simbolos[1:-1] != 0) & (simbolos[2:] != 0)
+        trigramas = (simbolos[:-2] << (2 * BITS_SIMBOLO)) | (simbolos[1:-1] << BITS_SIMBOLO) | simbolos[2:]
+        claves = np.sort(((trigramas << BITS_VALOR) | numeros[:-2])[validos])
+        unicos = np.ones(len(claves), dtype=bool)
+        unicos[1:] = claves[1:] != claves[:-1]
+        return claves[unicos]
+
+    def _valores(self, claves, consulta):
+        # Valores distintos de la columna que contienen todos los trigramas de la consulta
+        caracteres = np.array([ord(caracter) for caracter in consulta])
+        simbolos = np.searchsorted(self.alfabeto, caracteres)
+        # Un carácter que no aparece en ningún texto no puede coincidir
+        if (simbolos == len(self.alfabeto)).any() or (self.alfabeto[simbolos] != caracteres).any():
+            return np.empty(0, dtype=np.int64)
+        simbolos = np.minimum(simbolos + 1, SIMBOLO_MAXIMO)
+
+        listas = []
+        for a, b, c in set(zip(simbolos, simbolos[1:], simbolos[2:])):
+            trigrama = (int(a) << (2 * BITS_SIMBOLO)) | (int(b) << BITS_SIMBOLO) | int(c)
+            # Cota superior inclusiva: (trigrama + 1) << BITS_VALOR no entra en int64 con el trigrama máximo
+            desde = np.searchsorted(claves, trigrama << BITS_VALOR, side="left")
+            hasta = np.searchsorted(claves, (trigrama << BITS_VALOR) | MASCARA_VALOR, side="right")
+            listas.append(claves[desde:hasta] & MASCARA_VALOR)
+
+        numeros = None
+        for lista in sorted(listas, key=len):
+            numeros = lista if numeros is None else np.intersect1d(numeros, lista, assume_unique=True)
+            if len(numeros) == 0:
+                break
+        return numeros
+
+    def buscar(self, texto, posiciones=None):
+        """
+        Devuelve las posiciones de las filas cuyos campos de texto contienen texto.
+
+        Args:
+            texto (str): Texto a buscar
+            posiciones (ndarray): Posiciones ordenadas a las que limitar la búsqueda (ej. las ya filtradas)
+
+        Returns:
+            ndarray: Posiciones ordenadas (para iloc) de las filas que coinciden
+        """
+        consulta = normalizar_texto(pd.Series([texto])).iloc[0]
+        candidatos = np.arange(self.filas) if posiciones is None else np.asarray(posiciones)
+        if not consulta:
+            return candidatos
+
+        coincide = np.zeros(len(candidatos), dtype=bool)
+        for codigos, textos, claves in self.columnas.values():
+            if len(consulta) >= 3:
+                numeros = self._valores(claves, consulta)
+                # Con un solo trigrama (y sin símbolos compartidos) la coincidencia ya es exacta
+                if len(consulta) > 3 or not self.exacto:
+                    numeros = numeros[textos.iloc[numeros].str.contains(consulta, regex=False).to_numpy()]
+            else:
+                numeros = np.flatnonzero(textos.str.contains(consulta, regex=False).to_numpy())
+
+            # Un lugar extra al final para las filas nulas (código -1)
+            valores_coinciden = np.zeros(len(textos) + 1, dtype=bool)
+            valores_coinciden[numeros] = True
+            coincide |= valores_coinciden[codigos if posiciones is None else codigos[candidatos]]
+        return candidatos[coincide]
@@ -0,0 +1,379 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+import streamlit as st
+
+# Etapas de una ejecución de página, en el orden en que se muestran
+ETAPAS = ["carga", "filtros", "agregacion", "figuras", "serializacion", "exportacion"]
+
+# Variable de entorno que activa la medición en todas las sesiones (solo logs)
+VARIABLE_DIAGNOSTICO = "PORTAL_DIAGNOSTICO"
+
+# Ejecuciones que se guardan por sesión para el panel de diagnóstico
+MAXIMO_EJECUCIONES = 20
+
+# Informes adicionales del panel de diagnóstico: título -> función que devuelve una lista de dicts
+INFORMES = {}
+
+# Logs estructurados: una línea JSON por ejecución de página
+logger = logging.getLogger("portal.instrumentacion")
+if not logger.handlers:
+    _manejador = logging.StreamHandler()
+    _manejador.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_manejador)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Medición de la ejecución en curso (cada ejecución de página corre en su propio hilo)
+_medicion_actual = contextvars.ContextVar("medicion_actual", default=None)
+
+# tracemalloc es global al proceso y multiplica el costo de reservar memoria: solo lo
+# usa una medición a la vez (la de un administrador con el panel abierto) y solo
+# mientras dura su ejecución
+# (reentrante: el recolector puede soltar una medición perdida con el candado tomado)
+_candado_trazas = threading.RLock()
+_medicion_con_trazas = None
+
+# Función para activar el seguimiento de memoria para una medición, si nadie más lo usa
+def _tomar_trazas(medicion):
+    global _medicion_con_trazas
+    with _candado_trazas:
+        if _medicion_con_trazas is not None and _medicion_con_trazas() is not None:
+            return None
+        # Si la sesión que lo tenía se pierde sin cerrar su medición, se libera al descartarla
+        _medicion_con_trazas = weakref.ref(medicion, _soltar_trazas)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return _medicion_con_trazas
+
+# Función para desactivar el seguimiento de memoria cuando termina la medición que lo usaba
+def _soltar_trazas(referencia):
+    global _medicion_con_trazas
+    with _candado_trazas:
+        if _medicion_con_trazas is referencia:
+            _medicion_con_trazas = None
+            tracemalloc.stop()
+
+# Tiempos y memoria de las etapas de una ejecución de página
+class MedicionPagina:
+    """
+    Acumula, por etapa, el tiempo y el pico de memoria de una ejecución de página.
+
+    Las etapas pueden anidarse (ej. la agregación dentro de la construcción de una
+    figura): cada una se queda con su tiempo propio, sin el de las etapas internas.
+    Si se pide, la memoria es el pico de lo reservado por Python, numpy y pandas
+    durante la etapa, medido con tracemalloc. Es memoria del proceso: incluye lo que
+    reserven a la vez otras sesiones. Solo una medición por vez sigue la memoria; si
+    otra ya la usa, esta mide solo los tiempos. También se anotan los puntos y el
+    tamaño serializado de cada figura de la página (ver registrar_figura).
+
+    Args:
+        pagina (str): Nombre de la página medida
+        memoria (bool): Si además de los tiempos se mide la memoria
+    """
+
+    def __init__(self, pagina, memoria=False):
+        self.pagina = pagina
+        self.fecha = datetime.now()
+        self.etapas = {}
+        self.figuras = {}
+        self._pila = []
+        self._trazas = _tomar_trazas(self) if memoria else None
+        self.memoria = self._trazas is not None
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def etapa(self, nombre):
+        """
+        Mide el bloque como parte de la etapa nombre.
+
+        Args:
+            nombre (str): Etapa (una de ETAPAS u otra nueva)
+        """
+        if not self.memoria:
+            self._pila.append({"internas": 0.0})
+            inicio = time.perf_counter()
+            try:
+                yield
+            finally:
+                self._registrar(nombre, self._pila.pop(), time.perf_counter() - inicio)
+            return
+
+        actual, pico = tracemalloc.get_traced_memory()
+        if self._pila:
+            # El pico de la etapa externa hasta acá se conserva antes de reiniciarlo
+            self._pila[-1]["pico"] = max(self._pila[-1]["pico"], pico)
+        tracemalloc.reset_peak()
+        marco = {"base": actual, "pico": actual, "internas": 0.0}
+        self._pila.append(marco)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            marco["pico"] = max(marco["pico"], tracemalloc.get_traced_memory()[1])
+            self._pila.pop()
+            if self._pila:
+                self._pila[-1]["pico"] = max(self._pila[-1]["pico"], marco["pico"])
+            self._registrar(nombre, marco, segundos)
+
+    def _registrar(self, nombre, marco, segundos):
+        # Suma a la etapa su tiempo propio (sin las internas) y, si se mide, su pico de memoria
+        if self._pila:
+            self._pila[-1]["internas"] += segundos
+        registro = self.etapas.setdefault(nombre, {"segundos": 0.0, "veces": 0, "memoria_pico_mb": None})
+        registro["segundos"] += segundos - marco["internas"]
+        registro["veces"] += 1
+        if self.memoria:
+            registro["memoria_pico_mb"] = max(registro["memoria_pico_mb"] or 0.0, (marco["pico"] - marco["base"]) / 2**20)
+
+    def cerrar(self):
+        """
+        Termina la medición y devuelve su resumen.
+
+        Returns:
+            dict: Página, fecha, segundos totales y tiempos/memoria por etapa
+        """
+        total = time.perf_counter() - self._inicio
+        if self._trazas is not None:
+            _soltar_trazas(self._trazas)
+
+        orden = {etapa: i for i, etapa in enumerate(ETAPAS)}
+        etapas = {
+            nombre: {clave: round(valor, 4) if isinstance(valor, float) else valor for clave, valor in registro.items()}
+            for nombre, registro in sorted(self.etapas.items(), key=lambda item: orden.get(item[0], len(orden)))
+        }
+        otros = total - sum(registro["segundos"] for registro in self.etapas.values())
+        return {
+            "pagina": self.pagina,
+            "fecha": self.fecha.isoformat(timespec="seconds"),
+            "segundos": round(total, 4),
+            "otros_segundos": round(max(otros, 0.0), 4),
+            "memoria": self.memoria,
+            "etapas": etapas,
+            "figuras": self.figuras
+        }
+
+# Contexto vacío que se reutiliza cuando no hay medición en curso
+class _SinMedicion:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *excepcion):
+        return False
+
+_SIN_MEDICION = _SinMedicion()
+
+# Función para medir un bloque como una etapa de la ejecución en curso
+def etapa(nombre):
+    """
+    Devuelve un contexto que mide el bloque como parte de la etapa nombre.
+
+    Sin una medición en curso no mide nada: el costo es una consulta a la variable de contexto.
+
+    Args:
+        nombre (str): Etapa (una de ETAPAS)
+
+    Returns:
+        Contexto para usar con with
+    """
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return _SIN_MEDICION
+    return medicion.etapa(nombre)
+
+# Función para marcar todas las llamadas a una función como parte de una etapa
+def medir_etapa(nombre):
+    """
+    Decorador que mide cada llamada a la función como parte de la etapa nombre.
+
+    Args:
+        nombre (str): Etapa (una de ETAPAS)
+
+    Returns:
+        Decorador
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            medicion = _medicion_actual.get()
+            if medicion is None:
+                return funcion(*args, **kwargs)
+            with medicion.etapa(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+# Función para saber si hay una medición en curso (ej. antes de calcular algo solo para el panel)
+def midiendo():
+    """
+    Indica si la ejecución actual se está midiendo.
+
+    Returns:
+        bool: True si hay una medición en curso
+    """
+    return _medicion_actual.get() is not None
+
+# Función para anotar el tamaño de una figura en la medición en curso
+def registrar_figura(nombre, tamano):
+    """
+    Anota los puntos y el tamaño serializado de una figura de la ejecución.
+
+    Sin una medición en curso no hace nada.
+
+    Args:
+        nombre (str): Identificador de la figura (ej. "servicio_tendencia")
+        tamano (dict): Puntos, bytes y si usa WebGL (ver graficos.tamano_figura)
+    """
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        medicion.figuras[nombre] = tamano
+
+# Función para agregar un informe al panel de diagnóstico
+def registrar_informe(titulo, funcion):
+    """
+    Registra un informe que el panel de diagnóstico muestra como tabla.
+
+    Args:
+        titulo (str): Título del informe en el panel
+        funcion (callable): Función sin argumentos que devuelve una lista de dicts (una fila cada uno)
+    """
+    INFORMES[titulo] = funcion
+
+# Función para saber si la sesión actual pidió el modo diagnóstico
+def _diagnostico_activo():
+    return st.session_state.get("role") == "admin" and st.session_state.get("diagnostico", False)
+
+# Función para empezar a medir la ejecución de una página
+def iniciar_medicion(pagina):
+    """
+    Empieza a medir la ejecución actual si el modo diagnóstico está activo.
+
+    Se activa con el interruptor del panel (solo administradores) o, para todas
+    las sesiones, con la variable de entorno PORTAL_DIAGNOSTICO=1. La memoria solo se
+    mide con el panel abierto; con la variable de entorno se miden solo los tiempos.
+
+    Args:
+        pagina (str): Nombre de la página medida
+
+    Returns:
+        MedicionPagina: Medición en curso, o None si está desactivada
+    """
+    # Reasignar el valor del interruptor lo conserva al pasar a otra página
+    if "diagnostico" in st.session_state:
+        st.session_state.diagnostico = st.session_state.diagnostico
+
+    # Una medición que quedó abierta (ej. la ejecución anterior se interrumpió) se descarta
+    anterior = st.session_state.pop("_medicion", None)
+    if anterior is not None:
+        anterior.cerrar()
+
+    medicion = None
+    panel = _diagnostico_activo()
+    if panel or os.environ.get(VARIABLE_DIAGNOSTICO) == "1":
+        medicion = MedicionPagina(pagina, memoria=panel)
+        st.session_state["_medicion"] = medicion
+    _medicion_actual.set(medicion)
+    return medicion
+
+# Función para terminar la medición, registrarla y mostrar el panel de diagnóstico
+def cerrar_medicion():
+    """
+    Termina la medición de la ejecución actual, la escribe en el log y, para
+    administradores, muestra el interruptor y el panel de diagnóstico.
+    """
+    medicion = st.session_state.pop("_medicion", None)
+    _medicion_actual.set(None)
+    if medicion is not None:
+        resumen = medicion.cerrar()
+        logger.info(json.dumps(resumen, ensure_ascii=False))
+        historial = st.session_state.setdefault("diagnosticos", [])
+        historial.append(resumen)
+        del historial[:-MAXIMO_EJECUCIONES]
+
+    if st.session_state.get("role") != "admin":
+        return
+    st.sidebar.toggle(
+        "🩺 Modo diagnóstico",
+        key="diagnostico",
+        help="Mide el tiempo y la memoria de cada etapa de la página"
+    )
+    if medicion is not None and st.session_state.diagnostico:
+        mostrar_diagnostico(resumen, st.session_state["diagnosticos"])
+
+# Función para mostrar el panel de diagnóstico de la ejecución
+def mostrar_diagnostico(resumen, historial):
+    """
+    Muestra los tiempos y la memoria por etapa de la ejecución y las anteriores de la sesión.
+
+    Args:
+        resumen (dict): Resumen de la ejecución actual (como lo devuelve MedicionPagina.cerrar)
+        historial (list): Resúmenes de las últimas ejecuciones de la sesión
+    """
+    with st.expander("🩺 Diagnóstico de esta ejecución", expanded=True):
+        st.caption(
+            f"{resumen['pagina']}: {resumen['segundos']:.3f} s en total, "
+            f"{resumen['otros_segundos']:.3f} s fuera de las etapas medidas"
+        )
+        if not resumen["memoria"]:
+            st.caption("La memoria no se midió en esta ejecución: otra sesión la estaba midiendo.")
+        etapas = pd.DataFrame.from_dict(resumen["etapas"], orient="index").rename_axis("Etapa").reset_index()
+        if not etapas.empty:
+            etapas["Porcentaje"] = 100 * etapas["segundos"] / resumen["segundos"] if resumen["segundos"] else 0.0
+        st.dataframe(
+            etapas,
+            column_config={
+                "segundos": st.column_config.NumberColumn("Segundos", format="%.4f"),
+                "veces": st.column_config.NumberColumn("Llamadas", format="%d"),
+                "memoria_pico_mb": st.column_config.NumberColumn(
+                    "Memoria pico del proceso (MB)",
+                    format="%.1f",
+                    help="Incluye lo que reservan a la vez las demás sesiones"
+                ),
+                "Porcentaje": st.column_config.ProgressColumn("Porcentaje", format="%.0f%%", min_value=0, max_value=100)
+            },
+            use_container_width=True,
+            hide_index=True
+        )
+
+        if resumen["figuras"]:
+            figuras = pd.DataFrame.from_dict(resumen["figuras"], orient="index").rename_axis("Figura").reset_index()
+            st.markdown(f"**Figuras de la página** ({figuras['bytes'].sum() / 2**10:.0f} KB en total)")
+            st.dataframe(
+                figuras.assign(bytes=figuras["bytes"] / 2**10),
+                column_config={
+                    "puntos": st.column_config.NumberColumn("Puntos", format="%d"),
+                    "bytes": st.column_config.NumberColumn("Tamaño (KB)", format="%.1f"),
+                    "webgl": st.column_config.CheckboxColumn("WebGL")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+
+        st.markdown("**Últimas ejecuciones de la sesión**")
+        st.dataframe(
+            pd.DataFrame([
+                {
+                    "Fecha": ejecucion["fecha"],
+                    "Pagina": ejecucion["pagina"],
+                    "Total": ejecucion["segundos"],
+                    **{nombre: registro["segundos"] for nombre, registro in ejecucion["etapas"].items()}
+                }
+                for ejecucion in reversed(historial)
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+
+        for titulo, funcion in INFORMES.items():
+            st.markdown(f"**{titulo}**")
+            st.dataframe(pd.DataFrame(funcion()), use_container_width=True, hide_index=True)
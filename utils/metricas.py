@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from utils.instrumentacion import medir_etapa
+
+# Canales que se desglosan en las tablas de métricas
+CANALES_METRICAS = ['Chatbot', 'WhatsApp']
+
+# Estados que se desglosan en las tablas de métricas: valor -> nombre de la columna
+ESTADOS_METRICAS = {'Asesorado': 'Asesorados', 'Pendiente': 'Pendientes', 'Descartado': 'Descartados'}
+
+# Función para contar, por grupo, las filas de cada valor de una columna
+def _conteos_por_valor(ids, cantidad_grupos, columna, valores, pesos):
+    # Código de cada fila dentro de valores (-1 si no es ninguno de ellos)
+    codigos = pd.Categorical(columna, categories=valores).codes.astype(np.int64)
+    elegidas = codigos >= 0
+
+    # Un solo bincount sobre (grupo, valor) en lugar de una comparación por valor
+    celdas = ids[elegidas] * len(valores) + codigos[elegidas]
+    conteos = np.bincount(
+        celdas,
+        weights=None if pesos is None else pesos[elegidas],
+        minlength=cantidad_grupos * len(valores)
+    )
+    return conteos.reshape(cantidad_grupos, len(valores))
+
+# Función para calcular las métricas de leads de cualquier agrupación
+@medir_etapa("agregacion")
+def calcular_metricas(df, agrupar, pesos=None, canales=CANALES_METRICAS, estados=ESTADOS_METRICAS):
+    """
+    Calcula Total, leads por canal, leads por estado y TasaEfectividad para cada grupo.
+
+    Cada fila se asigna a su grupo una sola vez y los conteos salen de bincount,
+    sin evaluar funciones de Python por grupo. Con pesos se puede calcular sobre
+    conteos ya agregados (ej. el cubo), donde cada fila vale por varios leads.
+
+    Args:
+        df (DataFrame): Leads (o conteos) con las columnas de agrupar, CanalOrigen y Estado
+        agrupar (list): Columnas por las que agrupar
+        pesos (str): Columna con la cantidad de leads de cada fila (None si cada fila es un lead)
+        canales (list): Canales a desglosar en columnas propias
+        estados (dict): Estados a desglosar: valor -> nombre de la columna
+
+    Returns:
+        DataFrame: Columnas de agrupar, Total, una por canal y por estado, y TasaEfectividad
+    """
+    grupos = df.groupby(agrupar, observed=True)
+    ids = grupos.ngroup().to_numpy()
+    claves = grupos.size().index
+    valores_pesos = None if pesos is None else df[pesos].to_numpy(dtype=np.float64)
+
+    totales = np.bincount(ids, weights=valores_pesos, minlength=len(claves))
+    metricas = {"Total": totales}
+    if canales:
+        por_canal = _conteos_por_valor(ids, len(claves), df["CanalOrigen"], canales, valores_pesos)
+        metricas.update({canal: por_canal[:, i] for i, canal in enumerate(canales)})
+    if estados:
+        por_estado = _conteos_por_valor(ids, len(claves), df["Estado"], list(estados), valores_pesos)
+        metricas.update({columna: por_estado[:, i] for i, columna in enumerate(estados.values())})
+
+    resultado = pd.DataFrame({nombre: np.rint(valores).astype(np.int64) for nombre, valores in metricas.items()}, index=claves)
+
+    # La tasa se calcula sobre los asesorados aunque no se desglosen como columna
+    if "Asesorado" in estados:
+        asesorados = metricas[estados["Asesorado"]]
+    else:
+        asesorados = _conteos_por_valor(ids, len(claves), df["Estado"], ["Asesorado"], valores_pesos)[:, 0]
+    resultado["TasaEfectividad"] = np.divide(asesorados, totales, out=np.zeros(len(claves)), where=totales > 0)
+    return resultado.reset_index()
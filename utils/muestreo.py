@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Puntos que puede mandar al navegador un gráfico de líneas, sumando todas sus trazas
+PRESUPUESTO_PUNTOS = 2000
+
+# Puntos del gráfico a partir de los cuales las trazas se dibujan con WebGL (Scattergl)
+UMBRAL_WEBGL = 1000
+
+# Puntos por traza hasta los que se dibujan marcadores (con más, solo la línea)
+MAXIMO_MARCADORES = 150
+
+# Función para elegir los puntos que conservan la forma de una serie (Largest-Triangle-Three-Buckets)
+def lttb(x, y, puntos):
+    """
+    Elige puntos de la serie con el algoritmo Largest-Triangle-Three-Buckets.
+
+    Conserva el primer y el último punto y, de cada tramo intermedio, el que forma el
+    triángulo más grande con el punto elegido antes y el promedio del tramo siguiente;
+    así se mantienen los picos y los valles que un muestreo regular perdería.
+
+    Args:
+        x (array): Valores del eje x, ordenados (numéricos o fechas)
+        y (array): Valores del eje y
+        puntos (int): Puntos a conservar
+
+    Returns:
+        ndarray: Posiciones de los puntos elegidos, en orden
+    """
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype("int64")
+    x = x.astype("float64")
+    y = np.asarray(y, dtype="float64")
+
+    # puntos - 2 tramos entre el primer y el último punto, todos con al menos un punto
+    bordes = np.linspace(1, n - 1, puntos - 1).astype("int64")
+    elegidos = np.empty(puntos, dtype="int64")
+    elegidos[0], elegidos[-1] = 0, n - 1
+    anterior = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        x_medio, y_medio = x[fin:siguiente_fin].mean(), y[fin:siguiente_fin].mean()
+        areas = np.abs(
+            (x[anterior] - x_medio) * (y[inicio:fin] - y[anterior])
+            - (x[anterior] - x[inicio:fin]) * (y_medio - y[anterior])
+        )
+        anterior = inicio + int(areas.argmax())
+        elegidos[i + 1] = anterior
+    return elegidos
+
+# Función para reducir las series de un gráfico al presupuesto de puntos
+def reducir_puntos(df, x, y, color=None, presupuesto=PRESUPUESTO_PUNTOS):
+    """
+    Reparte el presupuesto entre las trazas y reduce con LTTB las que lo superan.
+
+    Args:
+        df (DataFrame): Datos del gráfico
+        x (str): Columna del eje x
+        y (str): Columna del eje y
+        color (str): Columna que separa las trazas (None para una sola)
+        presupuesto (int): Puntos máximos del gráfico
+
+    Returns:
+        DataFrame: Filas conservadas, ordenadas por x dentro de cada traza
+    """
+    trazas = [df] if color is None else [grupo for _, grupo in df.groupby(color, observed=True, sort=False)]
+    por_traza = max(presupuesto // max(len(trazas), 1), 3)
+    if all(len(traza) <= por_traza for traza in trazas):
+        return df
+
+    partes = []
+    for traza in trazas:
+        traza = traza.sort_values(x, kind="stable")
+        partes.append(traza.iloc[lttb(traza[x].to_numpy(), traza[y].to_numpy(), por_traza)])
+    return pd.concat(partes)
+
+# Función para armar un gráfico de líneas que respeta el presupuesto de puntos
+def grafico_lineas(df, x, y, color=None, presupuesto=PRESUPUESTO_PUNTOS, **opciones):
+    """
+    Arma un px.line con las series reducidas al presupuesto de puntos.
+
+    Con pocos puntos por traza se dibujan marcadores; con muchos puntos en el gráfico,
+    las trazas pasan a WebGL, que el navegador dibuja mucho más rápido que SVG.
+
+    Args:
+        df (DataFrame): Datos del gráfico
+        x (str): Columna del eje x
+        y (str): Columna del eje y
+        color (str): Columna que separa las trazas (None para una sola)
+        presupuesto (int): Puntos máximos del gráfico
+        **opciones: Resto de los argumentos de px.line (title, labels, ...)
+
+    Returns:
+        Figure: Gráfico de líneas
+    """
+    reducido = reducir_puntos(df, x, y, color, presupuesto)
+    mayor_traza = reducido.groupby(color, observed=True).size().max() if color is not None and len(reducido) else len(reducido)
+    return px.line(
+        reducido,
+        x=x,
+        y=y,
+        color=color,
+        markers=bool(mayor_traza <= MAXIMO_MARCADORES),
+        render_mode="webgl" if len(reducido) > UMBRAL_WEBGL else "svg",
+        **opciones
+    )
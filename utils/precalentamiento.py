@@ -0,0 +1,122 @@
+import time
+from datetime import datetime
+from utils.agentes import cargar_resumen_agentes
+from utils.alertas import cargar_alertas
+from utils.almacen_sql import backend_sql, cargar_base_sql, cargar_conteos
+from utils.data_loader import cargar_datos, cargar_indice, cargar_indice_texto, seleccionar_leads
+from utils.figuras import (
+    TIPOS_GRAFICO_SERVICIO, VISTAS_TEMPORALES, figura_dias, figura_efectividad, figura_estado_tipo_cliente,
+    figura_heatmap, figura_servicio_estado, figura_servicio_principal, figura_tendencia, figura_tipo_cliente,
+    figuras_por_hora
+)
+from utils.series import cargar_series, consultar_series
+
+# Filtros de selección múltiple de la página de detalles: filtro -> columna (por defecto, todos los valores)
+FILTROS_DETALLES = {"servicios": "Servicio", "canales": "CanalOrigen", "estados": "Estado", "tipos_cliente": "TipoDeCliente"}
+
+# Función para armar el rango de fechas por defecto de las páginas (del primer al último día, completos)
+def _rango_por_defecto(fecha_min, fecha_max):
+    return dict(
+        fecha_inicio=datetime.combine(fecha_min.date(), datetime.min.time()),
+        fecha_fin=datetime.combine(fecha_max.date(), datetime.max.time())
+    )
+
+# Función para cargar el resumen por agente de la página principal
+def _principal():
+    cargar_resumen_agentes()
+
+# Función para armar las figuras por defecto y cargar las alertas de la página por horario
+def _horario():
+    conteos = cargar_conteos()
+    filtros = dict(
+        _rango_por_defecto(*conteos.rango_fechas()),
+        servicios=conteos.valores("Servicio"),
+        canales=conteos.valores("CanalOrigen"),
+        excluir_domingos=True
+    )
+    figuras_por_hora(conteos, filtros, VISTAS_TEMPORALES[0])
+    figura_dias(conteos, filtros)
+    figura_heatmap(conteos, filtros)
+    cargar_alertas(conteos)
+
+# Función para armar las figuras por defecto y la consulta de la tabla resumen de la página por servicio
+def _servicio():
+    conteos = cargar_conteos()
+    filtros = dict(
+        _rango_por_defecto(*conteos.rango_fechas()),
+        canales=conteos.valores("CanalOrigen"),
+        estados=conteos.valores("Estado"),
+        excluir_domingos=True
+    )
+    figura_servicio_principal(conteos, filtros, TIPOS_GRAFICO_SERVICIO[0])
+    figura_servicio_estado(conteos, filtros)
+    conteos.consultar(["Servicio", "CanalOrigen", "Estado"], **filtros)
+
+# Función para cargar los leads (o la base SQL) y los índices, y armar las figuras por defecto de la página de detalles
+def _detalles():
+    dimensiones = ["Servicio", "CanalOrigen", "Estado", "TipoDeCliente"]
+    if backend_sql():
+        base = cargar_base_sql()
+        version = base.version
+        filtros = dict(
+            _rango_por_defecto(*base.rango_fechas()),
+            **{filtro: base.valores(columna) for filtro, columna in FILTROS_DETALLES.items()}
+        )
+        conteos = base.consultar(dimensiones, **filtros)
+        contar_por_periodo = lambda resolucion: base.tendencia(resolucion, [], **filtros)
+    else:
+        df = cargar_datos()
+        indice = cargar_indice(df)
+        cargar_indice_texto(df)
+        version = df.attrs["version"]
+        filtros = dict(
+            _rango_por_defecto(df["FechaIngreso"].min(), df["FechaIngreso"].max()),
+            **{filtro: df[columna].unique().tolist() for filtro, columna in FILTROS_DETALLES.items()}
+        )
+        seleccion = seleccionar_leads(df, indice=indice, **filtros)
+        conteos = seleccion.datos.groupby(dimensiones, observed=True).size().reset_index(name="CantidadLeads")
+        contar_por_periodo = lambda resolucion: consultar_series(cargar_series(), resolucion, [], **filtros)
+
+    # Sin búsqueda por texto, como al abrir la página
+    figura_tendencia(version, filtros, "", contar_por_periodo)
+    for figura in (figura_tipo_cliente, figura_estado_tipo_cliente, figura_efectividad):
+        figura(version, filtros, "", conteos)
+
+# Páginas que se precalientan al arrancar el servidor: página -> función que hace sus cargas y arma sus figuras
+PAGINAS_PRECALENTADAS = {
+    "app.py": _principal,
+    "pages/1_Leads_Horario.py": _horario,
+    "pages/2_Leads_Servicio.py": _servicio,
+    "pages/3_Detalles.py": _detalles
+}
+
+# Función para precalentar las cachés del proceso antes de la primera sesión
+def precalentar(paginas=PAGINAS_PRECALENTADAS):
+    """
+    Hace, para cada página, las cargas y arma las figuras de su vista por defecto.
+
+    Así quedan en las cachés del proceso (compartidas por todas las sesiones) los
+    leads, los índices, el cubo y las series o la base SQL, el resumen por agente, el
+    detector de alertas y, en la caché de figuras, las figuras de cada página con los
+    filtros por defecto (todo el rango de fechas, todos los valores, sin domingos y la
+    primera opción de visualización). Las figuras salen de utils/figuras.py con la
+    misma clave que usan las páginas, así la primera sesión ya las encuentra armadas.
+    Debe correr en el mismo proceso que el servidor y antes de que arranque.
+
+    Args:
+        paginas (dict): Página -> función sin argumentos que hace sus cargas y arma sus figuras
+
+    Returns:
+        dict: Página -> {"segundos": float, "errores": list}
+    """
+    resultados = {}
+    for pagina, precalentar_pagina in paginas.items():
+        inicio = time.perf_counter()
+        try:
+            precalentar_pagina()
+            errores = []
+        except Exception as error:
+            # Una página que falla no impide arrancar: la carga la primera sesión
+            errores = [f"{type(error).__name__}: {error}"]
+        resultados[pagina] = {"segundos": time.perf_counter() - inicio, "errores": errores}
+    return resultados
@@ -0,0 +1,245 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import RUTA_LEADS, cargar_agregado, concatenar_leads, registrar_agregado
+from utils.instrumentacion import medir_etapa
+
+# Resoluciones de las series, de la más fina a la más gruesa: nombre -> períodos por día
+RESOLUCIONES = {
+    '5min': 288,
+    '30min': 48,
+    'hora': 24,
+    'dia': 1,
+    'semana': 1 / 7,
+    'mes': 12 / 365.25
+}
+
+# Nombre de cada resolución para títulos y ejes
+ETIQUETAS_RESOLUCION = {
+    '5min': '5 minutos',
+    '30min': '30 minutos',
+    'hora': 'hora',
+    'dia': 'día',
+    'semana': 'semana',
+    'mes': 'mes'
+}
+
+# Puntos que puede tener una serie antes de pasar a la resolución siguiente
+MAXIMO_PUNTOS = 500
+
+# Dimensiones por las que se cuentan los leads en cada período
+DIMENSIONES_SERIES = ['Servicio', 'CanalOrigen', 'Estado', 'TipoDeCliente', 'Domingo']
+
+# Función para llevar cada fecha al inicio de su período
+def periodos(fechas, resolucion):
+    """
+    Trunca las fechas al inicio del período de la resolución.
+
+    Las semanas empiezan el lunes (las mismas que la columna derivada Semana, pero
+    identificadas por su fecha, así no se confunden semanas de años distintos).
+
+    Args:
+        fechas (Series): Fechas a truncar
+        resolucion (str): Una de RESOLUCIONES
+
+    Returns:
+        Series: Inicio del período de cada fecha
+    """
+    if resolucion == "5min":
+        return fechas.dt.floor("5min")
+    if resolucion == "30min":
+        return fechas.dt.floor("30min")
+    if resolucion == "hora":
+        return fechas.dt.floor("h")
+    dias = fechas.dt.normalize()
+    if resolucion == "dia":
+        return dias
+    if resolucion == "semana":
+        return dias - pd.to_timedelta(dias.dt.dayofweek, unit="D")
+    return pd.Series(fechas.to_numpy().astype("datetime64[M]").astype("datetime64[ns]"), index=fechas.index)
+
+# Función para obtener el inicio del período de una sola fecha
+def _periodo(fecha, resolucion):
+    return periodos(pd.Series([pd.Timestamp(fecha)]), resolucion).iloc[0]
+
+# Función para obtener el inicio de la semana o el mes siguiente
+def _siguiente(periodo, resolucion):
+    if resolucion == "mes":
+        return periodo + pd.DateOffset(months=1)
+    return periodo + pd.Timedelta(days=7)
+
+# Función para elegir la resolución de una serie según el rango de fechas
+def elegir_resolucion(fecha_inicio, fecha_fin, maximo_puntos=MAXIMO_PUNTOS):
+    """
+    Devuelve la resolución más fina con la que el rango entra en maximo_puntos períodos.
+
+    Args:
+        fecha_inicio (datetime): Fecha inicial del rango
+        fecha_fin (datetime): Fecha final del rango
+        maximo_puntos (int): Períodos máximos de la serie
+
+    Returns:
+        str: Una de RESOLUCIONES
+    """
+    dias = (pd.Timestamp(fecha_fin).normalize() - pd.Timestamp(fecha_inicio).normalize()).days + 1
+    for resolucion, por_dia in RESOLUCIONES.items():
+        if dias * por_dia <= maximo_puntos:
+            return resolucion
+    return resolucion
+
+# Función para sumar un nivel de la serie en los períodos de otra resolución
+def _reagrupar(nivel, resolucion):
+    celdas = nivel.assign(Periodo=periodos(nivel["Periodo"], resolucion))
+    agrupado = celdas.groupby(["Periodo", *DIMENSIONES_SERIES], observed=True)["Cantidad"].sum().reset_index()
+    return agrupado.assign(Resolucion=resolucion)
+
+# Función para ordenar las series por resolución y período
+def _ordenar(series):
+    series = series.astype({"Resolucion": pd.CategoricalDtype(list(RESOLUCIONES), ordered=True)})
+    columnas = ["Resolucion", "Periodo", *DIMENSIONES_SERIES, "Cantidad"]
+    return series[columnas].sort_values(["Resolucion", "Periodo"], kind="stable", ignore_index=True)
+
+# Función para construir las series de todas las resoluciones a partir de los leads
+def construir_series(df):
+    """
+    Cuenta los leads por período y dimensiones en cada resolución.
+
+    Solo la resolución más fina se calcula sobre los leads; cada una de las
+    siguientes se suma a partir de la anterior, que ya es mucho más chica.
+
+    Args:
+        df (DataFrame): Leads enriquecidos (como los devuelve cargar_datos)
+
+    Returns:
+        DataFrame: Resolucion, Periodo, DIMENSIONES_SERIES y Cantidad, ordenado por resolución y período
+    """
+    resoluciones = list(RESOLUCIONES)
+    celdas = pd.DataFrame({
+        "Periodo": periodos(df["FechaIngreso"], resoluciones[0]),
+        **{columna: df[columna] for columna in DIMENSIONES_SERIES[:-1]},
+        "Domingo": df.derivadas["DiaSemana"] == 6
+    })
+    nivel = celdas.groupby(["Periodo", *DIMENSIONES_SERIES], observed=True).size().reset_index(name="Cantidad")
+    niveles = [nivel.assign(Resolucion=resoluciones[0])]
+    for resolucion in resoluciones[1:]:
+        # Semanas y meses se arman desde los días (una semana no es una suma de meses ni al revés)
+        anterior = niveles[resoluciones.index("dia")] if resolucion in ("semana", "mes") else niveles[-1]
+        niveles.append(_reagrupar(anterior, resolucion))
+    return _ordenar(concatenar_leads(*niveles))
+
+# Función para sumar dos conjuntos de series (ej. las guardadas y las de los leads recién agregados)
+def combinar_series(series, series_nuevas):
+    """
+    Suma los conteos de dos conjuntos de series; un período puede estar en ambos.
+
+    Args:
+        series (DataFrame): Series previas
+        series_nuevas (DataFrame): Series de las filas nuevas
+
+    Returns:
+        DataFrame: Series con los conteos de ambas
+    """
+    celdas = concatenar_leads(series, series_nuevas)
+    agrupado = celdas.groupby(["Resolucion", "Periodo", *DIMENSIONES_SERIES], observed=True)["Cantidad"].sum().reset_index()
+    return _ordenar(agrupado)
+
+# Las series se guardan junto al snapshot y se actualizan con las filas agregadas al CSV
+registrar_agregado("series", construir_series, combinar_series)
+
+# Función para obtener las series de la versión actual de los datos
+def cargar_series(ruta=RUTA_LEADS):
+    """
+    Devuelve las series de conteos por período, al día con el archivo de origen.
+
+    Args:
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        DataFrame: Series de todas las resoluciones (ver construir_series)
+    """
+    return cargar_agregado("series", ruta)
+
+# Función para tomar las filas de una resolución con períodos en [desde, hasta)
+def _tramo(series, resolucion, desde=None, hasta=None):
+    # Las series están ordenadas por resolución y, dentro de cada una, por período
+    codigos = series["Resolucion"].cat.codes.to_numpy()
+    codigo = list(RESOLUCIONES).index(resolucion)
+    inicio, fin = np.searchsorted(codigos, [codigo, codigo + 1])
+    nivel = series.iloc[inicio:fin]
+
+    fechas = nivel["Periodo"].to_numpy()
+    inicio = 0 if desde is None else np.searchsorted(fechas, np.datetime64(desde, "ns"))
+    fin = len(nivel) if hasta is None else np.searchsorted(fechas, np.datetime64(hasta, "ns"))
+    return nivel.iloc[inicio:fin]
+
+# Función para consultar una serie con los mismos filtros que aplicar_filtros
+@medir_etapa("agregacion")
+def consultar_series(series, resolucion, dimensiones, fecha_inicio=None, fecha_fin=None, servicios=None, canales=None,
+                     estados=None, tipos_cliente=None, excluir_domingos=False):
+    """
+    Suma los leads de cada período de la resolución que cumplen los filtros.
+
+    El filtro de fechas trabaja por día, como el del cubo. En semanas y meses los
+    períodos que el rango abarca solo en parte se completan con los días del rango,
+    así los bordes no cuentan leads de fuera de él.
+
+    Args:
+        series (DataFrame): Series de conteos (ver cargar_series)
+        resolucion (str): Una de RESOLUCIONES (ver elegir_resolucion)
+        dimensiones (list): Columnas de DIMENSIONES_SERIES por las que separar la serie
+        fecha_inicio (datetime): Fecha de inicio para filtrar
+        fecha_fin (datetime): Fecha final para filtrar
+        servicios (list): Lista de servicios para filtrar
+        canales (list): Lista de canales para filtrar
+        estados (list): Lista de estados para filtrar
+        tipos_cliente (list): Lista de tipos de cliente para filtrar
+        excluir_domingos (bool): Descartar los leads ingresados en domingo
+
+    Returns:
+        DataFrame: Periodo, las dimensiones pedidas y CantidadLeads, ordenado por período
+    """
+    desde = pd.Timestamp(fecha_inicio).normalize() if fecha_inicio else None
+    hasta = pd.Timestamp(fecha_fin).normalize() + pd.Timedelta(days=1) if fecha_fin else None
+
+    if resolucion in ("semana", "mes"):
+        # Períodos completos dentro del rango, y los días sueltos de los bordes desde la serie diaria
+        primero = desde if desde is None or _periodo(desde, resolucion) == desde else _siguiente(_periodo(desde, resolucion), resolucion)
+        ultimo = None if hasta is None else _periodo(hasta, resolucion)
+        if primero is not None and ultimo is not None and primero >= ultimo:
+            partes = [_tramo(series, "dia", desde, hasta)]
+        else:
+            partes = [_tramo(series, resolucion, primero, ultimo)]
+            if desde is not None:
+                partes.append(_tramo(series, "dia", desde, primero))
+            if hasta is not None:
+                partes.append(_tramo(series, "dia", ultimo, hasta))
+        celdas = pd.concat(partes, ignore_index=True)
+        celdas["Periodo"] = periodos(celdas["Periodo"], resolucion)
+    else:
+        celdas = _tramo(series, resolucion, desde, hasta)
+
+    mascara = np.ones(len(celdas), dtype=bool)
+    for columna, valores in (("Servicio", servicios), ("CanalOrigen", canales), ("Estado", estados),
+                             ("TipoDeCliente", tipos_cliente)):
+        if valores:
+            mascara &= celdas[columna].isin(valores).to_numpy()
+    if excluir_domingos:
+        mascara &= ~celdas["Domingo"].to_numpy()
+
+    return celdas[mascara].groupby(["Periodo", *dimensiones], observed=True)["Cantidad"].sum().reset_index(name="CantidadLeads")
+
+# Función para armar la serie directamente a partir de leads (ej. los que dejó una búsqueda por texto)
+@medir_etapa("agregacion")
+def agrupar_por_periodo(df, resolucion, dimensiones):
+    """
+    Cuenta los leads de df por período de la resolución.
+
+    Args:
+        df (DataFrame): Leads con FechaIngreso y las columnas de dimensiones
+        resolucion (str): Una de RESOLUCIONES
+        dimensiones (list): Columnas por las que separar la serie
+
+    Returns:
+        DataFrame: Periodo, las dimensiones pedidas y CantidadLeads, ordenado por período
+    """
+    claves = [periodos(df["FechaIngreso"], resolucion).rename("Periodo"), *(df[columna] for columna in dimensiones)]
+    return df.groupby(claves, observed=True).size().reset_index(name="CantidadLeads")
@@ -0,0 +1,272 @@
+import io
+import pandas as pd
+import requests
+import streamlit as st
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
+from utils.data_loader import RUTA_LEADS, concatenar_leads, enriquecer_datos, leer_fuente, leer_rango, sincronizar_en_bloques
+
+# Parámetros por defecto de la descarga de leads
+TAMANO_PAGINA = 500
+MAXIMO_HILOS = 8
+TIMEOUT_SEGUNDOS = 30
+MAXIMO_INTENTOS = 5
+
+# Códigos HTTP que indican un problema transitorio del servidor
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+# Error devuelto por la API de Tactica (respuesta con "error": true)
+class ErrorTactica(Exception):
+    pass
+
+# Función para decidir si un error de la API amerita reintentar
+def _es_reintentable(excepcion):
+    if isinstance(excepcion, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(excepcion, requests.HTTPError) and excepcion.response is not None:
+        return excepcion.response.status_code in CODIGOS_REINTENTABLES
+    return False
+
+# Cliente de la API de leads de Tactica
+class ClienteTactica:
+    """
+    Descarga leads de la API de Tactica reutilizando conexiones y pidiendo páginas en paralelo.
+
+    La API responde con el formato {"data", "error", "mensaje"} y, opcionalmente,
+    "total" con la cantidad de leads del rango pedido. Cada registro de "data" trae
+    las mismas columnas que leads.csv.
+
+    Args:
+        url_base (str): URL base de la API (ej. un servidor local de prueba)
+        token (str): Token de acceso, enviado como Bearer
+        tamano_pagina (int): Leads por página
+        maximo_hilos (int): Páginas que se piden en simultáneo
+        timeout (float): Segundos de espera por respuesta
+    """
+
+    def __init__(self, url_base, token=None, tamano_pagina=TAMANO_PAGINA, maximo_hilos=MAXIMO_HILOS,
+                 timeout=TIMEOUT_SEGUNDOS):
+        self.url_base = url_base.rstrip("/")
+        self.tamano_pagina = tamano_pagina
+        self.maximo_hilos = maximo_hilos
+        self.timeout = timeout
+
+        # Una sola sesión con un pool de conexiones del tamaño de los hilos
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=maximo_hilos, pool_maxsize=maximo_hilos)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+        if token:
+            self.sesion.headers["Authorization"] = f"Bearer {token}"
+
+    @retry(
+        retry=retry_if_exception(_es_reintentable),
+        stop=stop_after_attempt(MAXIMO_INTENTOS),
+        wait=wait_exponential(multiplier=0.5, max=10),
+        reraise=True
+    )
+    def obtener_pagina(self, pagina, desde, hasta):
+        """
+        Pide una página de leads, reintentando con espera exponencial ante errores transitorios.
+
+        Args:
+            pagina (int): Número de página (desde 1)
+            desde (datetime): Inicio del rango de FechaIngreso
+            hasta (datetime): Fin del rango de FechaIngreso
+
+        Returns:
+            dict: Respuesta de la API
+        """
+        respuesta = self.sesion.get(
+            f"{self.url_base}/leads",
+            params={
+                "desde": desde.isoformat(),
+                "hasta": hasta.isoformat(),
+                "pagina": pagina,
+                "por_pagina": self.tamano_pagina
+            },
+            timeout=self.timeout
+        )
+        respuesta.raise_for_status()
+        contenido = respuesta.json()
+        if contenido.get("error"):
+            raise ErrorTactica(contenido.get("mensaje", "Error de la API de Tactica"))
+        return contenido
+
+    def paginas(self, desde, hasta):
+        """
+        Descarga las páginas del rango y las entrega a medida que llegan.
+
+        Si la primera página informa el total, el resto se pide en paralelo de una vez.
+        Si no, se piden tandas de maximo_hilos páginas hasta que una vuelve incompleta
+        o vacía; así una respuesta sin "total" no se queda en la primera página.
+
+        Args:
+            desde (datetime): Inicio del rango de FechaIngreso
+            hasta (datetime): Fin del rango de FechaIngreso
+
+        Yields:
+            list: Registros de cada página (no necesariamente en orden de página)
+        """
+        primera = self.obtener_pagina(1, desde, hasta)
+        yield primera["data"]
+        if primera.get("total") is None and len(primera["data"]) < self.tamano_pagina:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.maximo_hilos) as ejecutor:
+            if primera.get("total") is not None:
+                cantidad_paginas = -(-int(primera["total"]) // self.tamano_pagina)
+                pendientes = [ejecutor.submit(self.obtener_pagina, pagina, desde, hasta) for pagina in range(2, cantidad_paginas + 1)]
+                for pendiente in as_completed(pendientes):
+                    yield pendiente.result()["data"]
+                return
+
+            siguiente = 2
+            while True:
+                tanda = [ejecutor.submit(self.obtener_pagina, pagina, desde, hasta)
+                         for pagina in range(siguiente, siguiente + self.maximo_hilos)]
+                # Se recorre en orden de página: después de una incompleta no hay más leads
+                for pendiente in tanda:
+                    registros = pendiente.result()["data"]
+                    yield registros
+                    if len(registros) < self.tamano_pagina:
+                        for resto in tanda:
+                            resto.cancel()
+                        return
+                siguiente += self.maximo_hilos
+
+    def descargar_leads(self, desde, hasta, compacto=True):
+        """
+        Descarga todos los leads del rango y los devuelve enriquecidos como cargar_datos.
+
+        Cada página se enriquece apenas llega, mientras las demás siguen descargándose.
+
+        Args:
+            desde (datetime): Inicio del rango de FechaIngreso
+            hasta (datetime): Fin del rango de FechaIngreso
+            compacto (bool): Representación de los leads (ver enriquecer_datos)
+
+        Returns:
+            DataFrame: Leads del rango, ordenados por FechaIngreso
+        """
+        paginas = [_enriquecer_pagina(registros, compacto) for registros in self.paginas(desde, hasta)]
+        paginas = [pagina for pagina in paginas if len(pagina) > 0]
+        if not paginas:
+            return enriquecer_datos(pd.DataFrame({"FechaIngreso": pd.Series(dtype="datetime64[ns]")}), compacto)
+        return concatenar_leads(*paginas).sort_values("FechaIngreso", kind="stable", ignore_index=True)
+
+    def cerrar(self):
+        """Cierra las conexiones del pool."""
+        self.sesion.close()
+
+# Función para convertir los registros de una página en leads enriquecidos
+def _enriquecer_pagina(registros, compacto):
+    pagina = pd.DataFrame.from_records(registros)
+    if len(pagina) == 0:
+        return pagina
+    pagina["FechaIngreso"] = pd.to_datetime(pagina["FechaIngreso"])
+    return enriquecer_datos(pagina, compacto)
+
+# Función para pasar leads a las líneas con las que quedan escritos en el CSV de origen
+def _lineas_csv(df, columnas):
+    return df[columnas].to_csv(header=False, index=False, date_format="%Y-%m-%d %H:%M:%S", lineterminator="\n").splitlines()
+
+# Función para descartar los leads de la API que ya están en el archivo con la última FechaIngreso ingerida
+def _descartar_ingeridos(nuevos, ultima_fecha, columnas, ruta):
+    en_borde = nuevos["FechaIngreso"] == ultima_fecha
+    if not en_borde.any():
+        return nuevos
+
+    # Los leads del borde se comparan como quedarían una vez escritos e ingeridos, fila completa
+    texto = "\n".join(_lineas_csv(nuevos[en_borde], columnas))
+    ingeridos_borde = enriquecer_datos(leer_fuente(io.StringIO(texto), header=None, names=columnas))
+    guardados = Counter(_lineas_csv(leer_rango(ultima_fecha, ultima_fecha, ruta), columnas))
+
+    # Cada lead guardado descarta una sola repetición (dos leads idénticos en el mismo minuto son dos leads)
+    repetidos = []
+    for linea in _lineas_csv(ingeridos_borde, columnas):
+        repetidos.append(guardados[linea] > 0)
+        guardados[linea] -= 1
+    descartar = pd.Series(False, index=nuevos.index)
+    descartar[nuevos.index[en_borde]] = repetidos
+    return nuevos[~descartar]
+
+# Función para agregar al archivo de origen los leads de la API desde el último ingerido
+def sincronizar_leads(cliente, desde=None, hasta=None, ruta=RUTA_LEADS):
+    """
+    Descarga de la API los leads nuevos y los agrega al final del CSV de origen.
+
+    Como solo se agregan filas al final, la próxima carga actualiza el snapshot y sus
+    agregados procesando únicamente esas filas. Por defecto se piden los leads desde
+    el último ingerido, inclusive. Se descartan los que tienen una FechaIngreso
+    anterior y, de los que comparten la del último, los que ya están en el archivo
+    (comparando la fila completa), para no duplicarlos sin perder los que llegaron
+    en ese mismo minuto después de la sincronización anterior.
+
+    Args:
+        cliente (ClienteTactica): Cliente de la API
+        desde (datetime): Inicio del rango (por defecto, la FechaIngreso del último lead)
+        hasta (datetime): Fin del rango (por defecto, ahora)
+        ruta (str): Ruta del CSV de origen
+
+    Returns:
+        int: Cantidad de leads agregados al archivo
+    """
+    meta = sincronizar_en_bloques(ruta)
+    if meta is None:
+        raise OSError(f"No se pudo sincronizar el snapshot de {ruta}: el disco no es escribible")
+    ultima_fecha = pd.Timestamp(meta["ultima_fecha"]) if meta["ultima_fecha"] else None
+    desde = pd.Timestamp(desde) if desde is not None else ultima_fecha
+    if desde is None:
+        raise ValueError("El archivo de origen no tiene leads: hay que indicar desde cuándo sincronizar")
+    hasta = pd.Timestamp(hasta) if hasta is not None else pd.Timestamp.now().floor("s")
+
+    paginas = [pd.DataFrame.from_records(registros) for registros in cliente.paginas(desde, hasta) if registros]
+    if not paginas:
+        return 0
+    nuevos = pd.concat(paginas, ignore_index=True).reindex(columns=meta["columnas"])
+    nuevos["FechaIngreso"] = pd.to_datetime(nuevos["FechaIngreso"])
+    if ultima_fecha is not None:
+        nuevos = _descartar_ingeridos(nuevos[nuevos["FechaIngreso"] >= ultima_fecha], ultima_fecha, meta["columnas"], ruta)
+    if len(nuevos) == 0:
+        return 0
+
+    # En orden de fecha, así la ingesta agrega una parte al snapshot sin reordenarlo
+    nuevos = nuevos.sort_values("FechaIngreso", kind="stable")
+    with open(ruta, "a", encoding="utf-8", newline="") as archivo:
+        if not meta["termina_en_salto"]:
+            archivo.write("\n")
+        nuevos.to_csv(archivo, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S", lineterminator="\n")
+    return len(nuevos)
+
+# Función para saber si la API de Tactica está configurada en secrets.toml
+def tactica_configurada():
+    """
+    Indica si secrets.toml tiene la sección [tactica].
+
+    Returns:
+        bool: True si se puede crear el cliente con crear_cliente
+    """
+    try:
+        return "tactica" in st.secrets
+    except FileNotFoundError:
+        return False
+
+# Función para crear el cliente con la configuración de secrets.toml
+@st.cache_resource
+def crear_cliente():
+    """
+    Crea (una vez por proceso) el cliente configurado en la sección [tactica] de secrets.toml.
+
+    Returns:
+        ClienteTactica: Cliente con url_base, token y, opcionalmente, tamano_pagina y maximo_hilos
+    """
+    configuracion = st.secrets["tactica"]
+    return ClienteTactica(
+        configuracion["url_base"],
+        token=configuracion.get("token"),
+        tamano_pagina=configuracion.get("tamano_pagina", TAMANO_PAGINA),
+        maximo_hilos=configuracion.get("maximo_hilos", MAXIMO_HILOS)
+    )